@@ -1,28 +1,73 @@
-import json
 import openai
-from openai import OpenAI
-import itertools
 import constants
 import argparse
 import testCaseParser
+import performanceProfile
 import pandas as pd
 import traceback
-import ast
 import regex as re
 import os as os_module
 import time as time_module
-from importsCheck import install_imports
-from func_timeout import func_timeout, FunctionTimedOut
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from importsCheck import install_imports, configure as configure_imports
+from llmClient import get_client_pool
+from rateLimiter import get_rate_limiter, estimate_tokens, retry_after_seconds
+from responseCache import ResponseCache, get_response_cache
+from verdictCache import VerdictCache, get_verdict_cache
+from sandbox import get_sandbox_pool, SandboxTimeout, SolutionError
+from conversationHistory import compact_messages, count_tokens, count_text_tokens, HISTORY_STRATEGIES
+from codeStream import StreamMonitor
+from checkpoint import CheckpointJournal
+from resultsStore import ResultsStore
+from logWriter import log, get_log_writer
+from outputComparator import select_comparator, load_overrides
+from staticCheck import analyze, screen
+from questionDataset import iter_questions
+from solutionsIndex import folder_name as solution_folder_name, get_solutions_index
+
+# Shared by all concurrently running questions of a model
+results_lock = threading.Lock()
+install_lock = threading.Lock()
 
 
 class SolutionAssistant:
     """Assists in generating, testing, and iterating code solutions using LLMs."""
 
-    def __init__(self, model="o1-mini", api_key = None , question_order=True):
+    def __init__(self, model="o1-mini", api_key = None , question_order=True, llm_slots=None, sandbox=None,
+                 base_url=None, response_cache=None, candidates=1, history_strategy='full', history_turns=2,
+                 token_budget=None, stream=False, comparators=None, verdict_cache=None, run_all_tests=False,
+                 max_failures=3, test_budget=None, profile=False):
         self.model = model
         self.api_key = api_key
+        self.base_url = base_url
+        self.response_cache = response_cache
+        # Verdicts of already tested solutions, shared across iterations, runs and models
+        self.verdict_cache = verdict_cache
+        self.candidates = candidates
+        # How much of the conversation is sent to the model on every repair iteration
+        self.history_strategy = history_strategy
+        self.history_turns = history_turns
+        self.token_budget = token_budget
+        # Stream single responses and stop reading once the code is complete
+        self.stream = stream
         self.message = []
         self.question_order = question_order
+        # Per-question comparator overrides, keyed by question name
+        self.comparators = comparators or {}
+        # Run every test case in parallel within test_budget seconds and report up to max_failures failures at once
+        self.run_all_tests = run_all_tests
+        self.max_failures = max_failures
+        self.test_budget = test_budget
+        # Measure every test and send solutions back whose running time grows too fast on scaled-up inputs
+        self.profile = profile
+        # Question and iteration identifiers attached to structured log records
+        self.log_context = {}
+        # Bound in-flight LLM calls across concurrently repaired questions
+        self.llm_slots = llm_slots if llm_slots is not None else nullcontext()
+        # Solutions are compiled and tested in isolated worker processes. The pool size bounds CPU bound work.
+        self.sandbox = sandbox if sandbox is not None else get_sandbox_pool()
         self.question_data = {
             'Question Name': [],
             'Question Description': [],
@@ -32,67 +77,171 @@ class SolutionAssistant:
             'Token Length Response': [[]],
             'Error List': [[]],
             'Tests Failed List': [[]],
+            'Candidate Tests Failed List': [[]],
+            'Candidate Selected': [[]],
+            'Dedup Hit List': [[]],
+            'Test Results List': [[]],
+            'Test Metrics List': [[]],
+            'Complexity List': [[]],
             'Solved': [],
             'Iteration Solved': [],
             'Time Req': [[]],
+            'Time To First Token': [[]],
             'Total Time Req': []
         }
 
     def log_to_file(self, *args, **kwargs):
         """Logs messages to both the terminal and a file."""
-        file_name = f"ResponseLog_{self.model}.txt"
-        print(*args, **kwargs)
-        with open(file_name, 'a', encoding="utf-8") as log_file:
-            print(*args, **kwargs, file=log_file)
+        log(f"ResponseLog_{self.model}.txt", *args, fields=self.log_context, **kwargs)
+
+    def save_results(self, results_store=None, on_saved=None):
+        """Writes the question data to the results store, or to the CSV file if no store is given."""
+        if results_store is None:
+            self.save_results_to_csv()
+            if on_saved:
+                on_saved()
+            return
+        self.log_to_file("Saving results to the results store...")
+        results_store.add(self.question_data, on_saved)
+        self.reset_question_data()
 
     def save_results_to_csv(self):
         """Writes the question data to a CSV file."""
         self.log_to_file("Saving results to CSV...")
         csv_file_name = f"ResponseList_{self.model}.csv"
         df = pd.DataFrame(self.question_data)
-        if os_module.path.exists(csv_file_name):
-            df.to_csv(csv_file_name, header=False, mode='a')
-        else:
-            df.to_csv(csv_file_name)
+        with results_lock:
+            if os_module.path.exists(csv_file_name):
+                df.to_csv(csv_file_name, header=False, mode='a')
+            else:
+                df.to_csv(csv_file_name)
+        self.reset_question_data()
+
+    def reset_question_data(self):
+        """Clears the question data for the next question."""
         reset_keys = ['Test Cases List', 'Prompt List', 'Token Length Prompt', 'Token Length Response', 'Error List', 'Tests Failed List',
-                      'Time Req']
+                      'Candidate Tests Failed List', 'Candidate Selected', 'Dedup Hit List', 'Test Results List',
+                      'Test Metrics List', 'Complexity List', 'Time Req', 'Time To First Token']
         for key in self.question_data.keys():
             self.question_data[key] = [[]] if key in reset_keys else []
 
     def get_llm_response(self):
         """Fetches a response from the LLM."""
+        responses = self.get_llm_responses(1)
+        return responses[0] if responses else None
+
+    def get_llm_responses(self, n=1, rate_limit_retries=5):
+        """Fetches n candidate responses from the LLM in a single request."""
+        rate_limiter = get_rate_limiter(self.model)
         try:
-            client = OpenAI(
-                api_key=self.api_key if self.api_key is not None else os_module.getenv("GEMINI_API_KEY"),
-                base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-            ) if "gemini" in self.model.lower() else OpenAI(
-                api_key=self.api_key if self.api_key is not None else os_module.getenv("OPENAI_API_KEY"))
-
-            response_code = client.chat.completions.create(
-                model=self.model,
-                n=1,
-                messages=self.message
-            )
+            messages = compact_messages(self.message, self.history_strategy, self.history_turns, self.token_budget,
+                                        self.model)
+            # Identical conversations are replayed from the cache without querying the model
+            cache_key = ResponseCache.make_key(self.model, messages, n=n) if self.response_cache else None
+            cached = self.response_cache.get(cache_key) if self.response_cache else None
+            if cached:
+                self.question_data['Token Length Prompt'][0].append(cached['prompt_tokens'])
+                self.question_data['Token Length Response'][0].append(cached['completion_tokens'])
+                if self.stream and n == 1:  # keeps the column aligned with the prompts, a replay has no first token
+                    self.question_data['Time To First Token'][0].append(None)
+                self.log_to_file("LLM Model used:", cached['model'], "(cached response)")
+                return [content.strip() for content in cached['contents'] if content]
+
+            estimated_tokens = estimate_tokens(messages)
+            rate_limiter.acquire(estimated_tokens)
+            if self.stream and n == 1:
+                return self.get_streamed_response(messages, cache_key, estimated_tokens, rate_limiter)
+            # The shared pool keeps HTTP connections alive across iterations and questions
+            with self.llm_slots:
+                response_code = get_client_pool().create(
+                    self.model,
+                    messages,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    n=n
+                )
+            rate_limiter.record_usage(estimated_tokens, response_code.usage.total_tokens)
             self.question_data['Token Length Prompt'][0].append(response_code.usage.prompt_tokens)
             self.question_data['Token Length Response'][0].append(response_code.usage.completion_tokens)
             self.log_to_file("LLM Model used:", response_code.model)
-            return response_code.choices[0].message.content.strip() if response_code.choices[0].message.content else None
+            contents = [choice.message.content for choice in response_code.choices]
+            if self.response_cache:
+                self.response_cache.put(cache_key, response_code.model, contents,
+                                        response_code.usage.prompt_tokens, response_code.usage.completion_tokens)
+            return [content.strip() for content in contents if content]
         except openai.APIStatusError as msg_long_err:
+            if msg_long_err.status_code == 429 and rate_limit_retries > 0:
+                delay = rate_limiter.backoff(retry_after_seconds(msg_long_err))
+                self.log_to_file(f"Rate limited by the provider. Retrying in {delay:.1f}s...")
+                return self.get_llm_responses(n, rate_limit_retries - 1)
             if "string too long" in str(msg_long_err):
                 self.log_to_file("Error in response: One of the messages is too long. Truncating...")
                 self.message[-1]["content"] = self.message[-1]["content"][:1048570] # max length allowed is 1048576
-                response = self.get_llm_response()
-                return response if response is not None else None
+                return self.get_llm_responses(n, rate_limit_retries)
             else:
                 self.log_to_file("Error in LLM response:", str(msg_long_err))
-                return None
+                return []
         except Exception as e:
             self.log_to_file("Error in LLM response:", str(e))
-            return None
+            return []
+
+    def get_streamed_response(self, messages, cache_key, estimated_tokens, rate_limiter):
+        """Streams one response and returns its code as soon as a complete function was emitted."""
+        monitor = StreamMonitor()
+        with self.llm_slots:
+            streamed = get_client_pool().stream(self.model, messages, api_key=self.api_key, base_url=self.base_url,
+                                                monitor=monitor, n=1)
+        if streamed['Usage']:
+            prompt_tokens, completion_tokens = streamed['Usage'].prompt_tokens, streamed['Usage'].completion_tokens
+        else:  # the stream was closed before the final usage chunk
+            prompt_tokens = count_tokens(messages, self.model)
+            completion_tokens = count_text_tokens(streamed['Content'], self.model)
+        rate_limiter.record_usage(estimated_tokens, prompt_tokens + completion_tokens)
+        self.question_data['Token Length Prompt'][0].append(prompt_tokens)
+        self.question_data['Token Length Response'][0].append(completion_tokens)
+        self.question_data['Time To First Token'][0].append(streamed['Time To First Token'])
+        self.log_to_file("LLM Model used:", streamed['Model'])
+        if streamed['Stop Reason'] in ('runaway', 'prose'):
+            self.log_to_file(f"Aborted the response early as it was {streamed['Stop Reason']}.")
+            return []
+        content = monitor.code if streamed['Stop Reason'] == 'completed' else streamed['Content']
+        if self.response_cache:
+            self.response_cache.put(cache_key, streamed['Model'], [content], prompt_tokens, completion_tokens)
+        return [content.strip()] if content else []
+
+    def get_best_response(self, test_cases, question_description, data_source):
+        """Requests several candidates at once, tests them in parallel and returns the best scoring one with its
+        verdict, which is None for a single candidate as it has not been tested yet."""
+        if self.candidates <= 1:
+            return self.get_llm_response(), None
+        responses = self.get_llm_responses(self.candidates)
+        if not responses:
+            return None, None
+        responses = [self.extract_python_code(response) if "```python" in response else response
+                     for response in responses]
+        self.log_to_file(f"Testing {len(responses)} candidate solutions")
+        records = [{} for _ in responses]
+        with ThreadPoolExecutor(max_workers=len(responses)) as executor:
+            verdicts = list(executor.map(
+                lambda candidate: self.test_code(candidate[0], test_cases, question_description, data_source,
+                                                 record=candidate[1], screen_code=True),
+                zip(responses, records)))
+        # A full pass wins, then a correct solution that is too slow or needs too much memory, otherwise the
+        # candidate that passed the most test cases before failing
+        scores = [(2, 0) if passed else (1, 0) if self.performance_failure(feedback) else (0, failed - 1)
+                  for passed, failed, feedback in verdicts]
+        best = scores.index(max(scores))
+        self.question_data['Candidate Tests Failed List'][0].append(
+            [0 if passed else failed for passed, failed, _ in verdicts])
+        self.question_data['Candidate Selected'][0].append(best)
+        self.log_to_file(f"Selected candidate {best + 1} of {len(responses)}")
+        for column, values in records[best].items():
+            self.question_data[column][0].extend(values)
+        return responses[best], verdicts[best]
 
     def save_code(self, code, filename, version):
         """Saves the generated code to a file."""
-        folder_name = str(filename).replace(" ", "").replace(":", "_").replace("?", "").replace("/", "_")
+        folder_name = solution_folder_name(filename)
         path = f"Solutions_{self.model}/{folder_name}"
         os_module.makedirs(path, exist_ok=True)
         file_path = f"{path}/{folder_name}_Solution_{version}.py"
@@ -100,18 +249,27 @@ class SolutionAssistant:
             with open(file_path, "w", encoding="utf-8") as file:
                 file.write(code)
             self.log_to_file("Solution saved successfully!")
-            return True, None
         except Exception as e:
             self.log_to_file("Error saving solution:", str(e))
             return False, str(e)
+        # The index can be rebuilt from the folders, so failing to update it does not fail the save
+        try:
+            get_solutions_index(f"Solutions_{self.model}").record(folder_name, file_path, version)
+        except Exception as e:
+            self.log_to_file("Error indexing solution:", str(e))
+        return True, None
 
     def compile_code(self, code):
         """Compiles the provided Python code."""
         try:
-            func_timeout(30, exec, args=(code, globals()))
+            execution = self.sandbox.run(code, compile_timeout=30)
+            if execution['Timed Out']:
+                raise SandboxTimeout()
+            if execution['Compile Error'] is not None:
+                raise SolutionError(execution['Compile Error'], execution['Compile Traceback'])
             self.log_to_file("Code compiled successfully.")
             return "Code compiled successfully!", None
-        except FunctionTimedOut:
+        except SandboxTimeout:
             feedback = constants.COMPILE_TIME_ERROR
             self.log_to_file(feedback)
             return "Failed to compile!", feedback
@@ -119,22 +277,64 @@ class SolutionAssistant:
             self.log_to_file("Failed to compile as an Exception occurred.", str(e))
             return "Failed to compile!", str(e)
 
+    def verdict_context(self, test_cases, question_description, data_source):
+        """Identifies everything besides the solution that decides its verdict."""
+        comparator = select_comparator(question_description, self.question_order,
+                                       self.comparators.get((self.question_data['Question Name'] or [None])[0]))
+        # The feedback of a failing solution also depends on how many test cases are run and reported
+        return VerdictCache.make_context(test_cases, data_source, repr(comparator), self.profile, self.run_all_tests,
+                                         self.max_failures if self.run_all_tests else None)
+
+    def lookup_verdict(self, code, test_cases, question_description, data_source):
+        """Returns the verdict of an equivalent solution tested before as (passed, test case failed, feedback)."""
+        if self.verdict_cache is None:
+            return None
+        verdict = self.verdict_cache.get((self.question_data['Question Name'] or [None])[0],
+                                         self.verdict_context(test_cases, question_description, data_source), code)
+        if verdict is None:
+            return None
+        self.log_to_file(f"Solution is equivalent to the one tested in iteration {verdict['Iteration']} "
+                         f"by {verdict['Model']}, reusing its verdict")
+        return verdict['Passed'], verdict['Tests Failed'], verdict['Feedback']
+
+    def record_verdict(self, code, test_cases, question_description, data_source, verdict):
+        """Stores the verdict of a tested solution. Timeouts and the performance profile depend on the load, so their
+        verdicts are not stored."""
+        passed, test_case_failed, feedback = verdict
+        if self.verdict_cache is None or feedback == constants.COMPILE_TIME_ERROR or (
+                feedback and constants.TIME_LIMIT_EXCEEDED in feedback) or self.performance_failure(feedback):
+            return
+        self.verdict_cache.put((self.question_data['Question Name'] or [None])[0],
+                               self.verdict_context(test_cases, question_description, data_source), code,
+                               passed, test_case_failed, feedback, self.model, self.log_context.get('iteration'))
+
+    @staticmethod
+    def performance_failure(feedback):
+        """Checks if the feedback is the one of check_performance, given to solutions that return correct results."""
+        return bool(feedback) and feedback.startswith((constants.TOO_SLOW_ERROR.split('{')[0],
+                                                       constants.OUT_OF_MEMORY_ERROR.split('{')[0]))
+
     @staticmethod
     def fetch_function_name(code):
         """Extracts the function name from the provided code."""
-        try:
-            tree = ast.parse(code)
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name not in {"main", "__init__"}:
-                    return node.name
-        except Exception as e:
-            return None
+        return analyze(code)['Function Name']
 
-    def test_code(self, code, test_cases, question_description, data_source):
-        """Tests the provided code against given test cases and returns an appropriate feedback. """
+    @staticmethod
+    def build_calls(test_cases, data_source):
+        """Parses the test cases and returns them with the argument tuple each one calls the function with."""
+        test_cases_parsed = testCaseParser.parse_test_case(test_cases) if data_source not in ['user', 'mbpp'] else test_cases
+        calls = [(*test_case['Input'],) if (data_source not in ['user', 'mbpp'] and isinstance(test_case['Input'], list))
+                 or ('user' not in data_source and isinstance(test_case['Input'], tuple)) else (test_case['Input'],)
+                 for test_case in test_cases_parsed]
+        return test_cases_parsed, calls
+
+    def test_code(self, code, test_cases, question_description, data_source, record=True, screen_code=False):
+        """Tests the provided code against given test cases and returns an appropriate feedback. Solutions that did
+        not pass the compile state, e.g. candidates, are screened first with screen_code. """
 
         feedback = ""
         output_list = []
+        i = -1
         try:
             function_name = self.fetch_function_name(code)
             if function_name is None:
@@ -142,158 +342,211 @@ class SolutionAssistant:
                 return False, 0, feedback
 
             self.log_to_file("Parsing test cases for function:", function_name)
-            test_cases_parsed = testCaseParser.parse_test_case(test_cases) if data_source not in ['user', 'mbpp'] else test_cases
+            test_cases_parsed, calls = self.build_calls(test_cases, data_source)
             self.log_to_file("Parsed Test Case:", test_cases_parsed)
-            self.question_data['Test Cases List'][0].append(test_cases_parsed)
+            self.record_data('Test Cases List', test_cases_parsed, record)
+
+            if screen_code:
+                # Reject solutions whose signature does not fit the test cases before running them
+                feedback = screen(code, calls)
+                if feedback is not None:
+                    self.log_to_file(feedback)
+                    return False, 0, feedback
+                feedback = ""
+            # Questions accepting answers in any order or within a tolerance are compared accordingly
+            comparator = select_comparator(question_description, self.question_order,
+                                           self.comparators.get((self.question_data['Question Name'] or [None])[0]))
+            if self.run_all_tests:
+                return self.test_all_cases(code, function_name, test_cases_parsed, calls, comparator,
+                                           question_description, record)
+            def failed(index, result):
+                # Stop the worker at the first test that raised or returned a wrong answer, later results would not
+                # be used
+                if result['Error'] is not None:
+                    return True
+                try:
+                    return not comparator(result['Output'], self.expected_output(result['Output'],
+                                                                                 test_cases_parsed[index]['Output']))
+                except Exception:  # compared again below, where the error is reported
+                    return True
+
+            execution = self.sandbox.run(code, function_name, calls, compile_timeout=30, test_timeout=30,
+                                         should_stop=failed, measure_memory=self.profile)
+            self.record_test_metrics(execution['Results'], record)
 
             for i, test_case in enumerate(test_cases_parsed):
                 inputs = test_case['Input']
                 expected_output = test_case['Output']
-                if (data_source not in ['user', 'mbpp'] and isinstance(inputs, list)) or ('user' not in data_source and isinstance(inputs, tuple)):
-                    returned_output = func_timeout(30, globals()[function_name], args=(*inputs,))
-                else:
-                    returned_output = func_timeout(30, globals()[function_name], args=(inputs,))
+                if execution['Compile Error'] is not None:
+                    raise SolutionError(execution['Compile Error'], execution['Compile Traceback'])
+                if i >= len(execution['Results']):  # the worker was killed while running this test case
+                    raise SandboxTimeout(f"Test case {i + 1} exceeded the time limit")
+                if execution['Results'][i]['Error'] is not None:
+                    raise SolutionError(execution['Results'][i]['Error'], execution['Results'][i]['Traceback'])
+                returned_output = execution['Results'][i]['Output']
                 self.log_to_file(f"Input: {inputs}\n Output Returned: {returned_output}\n Output Expected: {expected_output}")
 
-                # Compare the output with the expected output as output stored/fetched from dataset is string not bool
-                if isinstance(returned_output, bool) and (expected_output == 'true' or expected_output == 'True'):
-                    expected_output = True
-                elif isinstance(returned_output, bool) and (expected_output == 'false' or expected_output == 'False'):
-                    expected_output = False
+                expected_output = self.expected_output(returned_output, expected_output)
                 # Adding test cases to the question message
-                if returned_output != expected_output:
-                    any_order = ["return the answer in any order", "return the solution in any order",
-                                 "return the values in any order"]
-                    if self.question_order and any(order in question_description for order in any_order) and isinstance(
-                            returned_output, list):
-                        # Can handle only simple permutations on the entire output not partially allowed permutations
-                        permutated_returned_output = func_timeout(60, list(itertools.permutations),
-                                                                  args=(returned_output,))
-                        if expected_output in permutated_returned_output:
-                            self.log_to_file("Test case passed!\n")
-                            output_list.append(returned_output)
-                            break
-                        else:
-                            self.log_to_file("Output returned is not as expected! \n")
-                            feedback += (
-                                f" Please modify the code. The previous solution gives incorrect results. "
-                                f"Failed test case: Input: {inputs} \n Expected Output: {expected_output}. "
-                                f"Use different concepts or change small segments of the generated code to "
-                                f"make it satisfy the test case. Expected output: {expected_output} but output "
-                                f"returned is: {returned_output}")
-                            # self.log_to_file(feedback)
-                            return False, i + 1, feedback
-                    else:
-                        self.log_to_file("Output returned is not as expected! \n")
-                        feedback += (
-                            f" Please modify the code. The previous solution gives incorrect results. "
-                            f"Failed test case: Input: {inputs} \n Expected Output: {expected_output}. "
-                            f"Use different concepts or change small segments of the generated code to "
-                            f"make it satisfy the test case. Expected output: {expected_output} but output "
-                            f"returned is: {returned_output}")
-                        # self.log_to_file(feedback)
-                        return False, i + 1, feedback
+                if not comparator(returned_output, expected_output):
+                    self.log_to_file("Output returned is not as expected! \n")
+                    feedback += (
+                        f" Please modify the code. The previous solution gives incorrect results. "
+                        f"Failed test case: Input: {inputs} \n Expected Output: {expected_output}. "
+                        f"Use different concepts or change small segments of the generated code to "
+                        f"make it satisfy the test case. Expected output: {expected_output} but output "
+                        f"returned is: {returned_output}")
+                    # self.log_to_file(feedback)
+                    return False, i + 1, feedback
                 else:
                     self.log_to_file("Test case passed!\n")
                     output_list.append(returned_output)
             if len(output_list) == len(test_cases_parsed):
-                return True, 0, None
-        except FunctionTimedOut as fte:
+                return self.check_performance(code, function_name, calls, question_description, record)
+        except SandboxTimeout as fte:
             feedback = constants.COMPILE_TIME_ERROR
             self.log_to_file(feedback, str(fte))
             return False, i + 1, feedback
+        except SolutionError as e:
+            self.log_to_file(e.worker_traceback)
+            feedback += f"Please modify the code. The previous solution gives the following error: \n {str(e)}"
+            return False, i + 1, feedback
         except Exception as e:
             traceback.print_exc()
             feedback += f"Please modify the code. The previous solution gives the following error: \n {str(e)}"
             return False, i + 1, feedback
         return False, 0, feedback
 
+    @staticmethod
+    def expected_output(returned_output, expected_output):
+        """Converts the expected output to a bool when the dataset stores it as a string and the solution returned a bool."""
+        if isinstance(returned_output, bool) and (expected_output == 'true' or expected_output == 'True'):
+            return True
+        elif isinstance(returned_output, bool) and (expected_output == 'false' or expected_output == 'False'):
+            return False
+        return expected_output
+
+    def test_all_cases(self, code, function_name, test_cases_parsed, calls, comparator, question_description,
+                       record=True):
+        """Runs all test cases in parallel sandbox workers and aggregates the failures into one feedback."""
+        execution = self.sandbox.run_parallel(code, function_name, calls, compile_timeout=30, test_timeout=30,
+                                              budget=self.test_budget, measure_memory=self.profile)
+        if execution['Compile Timed Out']:
+            self.log_to_file(constants.COMPILE_TIME_ERROR)
+            return False, 1, constants.COMPILE_TIME_ERROR
+        if execution['Compile Error'] is not None:
+            self.log_to_file(execution['Compile Traceback'])
+            return False, 1, ("Please modify the code. The previous solution gives the following error: \n "
+                              f"{execution['Compile Error']}")
+
+        passed, failures = [], []
+        for i, (test_case, result) in enumerate(zip(test_cases_parsed, execution['Results'])):
+            inputs = test_case['Input']
+            if result is None:
+                failures.append(f"Test case {i + 1} did not finish before all test cases together {constants.TIME_LIMIT_EXCEEDED}. "
+                                f"Input: {inputs}.")
+            elif result.get('Timed Out'):
+                failures.append(f"Test case {i + 1} {constants.TIME_LIMIT_EXCEEDED}. Input: {inputs}.")
+            elif result['Error'] is not None:
+                self.log_to_file(result['Traceback'])
+                failures.append(f"Test case {i + 1} gives the following error: {result['Error']}. Input: {inputs}.")
+            else:
+                expected_output = self.expected_output(result['Output'], test_case['Output'])
+                self.log_to_file(f"Input: {inputs}\n Output Returned: {result['Output']}\n Output Expected: {expected_output}")
+                if comparator(result['Output'], expected_output):
+                    passed.append(True)
+                    continue
+                failures.append(f"Failed test case: Input: {inputs} \n Expected Output: {expected_output} but output "
+                                f"returned is: {result['Output']}.")
+            passed.append(False)
+
+        self.log_to_file(f"Passed {sum(passed)} of {len(passed)} test cases: {passed}")
+        self.record_data('Test Results List', passed, record)
+        self.record_test_metrics(execution['Results'], record)
+        if all(passed):
+            return self.check_performance(code, function_name, calls, question_description, record)
+        shown = failures[:self.max_failures]
+        feedback = (f" Please modify the code. The previous solution fails {len(failures)} of {len(passed)} test "
+                    f"cases. " + " ".join(shown) +
+                    (f" {len(failures) - len(shown)} more test cases fail." if len(failures) > len(shown) else "") +
+                    " Use different concepts or change small segments of the generated code to make it satisfy the "
+                    "test cases.")
+        return False, passed.index(False) + 1, feedback
+
+    def record_data(self, column, value, record=True):
+        """Appends a value to a column of the question data. record can also be a dict collecting the columns of a
+        candidate solution, which are only added to the question data if the candidate is selected."""
+        if isinstance(record, dict):
+            record.setdefault(column, []).append(value)
+        elif record:
+            self.question_data[column][0].append(value)
+
+    def record_test_metrics(self, results, record=True):
+        """Stores the wall time, CPU time and peak memory of every test case run in profiling mode."""
+        if self.profile:
+            metrics = [None if result is None else {'Time': result.get('Time'), 'CPU Time': result.get('CPU Time'),
+                                                    'Peak Memory': result.get('Peak Memory')} for result in results]
+            self.record_data('Test Metrics List', metrics, record)
+
+    def check_performance(self, code, function_name, calls, question_description, record=True):
+        """Profiles a correct solution on scaled-up inputs in profiling mode and returns the verdict of test_code."""
+        if not self.profile:
+            return True, 0, None
+        measured = performanceProfile.profile(self.sandbox, code, function_name, calls, question_description)
+        self.record_data('Complexity List', measured, record)
+        self.log_to_file("Performance profile:", measured)
+        if measured is not None and measured['Out Of Memory'] and not measured['Too Slow']:
+            feedback = constants.OUT_OF_MEMORY_ERROR.format(size=measured['Failed Size'])
+            self.log_to_file(feedback)
+            return False, 0, feedback
+        if measured is None or not measured['Too Slow']:
+            return True, 0, None
+        if measured['Timed Out']:
+            details = f"it {constants.TIME_LIMIT_EXCEEDED} on an input of about {measured['Failed Size']} elements."
+        else:
+            details = (f"on inputs of {measured['Sizes'][0]} to {measured['Sizes'][-1]} elements its running time grows "
+                       f"about as n^{measured['Exponent']:.1f}, so it would take about "
+                       f"{measured['Projected Time']:.1f} seconds on {measured['Max Size']} elements.")
+        feedback = constants.TOO_SLOW_ERROR.format(details=details)
+        self.log_to_file(feedback)
+        return False, 0, feedback
+
     def extract_python_code(self, code):
         code_only = re.findall(r"```python\n(.*?)```", code, re.DOTALL)
         return "\n\n".join(code_only)
 
 
-def fetch_leetcode_details(excel_file_name, order, start=1):
+def fetch_leetcode_details(excel_file_name, order, start=1, difficulty=None, topics=None):
     """ This function reads the LeetCode file and fetches the data. """
-    excel_file_path = excel_file_name
     question_names = []
     question_descriptions = []
     test_cases = []
-    if os_module.path.exists(excel_file_path):
+    if os_module.path.exists(excel_file_name):
         print("Fetching question details...")
-        df = pd.read_excel(excel_file_path)
-        all_rows = df.values.tolist()
-
-        for question in range(start, len(all_rows)):
-            # ensure question_names, question_descriptions, test_cases are not null
-            # ensure it is not a premium question and that there is at least 1 test case available
-            # #ensure the answer is not asking for results in any order
-            if (all_rows[question][0] and all_rows[question][5] and all_rows[question][7]
-                    and ('in any order' not in str(all_rows[question][5]) if order is False else True)
-                    and all_rows[question][2] != "Yes" and int(all_rows[question][6]) > 0):
-                question_names.append(all_rows[question][0])
-                question_descriptions.append(all_rows[question][5])
-                test_cases.append(all_rows[question][7])
+        # Premium questions, questions without test cases and, unless order is set, questions asking for results in
+        # any order are filtered out by the converted database
+        for question in iter_questions(excel_file_name, 'leetcode', order, start, difficulty, topics):
+            question_names.append(question.name)
+            question_descriptions.append(question.description)
+            test_cases.append(question.test_cases)
     else:
         print("Could not find the given file path!")
     print("Fetched ", len(question_names), " questions.\n")
     return question_names, question_descriptions, test_cases
 
 
-def safe_eval(expression):
-    """Safely evaluate mathematical expressions and literals."""
-    ALLOWED_TYPES = {"int": int, "float": float, "str": str, "bool": bool, "list": list, "tuple": tuple, "dict": dict,
-                     "set": set}
-    expression = expression.strip()
-    if expression in ALLOWED_TYPES:
-        return ALLOWED_TYPES[expression]
-    try:
-        return ast.literal_eval(expression)
-    except (SyntaxError, ValueError):
-        return eval(expression, {"__builtins__": {}}, {})
-
-
-def convert_assertions_to_test_cases(test_list):
-    test_cases = []
-    pattern = re.compile(r"assert\s+(\w+)\((.*?)\)\s*==\s*(.+)")
-
-    for assertion in test_list:
-        match = pattern.match(assertion)
-        if match:
-            function_name, args, expected_output = match.groups()
-            parsed_output = safe_eval(expected_output)
-            parsed_args = safe_eval(f'({args})')
-            parsed_args = parsed_args if isinstance(parsed_args, tuple) else (parsed_args,)
-            test_cases.append({
-                "Input": parsed_args if len(parsed_args) > 1 else parsed_args[0],
-                "Output": parsed_output
-            })
-    return test_cases
-
-
 def fetch_mbpp_details(jsonl_file_name, order, start=1):
-    """ This function reads the LeetCode JSONL file and fetches the data. """
-    jsonl_file_path = jsonl_file_name
+    """ This function reads the MBPP JSONL file and fetches the data. """
     question_names = []
     question_descriptions = []
     test_cases = []
 
-    if os_module.path.exists(jsonl_file_path):
+    if os_module.path.exists(jsonl_file_name):
         print("Fetching question details...")
-
-        with open(jsonl_file_path, 'r', encoding='utf-8') as file:
-            all_rows = [json.loads(line) for line in file]
-
-        for question in range(start, len(all_rows)):
-            row = all_rows[question]
-            # Ensure required fields are present and valid
-            if (row.get("task_id") and row.get("text") and row.get("test_list")
-                    and ('in any order' not in str(row["text"]) if order is False else True)):
-                question_names.append(row["task_id"])
-                question_descriptions.append(row["text"])
-                # Needed as the assertions use different function names to call
-                test_case = convert_assertions_to_test_cases(test for test in row["test_list"])
-                test_cases.append(test_case)
+        for question in iter_questions(jsonl_file_name, 'mbpp', order, start):
+            question_names.append(question.name)
+            question_descriptions.append(question.description)
+            test_cases.append(question.test_cases)
     else:
         print("Could not find the given file path!")
 
@@ -301,113 +554,112 @@ def fetch_mbpp_details(jsonl_file_name, order, start=1):
     return question_names, question_descriptions, test_cases
 
 
-def conditional_sleep(model, seconds):
-    # Sleep only if the model is Gemini.
-    if "gemini" in model.lower():
-        time_module.sleep(seconds)
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Model selection.")
-    parser.add_argument("model", help="The LLM model to query")
-    parser.add_argument("-k", "--api_key", help="API Key")
-    parser.add_argument("-d", "--data_by", help="Data is given by user or leetcode or mbpp")
-    parser.add_argument("-o", "--order", action="store_true", help="Test questions which return solutions in any order")
-    args = parser.parse_args()
-
-    if (args.data_by).lower() == 'user':
-        #Ask for question description and test cases
-        all_question_names = ["User Question"]
-        all_question_descriptions = [input("Please enter the question description: ")]
-        all_test_cases = []
-        while True:
-            test_input = input("Enter the test case Input: ")
-            test_output = input("Enter the test case Output: ")
-            all_test_cases.append({'Input': testCaseParser.safe_literal_eval(test_input)[1],
-                                   'Output': testCaseParser.safe_literal_eval(test_output)[1]})
-            more_tests = input("Do you want to add another test case? (yes/no): ").strip().lower()
-            if more_tests not in ['yes', 'y']:
-                break
-    elif (args.data_by).lower() == 'mbpp':
-        #Ask for the path of the question file and start
-        questions_file = input("Please enter the path for the MBPP data file: ")
-        start = input("Please enter the starting question number: ")
-        all_question_names, all_question_descriptions, all_test_cases = fetch_mbpp_details(questions_file,
-                                                                                               args.order, int(start))
+def solve_question(args, question_name, question_description, test_cases, llm_slots, sandbox, start_time,
+                   total_iterations=11, journal=None, results_store=None, comparators=None, verdict_cache=None):
+    """ Runs the repair loop of a single question and appends its results to the CSV file. """
+    assistant = SolutionAssistant(args.model, args.api_key if args.api_key else None, args.order, llm_slots,
+                                  sandbox, args.base_url,
+                                  get_response_cache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None,
+                                  args.candidates, args.history, args.history_turns, args.token_budget, args.stream,
+                                  comparators, verdict_cache, args.all_tests, args.max_failures, args.test_budget,
+                                  args.profile)
+
+    ques_start_time = time_module.time()
+    solution_found = False
+    iteration_state = constants.GET_MODEL_RESPONSE
+    iteration_count = 0
+    test_case_failed_number = 0
+    max_tries = 0 # Tries are to limit querying for responses that can not be saved.
+    response = None
+    verdict = None  # verdict of an equivalent solution tested before
+    candidate_verdict = None  # verdict of the selected candidate, tested when the candidates were compared
+
+    checkpoint = journal.get(question_name) if journal else None
+    if checkpoint:
+        # Continue a partially repaired question from its last journaled state
+        assistant.log_to_file("Resuming ", question_name, " at iteration ", checkpoint['Iteration Count'])
+        assistant.message = checkpoint['Messages']
+        assistant.question_data = checkpoint['Question Data']
+        ques_start_time -= checkpoint['Elapsed']
+        solution_found = checkpoint['Solution Found']
+        iteration_state = checkpoint['State']
+        iteration_count = checkpoint['Iteration Count']
+        test_case_failed_number = checkpoint['Test Case Failed Number']
+        max_tries = checkpoint['Max Tries']
+        response = checkpoint['Response']
     else:
-        #Ask for the path of the question file and start
-        questions_file = input("Please enter the path for the LeetCode data file: ")
-        start = input("Please enter the starting question number: ")
-        all_question_names, all_question_descriptions, all_test_cases = fetch_leetcode_details(questions_file,
-                                                                                               args.order, int(start))
-
-    start_time = time_module.time()
-    # total_iterations can be modified. Should be at least one more than test cases number
-    total_iterations = 11
-
-    for i in range(0, len(all_question_names)):
-        assistant = SolutionAssistant(args.model, args.api_key if args.api_key else None, args.order)
-
-        ques_start_time = time_module.time()
-        solution_found = False
-        iteration_state = constants.GET_MODEL_RESPONSE
-        iteration_count = 0
-        test_case_failed_number = 0
-        max_tries = 0 # Tries are to limit querying for responses that can not be saved.
-
         # fetch details of a question
-        question_name = str(all_question_names[i])
-        question_description = all_question_descriptions[i]
-        test_cases = all_test_cases[i] if (args.data_by).lower() != 'user' else all_test_cases
         assistant.question_data['Question Name'].append(question_name)
         assistant.question_data['Question Description'].append(question_description)
 
-        while iteration_count <= total_iterations and not solution_found and max_tries < 10:
-            iteration_start_time = time_module.time()
-            feedback = None
-            if iteration_state == constants.GET_MODEL_RESPONSE:
-                # Generate a solution and save it
-                conditional_sleep(assistant.model, 5)
-                assistant.log_to_file("\nAsking the model for a response Python solution for : ", question_name)
-                initial_message = constants.INITIAL_MESSAGE
-                if assistant.model == "o1-mini":
-                    assistant.message.append(
-                        {"role": "user", "content": initial_message})  # as there is no system message for this model
-                else:
-                    assistant.message.append({"role": "system", "content": initial_message})
-                assistant.message.append({"role": "user", "content": question_description})
-                assistant.question_data['Prompt List'][0].append(initial_message + " " + question_description)
-                response = assistant.get_llm_response()
+    while iteration_count <= total_iterations and not solution_found and max_tries < 10:
+        iteration_start_time = time_module.time()
+        assistant.log_context = {'question': question_name, 'iteration': iteration_count}
+        feedback = None
+        if iteration_state == constants.GET_MODEL_RESPONSE:
+            # Generate a solution and save it
+            assistant.log_to_file("\nAsking the model for a response Python solution for : ", question_name)
+            initial_message = constants.INITIAL_MESSAGE
+            if assistant.model == "o1-mini":
+                assistant.message.append(
+                    {"role": "user", "content": initial_message})  # as there is no system message for this model
+            else:
+                assistant.message.append({"role": "system", "content": initial_message})
+            assistant.message.append({"role": "user", "content": question_description})
+            assistant.question_data['Prompt List'][0].append(initial_message + " " + question_description)
+            response, candidate_verdict = assistant.get_best_response(test_cases, question_description,
+                                                                      (args.data_by).lower())
+
+            if not response:
+                max_tries += 1
+                feedback = constants.NO_SOLUTION
+                assistant.log_to_file(feedback)
+                iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
+                assistant.question_data['Error List'][0].append(feedback)
+            else:
+                if "```python" in response:
+                    response = assistant.extract_python_code(response)
 
-                if not response:
+                assistant.log_to_file("LLM response python solution:\n", response)
+                assistant.message.append({"role": "assistant", "content": response})
+                # Equivalent solutions tested before are saved but neither compiled nor tested again
+                verdict = assistant.lookup_verdict(response, test_cases, question_description, (args.data_by).lower())
+                assistant.log_to_file("Saving the solution")
+                saved, error = assistant.save_code(response, question_name, iteration_count)
+                if saved:
+                    iteration_state = constants.TEST_CODE if verdict else constants.COMPILE_CODE
+                    iteration_count += 1
+                    assistant.log_to_file("Iteration state changed: ", iteration_state)
+                else:
                     max_tries += 1
-                    feedback = constants.NO_SOLUTION
+                    feedback = constants.SAVE_ERROR + error
                     assistant.log_to_file(feedback)
                     iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
                     assistant.question_data['Error List'][0].append(feedback)
-                else:
-                    if "```python" in response:
-                        response = assistant.extract_python_code(response)
-
-                    assistant.log_to_file("LLM response python solution:\n", response)
-                    assistant.message.append({"role": "assistant", "content": response})
-                    assistant.log_to_file("Saving the solution")
-                    saved, error = assistant.save_code(response, question_name, iteration_count)
-                    if saved:
-                        iteration_state = constants.COMPILE_CODE
-                        iteration_count += 1
-                        assistant.log_to_file("Iteration state changed: ", iteration_state)
-                    else:
-                        max_tries += 1
-                        feedback = constants.SAVE_ERROR + error
-                        assistant.log_to_file(feedback)
-                        iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
-                        assistant.question_data['Error List'][0].append(feedback)
 
-            if iteration_state == constants.COMPILE_CODE:
-                assistant.log_to_file('\nCompiling the solution')
+        if iteration_state == constants.COMPILE_CODE:
+            assistant.log_to_file('\nCompiling the solution')
+            # Reject missing functions, wrong arity and banned constructs without installing or running anything
+            try:
+                calls = assistant.build_calls(test_cases, (args.data_by).lower())[1]
+            except Exception:  # test cases that can not be parsed are reported by test_code
+                calls = None
+            feedback = screen(response, calls)
+            if feedback is not None:
+                iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
+                assistant.log_to_file(feedback)
+                # Syntax errors are recorded like the compile failures they used to be
+                assistant.question_data['Error List'][0].append(
+                    "Failed to compile!" if analyze(response)['Syntax Error'] is not None else feedback)
+            else:
                 # Check for code compilation and other errors. First install uninstalled libraries.
-                imports_install_message, installed = install_imports(response, args.model)
+                # pip must not run twice at the same time, so installs are serialized across workers.
+                with install_lock:
+                    imports_install_message, installed = install_imports(response, args.model)
                 assistant.log_to_file(imports_install_message)
+                if imports_install_message == "Installed new imports successfully!":
+                    # The candidates were tested before the modules were installed, so their verdict is stale
+                    candidate_verdict = None
                 if installed:
                     code_output, feedback = assistant.compile_code(response)
                     if code_output == "Failed to compile!":
@@ -423,72 +675,203 @@ if __name__ == "__main__":
                     feedback = "The previous solution gives the following error: " + imports_install_message
                     assistant.question_data['Error List'][0].append(feedback)
 
-            if iteration_state == constants.TEST_CODE:
-                assistant.log_to_file('\nTesting the solution')
-                all_test_cases_pass, test_case_failed, test_case_feedback = assistant.test_code(response, test_cases,
-                                                                            question_description, (args.data_by).lower())
-                # csv variable
-                assistant.question_data['Tests Failed List'][0].append(test_case_failed)
-                assistant.question_data['Error List'][0].append(test_case_feedback)
-                if all_test_cases_pass:
-                    solution_found = True
-                elif iteration_count == total_iterations:  # no solution found by llm
-                    feedback = test_case_feedback
-                    test_case_failed_number = test_case_failed
-                    break
-                else:  # Failed to pass a test case. Move to next iteration.
-                    iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
-                    feedback = test_case_feedback
-                    test_case_failed_number = test_case_failed
-
-            if iteration_state == constants.UPDATE_QUESTION_DESCRIPTION and iteration_count < total_iterations:
-                assistant.message.append({"role": "user", "content": feedback})
-                assistant.question_data['Prompt List'][0].append(feedback)
-                assistant.log_to_file("Updated the prompt to include : ", feedback)
-                conditional_sleep(assistant.model, 15)
-
-                response = assistant.get_llm_response()
-                assistant.log_to_file("Updated LLM response. Python solution:\n", response)
-                assistant.message.append({"role": "assistant", "content": response})
-                if response:
-                    if "```python" in response:
-                        response = assistant.extract_python_code(response)
-                    assistant.log_to_file("Saving the updated solution")
-                    saved, error = assistant.save_code(response, question_name, iteration_count)
-                    if saved:
-                        iteration_state = constants.COMPILE_CODE
-                        iteration_count += 1
-                        assistant.log_to_file("Iteration state changed: ", iteration_state)
-                    else:
-                        max_tries += 1
-                        feedback = constants.SAVE_ERROR + error
-                        assistant.log_to_file(feedback)
-                        iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
-                        assistant.question_data['Error List'][0].append(feedback)
+        if iteration_state == constants.TEST_CODE:
+            assistant.log_to_file('\nTesting the solution')
+            assistant.question_data['Dedup Hit List'][0].append(verdict is not None)
+            if verdict is None:
+                verdict = candidate_verdict if candidate_verdict is not None else assistant.test_code(
+                    response, test_cases, question_description, (args.data_by).lower())
+                assistant.record_verdict(response, test_cases, question_description, (args.data_by).lower(), verdict)
+            all_test_cases_pass, test_case_failed, test_case_feedback = verdict
+            verdict = candidate_verdict = None
+            # csv variable
+            assistant.question_data['Tests Failed List'][0].append(test_case_failed)
+            assistant.question_data['Error List'][0].append(test_case_feedback)
+            if all_test_cases_pass:
+                solution_found = True
+            elif iteration_count == total_iterations:  # no solution found by llm
+                feedback = test_case_feedback
+                test_case_failed_number = test_case_failed
+                break
+            else:  # Failed to pass a test case. Move to next iteration.
+                iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
+                feedback = test_case_feedback
+                test_case_failed_number = test_case_failed
+
+        if iteration_state == constants.UPDATE_QUESTION_DESCRIPTION and iteration_count < total_iterations:
+            assistant.message.append({"role": "user", "content": feedback})
+            assistant.question_data['Prompt List'][0].append(feedback)
+            assistant.log_to_file("Updated the prompt to include : ", feedback)
+
+            response, candidate_verdict = assistant.get_best_response(test_cases, question_description,
+                                                                      (args.data_by).lower())
+            assistant.log_to_file("Updated LLM response. Python solution:\n", response)
+            assistant.message.append({"role": "assistant", "content": response})
+            if response:
+                if "```python" in response:
+                    response = assistant.extract_python_code(response)
+                verdict = assistant.lookup_verdict(response, test_cases, question_description, (args.data_by).lower())
+                assistant.log_to_file("Saving the updated solution")
+                saved, error = assistant.save_code(response, question_name, iteration_count)
+                if saved:
+                    iteration_state = constants.TEST_CODE if verdict else constants.COMPILE_CODE
+                    iteration_count += 1
+                    assistant.log_to_file("Iteration state changed: ", iteration_state)
                 else:
                     max_tries += 1
-                    feedback = constants.NO_SOLUTION
+                    feedback = constants.SAVE_ERROR + error
                     assistant.log_to_file(feedback)
                     iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
                     assistant.question_data['Error List'][0].append(feedback)
-            if iteration_state == constants.UPDATE_QUESTION_DESCRIPTION and iteration_count >= total_iterations:
-                break
-            if iteration_start_time:
-                assistant.question_data['Time Req'][0].append(time_module.time() - iteration_start_time)
-
-        if iteration_count <= total_iterations:
-            if solution_found:
-                assistant.question_data['Solved'] = ['Yes']
-                assistant.question_data['Iteration Solved'] = [iteration_count]
-                assistant.log_to_file("LLM found a solution for problem " + question_name + " in " + str(
-                    iteration_count) + " iterations!")
             else:
-                assistant.question_data['Solved'] = ['No']
-                assistant.question_data['Iteration Solved'] = [iteration_count]
-                assistant.log_to_file("LLM could not find a solution for problem " + question_name + " !")
+                max_tries += 1
+                feedback = constants.NO_SOLUTION
+                assistant.log_to_file(feedback)
+                iteration_state = constants.UPDATE_QUESTION_DESCRIPTION
+                assistant.question_data['Error List'][0].append(feedback)
+        if iteration_state == constants.UPDATE_QUESTION_DESCRIPTION and iteration_count >= total_iterations:
+            break
+        if iteration_start_time:
+            assistant.question_data['Time Req'][0].append(time_module.time() - iteration_start_time)
+        if journal:
+            journal.record(question_name, assistant, **{
+                'State': iteration_state, 'Iteration Count': iteration_count, 'Max Tries': max_tries,
+                'Solution Found': solution_found, 'Test Case Failed Number': test_case_failed_number,
+                'Response': response, 'Elapsed': time_module.time() - ques_start_time})
+
+    if iteration_count <= total_iterations:
+        if solution_found:
+            assistant.question_data['Solved'] = ['Yes']
+            assistant.question_data['Iteration Solved'] = [iteration_count]
+            assistant.log_to_file("LLM found a solution for problem " + question_name + " in " + str(
+                iteration_count) + " iterations!")
+        else:
+            assistant.question_data['Solved'] = ['No']
+            assistant.question_data['Iteration Solved'] = [iteration_count]
+            assistant.log_to_file("LLM could not find a solution for problem " + question_name + " !")
+
+    assistant.question_data['Total Time Req'].append(time_module.time() - ques_start_time)
+    # The question is only marked complete once its results are on disk
+    assistant.save_results(results_store, (lambda: journal.complete(question_name)) if journal else None)
 
-        assistant.question_data['Total Time Req'].append(time_module.time() - ques_start_time)
-        assistant.save_results_to_csv()
+    assistant.log_to_file("Total time required : ", str(time_module.time() - start_time))
+    return solution_found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model selection.")
+    parser.add_argument("model", help="The LLM model to query")
+    parser.add_argument("-k", "--api_key", help="API Key")
+    parser.add_argument("-d", "--data_by", help="Data is given by user or leetcode or mbpp")
+    parser.add_argument("-o", "--order", action="store_true", help="Test questions which return solutions in any order")
+    parser.add_argument("-b", "--base_url", help="Override the chat completions endpoint, e.g. a local mock server")
+    parser.add_argument("--rpm", type=int, help="Requests per minute allowed for the model (defaults to its known quota)")
+    parser.add_argument("--tpm", type=int, help="Tokens per minute allowed for the model (defaults to its known quota)")
+    parser.add_argument("-c", "--cache", nargs="?", const="LLMResponseCache.sqlite",
+                        help="Replay identical LLM requests from this response cache file")
+    parser.add_argument("--cache_size", type=int, default=1024, help="Maximum size of the response cache in MB")
+    parser.add_argument("-v", "--verdicts", nargs="?", const="VerdictCache.sqlite",
+                        help="Reuse the verdicts of equivalent solutions tested before, stored in this file")
+    parser.add_argument("-n", "--candidates", type=int, default=1,
+                        help="Candidate solutions requested per LLM call. The best one after testing is kept")
+    parser.add_argument("--history", choices=HISTORY_STRATEGIES, default='full',
+                        help="Conversation history sent on repair iterations: everything, the last turns, only the "
+                             "latest code with the accumulated failing cases, or a summary of older turns")
+    parser.add_argument("--history_turns", type=int, default=2, help="Recent turns kept by the last_k and summarize "
+                                                                        "history strategies")
+    parser.add_argument("--token_budget", type=int, help="Maximum prompt tokens sent to the model")
+    parser.add_argument("-s", "--stream", action="store_true",
+                        help="Stream responses and stop reading once a complete function was emitted (single candidate only)")
+    parser.add_argument("-r", "--resume", action="store_true",
+                        help="Skip questions completed by an earlier run and continue partially repaired ones")
+    parser.add_argument("--checkpoint", help="Checkpoint journal file (defaults to Checkpoint_<model>.jsonl)")
+    parser.add_argument("--results", choices=['csv', 'sqlite'], default='csv',
+                        help="Write results to ResponseList_<model>.csv or to the typed ResponseList_<model>.sqlite store")
+    parser.add_argument("--log_format", choices=['text', 'json'], default='text',
+                        help="Write the response log as plain text or as JSON records with question and iteration")
+    parser.add_argument("--difficulty", nargs="+", help="Only solve LeetCode questions of these difficulties")
+    parser.add_argument("--topics", nargs="+", help="Only solve LeetCode questions that have all of these topics")
+    parser.add_argument("-p", "--parsed_tests", help="LeetCode test cases parsed ahead of time by testCaseParser.py")
+    parser.add_argument("--comparators", help="JSON file mapping question names to the comparator of their outputs, "
+                                              "e.g. {\"Group Anagrams\": \"nested\"}")
+    parser.add_argument("--allow_list", help="File of the only modules that may be installed, installed up front")
+    parser.add_argument("--wheelhouse", help="Install modules from this directory of wheels instead of the package index")
+    parser.add_argument("-a", "--all_tests", action="store_true",
+                        help="Run all test cases in parallel and report several failures in one feedback")
+    parser.add_argument("--max_failures", type=int, default=3, help="Failures reported per feedback with -a")
+    parser.add_argument("--test_budget", type=float, default=60,
+                        help="Seconds all test cases of a solution may take together with -a")
+    parser.add_argument("--profile", action="store_true",
+                        help="Measure every test and send correct solutions back if they are too slow on scaled-up inputs")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of questions repaired concurrently")
+    parser.add_argument("--llm_concurrency", type=int, help="Maximum in-flight LLM requests (defaults to --workers)")
+    parser.add_argument("--test_concurrency", type=int, default=os_module.cpu_count() or 1,
+                        help="Number of sandbox processes compiling or testing solutions at the same time")
+    parser.add_argument("--memory_limit", type=int, default=2048, help="Memory limit of each sandbox process in MB")
+    args = parser.parse_args()
+    get_log_writer(structured=args.log_format == 'json')
 
-        assistant.log_to_file("Total time required : ", str(time_module.time() - start_time))
-        conditional_sleep(assistant.model, 20)
+    if (args.data_by).lower() == 'user':
+        #Ask for question description and test cases
+        all_question_names = ["User Question"]
+        all_question_descriptions = [input("Please enter the question description: ")]
+        all_test_cases = []
+        while True:
+            test_input = input("Enter the test case Input: ")
+            test_output = input("Enter the test case Output: ")
+            all_test_cases.append({'Input': testCaseParser.safe_literal_eval(test_input)[1],
+                                   'Output': testCaseParser.safe_literal_eval(test_output)[1]})
+            more_tests = input("Do you want to add another test case? (yes/no): ").strip().lower()
+            if more_tests not in ['yes', 'y']:
+                break
+    elif (args.data_by).lower() == 'mbpp':
+        #Ask for the path of the question file and start
+        questions_file = input("Please enter the path for the MBPP data file: ")
+        start = input("Please enter the starting question number: ")
+        all_question_names, all_question_descriptions, all_test_cases = fetch_mbpp_details(questions_file,
+                                                                                               args.order, int(start))
+    else:
+        #Ask for the path of the question file and start
+        questions_file = input("Please enter the path for the LeetCode data file: ")
+        start = input("Please enter the starting question number: ")
+        all_question_names, all_question_descriptions, all_test_cases = fetch_leetcode_details(questions_file,
+                                                                                               args.order, int(start),
+                                                                                               args.difficulty,
+                                                                                               args.topics)
+        if args.parsed_tests:
+            print(f"Loaded parsed test cases of {testCaseParser.load_parsed_test_cases(args.parsed_tests)} questions.")
+
+    get_rate_limiter(args.model, args.rpm, args.tpm)
+    configure_imports(args.allow_list, args.wheelhouse)
+    start_time = time_module.time()
+    # total_iterations can be modified. Should be at least one more than test cases number
+    total_iterations = 11
+    # LLM calls are I/O bound and test execution is CPU bound, so both are limited independently of the workers.
+    llm_slots = threading.BoundedSemaphore(args.llm_concurrency or args.workers)
+    sandbox = get_sandbox_pool(args.test_concurrency, args.memory_limit)
+    journal = CheckpointJournal(args.checkpoint or f"Checkpoint_{args.model}.jsonl", args.resume)
+    results_store = ResultsStore(f"ResponseList_{args.model}.sqlite", args.model) if args.results == 'sqlite' else None
+    comparators = load_overrides(args.comparators) if args.comparators else None
+    verdict_cache = get_verdict_cache(args.verdicts) if args.verdicts else None
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(solve_question, args, str(all_question_names[i]), all_question_descriptions[i],
+                                   all_test_cases[i] if (args.data_by).lower() != 'user' else all_test_cases,
+                                   llm_slots, sandbox, start_time, total_iterations, journal, results_store,
+                                   comparators, verdict_cache)
+                   for i in range(0, len(all_question_names))
+                   if not journal.is_completed(str(all_question_names[i]))]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception:
+                traceback.print_exc()
+    sandbox.close()
+    if results_store:
+        results_store.close()
+    journal.close()
+    print(get_client_pool().report())
+    if args.cache:
+        print(get_response_cache(args.cache).report())
+    if verdict_cache:
+        print(verdict_cache.report())
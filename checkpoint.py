@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+
+
+def _encode(value):
+    """ Tags tuples and sets, which JSON would turn into lists, so that they are restored with their type. """
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    return value
+
+
+def _decode(record):
+    if len(record) == 1 and '__tuple__' in record:
+        return tuple(record['__tuple__'])
+    if len(record) == 1 and '__set__' in record:
+        return set(record['__set__'])
+    return record
+
+
+def _appended_lists(question_data):
+    """ Returns the lengths of the columns of question data that only grow, those holding a single list. """
+    return {key: len(value[0]) for key, value in question_data.items()
+            if isinstance(value, list) and len(value) == 1 and isinstance(value[0], list)}
+
+
+class CheckpointJournal:
+    """Append-only JSONL journal of the repair loop state of every question, used to resume interrupted runs."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.states = self.load() if resume and os.path.exists(path) else {}
+        # Number of messages, and of entries of each growing question data column, already written to the journal
+        self.offsets = {name: len(state['Messages']) for name, state in self.states.items()}
+        self.data_offsets = {name: _appended_lists(state.get('Question Data', {}))
+                             for name, state in self.states.items()}
+        self.file = open(path, 'a', encoding="utf-8")
+        if self.file.tell() > 0:
+            with open(path, 'rb') as journal:
+                journal.seek(-1, os.SEEK_END)
+                if journal.read(1) != b"\n":  # terminate a record cut short by a crash
+                    self.file.write("\n")
+        if not resume:
+            # Earlier runs are kept in the file but ignored when this run is resumed
+            self._write({'Event': 'Reset', 'Time': time.time()})
+
+    def load(self):
+        """ Replays the journal into the latest state of each question. """
+        states = {}
+        with open(self.path, 'r', encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line, object_hook=_decode)
+                except json.JSONDecodeError:  # a record cut short by a crash
+                    continue
+                if record['Event'] == 'Reset':
+                    states = {}
+                elif record['Event'] == 'Completed':
+                    states.setdefault(record['Question Name'], {'Messages': []})['Completed'] = True
+                elif record['Event'] == 'Transition':
+                    state = states.setdefault(record['Question Name'], {'Messages': []})
+                    messages = state['Messages'][:record.pop('Message Offset')] + record.pop('Messages')
+                    question_data = dict(state.get('Question Data', {}))
+                    data_offsets = record.pop('Question Data Offsets', {})
+                    for key, value in record.pop('Question Data').items():
+                        if key in data_offsets:
+                            value = [question_data.get(key, [[]])[0][:data_offsets[key]] + value]
+                        question_data[key] = value
+                    state.update(record, Messages=messages)
+                    state['Question Data'] = question_data
+        return states
+
+    def _write(self, record):
+        line = json.dumps(_encode(record), default=repr, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def record(self, question_name, assistant, **state):
+        """ Journals the loop state of a question together with the messages and question data entries added since
+        its last record. """
+        offset = min(self.offsets.get(question_name, 0), len(assistant.message))
+        journaled = self.data_offsets.get(question_name, {})
+        lengths = _appended_lists(assistant.question_data)
+        data_offsets = {key: min(journaled.get(key, 0), length) for key, length in lengths.items()}
+        question_data = {key: value[0][data_offsets[key]:] if key in lengths else value
+                         for key, value in assistant.question_data.items()}
+        self._write({'Event': 'Transition', 'Question Name': question_name, 'Time': time.time(),
+                     'Message Offset': offset, 'Messages': assistant.message[offset:],
+                     'Question Data Offsets': data_offsets, 'Question Data': question_data, **state})
+        self.offsets[question_name] = len(assistant.message)
+        self.data_offsets[question_name] = lengths
+
+    def complete(self, question_name):
+        """ Marks a question as finished so that resumed runs skip it. """
+        self._write({'Event': 'Completed', 'Question Name': question_name, 'Time': time.time()})
+
+    def is_completed(self, question_name):
+        return self.states.get(question_name, {}).get('Completed', False)
+
+    def get(self, question_name):
+        """ Returns the journaled state of a partially repaired question, or None. """
+        state = self.states.get(question_name)
+        if not state or state.get('Completed') or 'State' not in state:
+            return None
+        return state
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,75 @@
+import ast
+import re
+
+FENCED_CODE = re.compile(r"```python\n(.*?)```", re.DOTALL)
+
+
+def _parses(code):
+    try:
+        ast.parse(code)
+        return True
+    except SyntaxError:
+        return False
+
+
+# What a line that only starts a statement needs to parse: a body, the function under a decorator, the handler of a
+# 'try:', or the statement a clause like 'else:', 'elif x:', 'except E:' or 'finally:' belongs to
+_COMPLETIONS = ("{}", "{}\n    pass", "{}\ndef _(): pass", "{}\n    pass\nexcept:\n    pass",
+                "if 1:\n    pass\n{}\n    pass", "try:\n    pass\n{}\n    pass")
+# Lines ending in an open bracket, a comma or a backslash continue on the next line
+_CONTINUED = ("(", "[", "{", ",", "\\")
+
+
+def _is_python_line(line):
+    """ Checks if a top-level line can start a Python statement, including block headers like 'for x in y:',
+    decorators, the clauses of compound statements and statements continued on the next line. """
+    if line.rstrip().endswith(_CONTINUED) or '"""' in line or "'''" in line:
+        return True
+    return any(_parses(completion.format(line)) for completion in _COMPLETIONS)
+
+
+def _has_function(code):
+    return any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+               for node in ast.parse(code).body)
+
+
+class StreamMonitor:
+    """Watches a streamed response and tells when the code in it is complete or the response should be aborted."""
+
+    def __init__(self, max_chars=20000, prose_chars=8000):
+        self.max_chars = max_chars
+        self.prose_chars = prose_chars
+        self.text = ""
+        self.checked_lines = 0
+        self.code = None
+
+    def feed(self, delta):
+        """ Adds a streamed chunk. Returns 'completed', 'runaway' or 'prose' once the stream can stop, else None. """
+        self.text += delta
+        if len(self.text) > self.max_chars:
+            return 'runaway'
+        # Responses often explain the approach before the code, so an opened code block is never prose
+        if len(self.text) > self.prose_chars and "```" not in self.text and "def " not in self.text \
+                and "class " not in self.text:
+            return 'prose'
+        if "`" in delta:
+            fenced = FENCED_CODE.search(self.text)
+            if fenced:
+                self.code = fenced.group(1)
+                return 'completed'
+        if "\n" in delta and "```" not in self.text:
+            return self._check_lines()
+        return None
+
+    def _check_lines(self):
+        """ Detects a complete top-level function followed by a line that is not Python, e.g. an explanation. """
+        lines = self.text.split("\n")[:-1]  # the last line may still be incomplete
+        for index in range(max(self.checked_lines, 1), len(lines)):
+            line = lines[index]
+            if line.strip() and not line[0].isspace() and not _is_python_line(line):
+                code = "\n".join(lines[:index]).strip()
+                if _parses(code) and _has_function(code):
+                    self.code = code
+                    return 'completed'
+        self.checked_lines = len(lines)
+        return None
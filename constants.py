@@ -18,4 +18,22 @@ SYNTAX_ERROR = "The previous solution failed to compile. Can you please generate
 COMPILE_TIME_ERROR = "Code could not be compiled within and was terminated. Possibly due to an infinite loop or order of the results. Please modify the code accordingly."
 
 FUNCTION_ERROR = ("Please modify the code. No function found in the solution. You should return a code with a function written in "
-                    "Python that solves the problem.")
\ No newline at end of file
+                    "Python that solves the problem.")
+
+ARITY_ERROR = ("Please modify the code. The function {function} takes {expected} arguments but the test cases call it with "
+               "{given} arguments, e.g. {arguments}. Declare function variables as stated in the question and in the same order.")
+
+NESTED_FUNCTION_ERROR = ("Please modify the code. The function {function} is not defined at the top level of the solution. "
+                         "Write the solution as a single top-level function, not as a method or a nested function.")
+
+BANNED_CONSTRUCT_ERROR = ("Please modify the code. The solution uses {constructs}, which is not allowed. Do not read input, "
+                          "exit the program or start processes. Return the result from the function instead.")
+
+TIME_LIMIT_EXCEEDED = "exceeded the time limit"
+
+TOO_SLOW_ERROR = ("Please modify the code. The previous solution returns correct results but is too slow for the input sizes "
+                  "allowed by the question: {details} Use a more efficient algorithm with a lower time complexity.")
+
+OUT_OF_MEMORY_ERROR = ("Please modify the code. The previous solution returns correct results but runs out of memory or "
+                       "crashes on an input of about {size} elements, which the question allows. Use an algorithm that "
+                       "needs less memory.")
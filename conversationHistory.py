@@ -0,0 +1,117 @@
+try:
+    import tiktoken
+except ImportError:  # fall back to a character based estimate
+    tiktoken = None
+
+HISTORY_STRATEGIES = ['full', 'last_k', 'latest_code', 'summarize']
+# The instruction message and the question description are always sent
+PREFIX_LENGTH = 2
+SUMMARY_LINE_LENGTH = 300
+
+_encodings = {}
+
+
+def get_encoding(model):
+    """ Returns the tiktoken encoding of a model, or None when tiktoken is not installed or the encoding can not be
+    loaded. """
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:  # models unknown to tiktoken, e.g. Gemini
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception:  # the encoding files are downloaded on first use, which fails offline or behind a proxy
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(messages, model):
+    """ Counts the prompt tokens of a message list. """
+    total = 0
+    for message in messages:
+        # Every message carries a few tokens of role and separator overhead
+        total += 4 + count_text_tokens(message.get("content") or "", model)
+    return total + 2
+
+
+def count_text_tokens(text, model):
+    """ Counts the tokens of a single text. """
+    encoding = get_encoding(model)
+    return len(encoding.encode(text)) if encoding else len(text) // 4 + 1
+
+
+def _turns(messages):
+    """ Splits the messages after the prefix into (assistant solution, user feedback) turns. """
+    turns, current = [], []
+    for message in messages[PREFIX_LENGTH:]:
+        if message["role"] == "assistant" and current:
+            turns.append(current)
+            current = []
+        current.append(message)
+    if current:
+        turns.append(current)
+    return turns
+
+
+def _summarize(turns):
+    """ Condenses older turns into one user message listing the feedback they received. """
+    lines = []
+    for number, turn in enumerate(turns, start=1):
+        for message in turn:
+            if message["role"] == "user" and message.get("content"):
+                lines.append(f"Attempt {number}: {' '.join(message['content'].split())[:SUMMARY_LINE_LENGTH]}")
+    if not lines:
+        return []
+    return [{"role": "user", "content": "Earlier solutions were rejected with the following feedback:\n" + "\n".join(lines)}]
+
+
+def _failing_cases(turns):
+    """ Collects the distinct feedback of older turns, which contains their failing test cases and errors. """
+    feedback = []
+    for turn in turns:
+        for message in turn:
+            content = message.get("content")
+            if message["role"] == "user" and content and content not in feedback:
+                feedback.append(content)
+    if not feedback:
+        return []
+    return [{"role": "user", "content": "Previous solutions also failed on the following, make sure they pass:\n"
+                                        + "\n".join(feedback)}]
+
+
+def _fit_budget(prefix, body, token_budget, model):
+    """ Drops the oldest body messages, then truncates the longest message, until the prompt fits the budget. """
+    while body and count_tokens(prefix + body, model) > token_budget and len(body) > 2:
+        body = body[1:]
+    messages = [dict(message) for message in prefix + body]
+    excess = count_tokens(messages, model) - token_budget
+    while excess > 0:
+        longest = max(messages, key=lambda message: len(message.get("content") or ""))
+        content = longest.get("content") or ""
+        if not content:
+            break
+        # Remove roughly four characters per excess token, at least a tenth of the message per pass
+        longest["content"] = content[:max(0, len(content) - max(excess * 4, len(content) // 10))]
+        excess = count_tokens(messages, model) - token_budget
+    return messages
+
+
+def compact_messages(messages, strategy='full', keep_turns=2, token_budget=None, model="gpt-4o"):
+    """ Returns the messages to send for the given history strategy and token budget. """
+    prefix = messages[:PREFIX_LENGTH]
+    turns = _turns(messages)
+    recent = turns[-keep_turns:] if keep_turns > 0 else []
+    older = turns[:len(turns) - len(recent)]
+    if strategy == 'last_k':
+        body = [message for turn in recent for message in turn]
+    elif strategy == 'latest_code':
+        body = _failing_cases(turns[:-1]) + (turns[-1] if turns else [])
+    elif strategy == 'summarize':
+        body = _summarize(older) + [message for turn in recent for message in turn]
+    else:
+        body = messages[PREFIX_LENGTH:]
+    if token_budget is None:
+        return prefix + body
+    return _fit_budget(prefix, body, token_budget, model)
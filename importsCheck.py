@@ -1,41 +1,144 @@
+import argparse
 import subprocess
-import ast
 import sys
+import threading
+import importlib
+import importlib.metadata
+import importlib.util
+from logWriter import log
+from staticCheck import analyze
 
 model = "o1-mini"
 
+# Import names whose distribution on PyPI is named differently
+IMPORT_TO_DISTRIBUTION = {
+    'sklearn': 'scikit-learn',
+    'cv2': 'opencv-python',
+    'PIL': 'pillow',
+    'yaml': 'PyYAML',
+    'bs4': 'beautifulsoup4',
+    'skimage': 'scikit-image',
+    'dateutil': 'python-dateutil',
+    'dotenv': 'python-dotenv',
+    'Crypto': 'pycryptodome',
+    'google.protobuf': 'protobuf',
+    'attr': 'attrs',
+    'zmq': 'pyzmq',
+    'serial': 'pyserial',
+    'jwt': 'PyJWT',
+    'magic': 'python-magic',
+    'docx': 'python-docx',
+    'pptx': 'python-pptx',
+    'Bio': 'biopython',
+    'OpenSSL': 'pyOpenSSL',
+    'fitz': 'PyMuPDF',
+    'win32api': 'pywin32',
+}
+
+# Availability of top-level modules, resolved once per process
+_available = {}
+_available_lock = threading.Lock()
+# Distributions that may be installed during a run. None allows any distribution.
+allowed_distributions = None
+# Directory of pre-downloaded wheels. When set, pip installs from it without contacting an index.
+wheelhouse = None
+
 
 def printToTerminalFile(*args, **kwargs):
     """ Logs messages both to the terminal and a log file. """
-    file_name = f"ResponseLog_{model}.txt"
-    print(*args, **kwargs)
-
-    with open(file_name, 'a', encoding="utf-8") as f:
-        print(*args, **kwargs, file=f)
+    log(f"ResponseLog_{model}.txt", *args, **kwargs)
 
 
 def extract_modules_to_import(code):
     """ Extracts the modules that needs to be imported to run the given code. """
-    try:
-        ast_tree = ast.parse(code)
-    except SyntaxError as e:
-        printToTerminalFile(f"Syntax error while parsing code: {e}")
+    report = analyze(code)
+    if report['Syntax Error'] is not None:
+        printToTerminalFile(f"Syntax error while parsing code: {report['Syntax Error']}")
         return []
-    modules_to_import = set()
-    for node in ast.walk(ast_tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:  # Iterate through the aliases
-                modules_to_import.add(alias.name)
-        elif isinstance(node, ast.ImportFrom) and node.module:
-            modules_to_import.add(node.module)
-    return list(modules_to_import)
+    return list(report['Imports'])
+
+
+def top_level_module(module_name):
+    return module_name.split('.')[0]
 
 
 def is_standard_library(module_name):
     """ Checks if a module is part of Python's standard library. """
+    module_name = top_level_module(module_name)
     return module_name in sys.builtin_module_names or module_name in sys.stdlib_module_names
 
 
+def is_available(module_name):
+    """ Checks if a module can be imported without importing it. Results are memoized for the process. """
+    module_name = top_level_module(module_name)
+    available = _available.get(module_name)
+    if available is None:
+        try:
+            available = importlib.util.find_spec(module_name) is not None
+        except (ImportError, ValueError):
+            available = False
+        with _available_lock:
+            _available[module_name] = available
+    return available
+
+
+def distribution_name(module_name):
+    """ Maps an import name to the name of the distribution that provides it. """
+    if module_name in IMPORT_TO_DISTRIBUTION:
+        return IMPORT_TO_DISTRIBUTION[module_name]
+    module_name = top_level_module(module_name)
+    return IMPORT_TO_DISTRIBUTION.get(module_name, module_name)
+
+
+def is_installed(distribution):
+    """ Checks if a distribution is installed. """
+    try:
+        importlib.metadata.distribution(distribution)
+        return True
+    except importlib.metadata.PackageNotFoundError:
+        return False
+
+
+def normalize(distribution):
+    return distribution.lower().replace('_', '-')
+
+
+def read_allow_list(file_name):
+    """ Reads a requirements style file of distributions, one per line. Import names are mapped to distributions. """
+    distributions = []
+    with open(file_name, 'r', encoding="utf-8") as allow_list:
+        for line in allow_list:
+            line = line.split('#')[0].strip()
+            if line:
+                distributions.append(distribution_name(line))
+    return distributions
+
+
+def pip_install(distributions):
+    """ Installs distributions with the pip of the running interpreter, from the wheelhouse if one is configured. """
+    source = ["--no-index", "--find-links", wheelhouse] if wheelhouse else []
+    subprocess.run([sys.executable, "-m", "pip", "install", *source, *distributions], check=True)
+    # Let the import system and the availability memo see the new modules
+    importlib.invalidate_caches()
+    with _available_lock:
+        _available.clear()
+
+
+def configure(allow_list=None, wheel_directory=None, install=True):
+    """ Restricts installs during a run to the distributions of an allow-list and optionally installs the missing
+    ones in bulk ahead of time, so that candidates only need in-process availability checks. """
+    global allowed_distributions, wheelhouse
+    wheelhouse = wheel_directory
+    if allow_list is None:
+        return
+    distributions = read_allow_list(allow_list)
+    allowed_distributions = {normalize(distribution) for distribution in distributions}
+    missing = [distribution for distribution in distributions if not is_installed(distribution)]
+    if install and missing:
+        printToTerminalFile("Installing allowed modules:", missing)
+        pip_install(missing)
+
+
 def install_imports(code, model_new):
     """ Installs any missing modules specified in the code. """
     if not code:
@@ -50,20 +153,44 @@ def install_imports(code, model_new):
     third_party_modules = [module for module in modules_to_import if not is_standard_library(module)]
     if not third_party_modules:
         return "All required modules are either standard library or already installed.", True
+    missing_modules = [module for module in third_party_modules if not is_available(module)]
+    if not missing_modules:
+        return "All required modules are already installed.", True
+    modules_to_install = list(dict.fromkeys(distribution_name(module) for module in missing_modules))
+    if allowed_distributions is not None:
+        not_allowed = [module for module in modules_to_install if normalize(module) not in allowed_distributions]
+        if not_allowed:
+            error_message = f"Modules {not_allowed} are not available. Use only the standard library or installed modules."
+            printToTerminalFile(error_message)
+            return error_message, False
     try:
-        # fetch already installed modules
-        installed_modules = set(line.split('==')[0] for line in subprocess.run(['pip', 'freeze'], stdout=subprocess.PIPE, text=True).stdout.splitlines())
-        # Install required modules using pip
-        modules_to_install = list([module for module in third_party_modules if module not in installed_modules])
-        if modules_to_install:
-            printToTerminalFile("Installing missing modules:", modules_to_install)
-            # to check pip version errors
-            subprocess.run(["python", "-m", "pip", "install", "--upgrade", "pip"], check=True)
-            subprocess.run(['pip', 'install'] + modules_to_install, check=True)
-            return "Installed new imports successfully!", True
-        else:
-            return "All required modules are already installed.", True
+        printToTerminalFile("Installing missing modules:", modules_to_install)
+        pip_install(modules_to_install)
+        return "Installed new imports successfully!", True
     except Exception as e:
         error_message = f"Module installation failed: {e}"
         printToTerminalFile(error_message)
         return error_message, False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Install the modules of an allow-list in bulk ahead of a run.")
+    parser.add_argument("allow_list", help="File listing the allowed distributions or import names, one per line")
+    parser.add_argument("--wheelhouse", help="Install from this directory of wheels instead of the package index")
+    parser.add_argument("--download", action="store_true",
+                        help="Download the wheels of the allow-list into the wheelhouse first")
+    parser.add_argument("--upgrade_pip", action="store_true", help="Upgrade pip before installing")
+    args = parser.parse_args()
+    distributions = read_allow_list(args.allow_list)
+    if args.download:
+        if not args.wheelhouse:
+            parser.error("--download requires --wheelhouse")
+        subprocess.run([sys.executable, "-m", "pip", "download", "-d", args.wheelhouse, *distributions], check=True)
+    wheelhouse = args.wheelhouse
+    if args.upgrade_pip:
+        # Only ever done here, never in the middle of a run
+        subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "pip"], check=True)
+    missing = [distribution for distribution in distributions if not is_installed(distribution)]
+    if missing:
+        pip_install(missing)
+    print(f"{len(distributions) - len(missing)} of {len(distributions)} allowed distributions were already installed.")
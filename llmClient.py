@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import os
+import threading
+import time
+import httpx
+from openai import AsyncOpenAI
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+
+class LLMClientPool:
+    """Shares one pooled AsyncOpenAI client per endpoint across all questions and iterations."""
+
+    def __init__(self, max_connections=100, keepalive_expiry=60):
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.clients = {}
+        self.lock = threading.Lock()
+        # All clients live on one background event loop so synchronous callers can share their connections.
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self.thread.start()
+        self.stats = {
+            'Requests': 0,
+            'Clients Created': 0,
+            'Connections Opened': 0,
+            'Handshake Time': 0.0,
+            'Request Time': 0.0
+        }
+
+    @staticmethod
+    def resolve_endpoint(model, api_key=None, base_url=None):
+        """ Returns the base url and api key to use for the given model. """
+        if "gemini" in model.lower():
+            return base_url or GEMINI_BASE_URL, api_key if api_key is not None else os.getenv("GEMINI_API_KEY")
+        return base_url or os.getenv("OPENAI_BASE_URL"), api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+
+    async def _add_trace(self, request):
+        """ Attaches an httpcore trace to the request that records TCP and TLS handshakes. """
+        started = {}
+
+        async def trace(event_name, info):
+            step, _, phase = event_name.rpartition(".")
+            if step in ("connection.connect_tcp", "connection.start_tls"):
+                if phase == "started":
+                    started[step] = time.perf_counter()
+                elif phase == "complete" and step in started:
+                    self.stats['Handshake Time'] += time.perf_counter() - started.pop(step)
+                    if step == "connection.connect_tcp":
+                        self.stats['Connections Opened'] += 1
+
+        request.extensions["trace"] = trace
+
+    def get_client(self, base_url, api_key):
+        """ Returns the shared client of an endpoint, creating it on first use. """
+        key = (base_url, api_key)
+        with self.lock:
+            if key not in self.clients:
+                http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections,
+                                        keepalive_expiry=self.keepalive_expiry),
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                    event_hooks={'request': [self._add_trace]})
+                self.clients[key] = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+                self.stats['Clients Created'] += 1
+            return self.clients[key]
+
+    async def acreate(self, model, messages, api_key=None, base_url=None, **params):
+        """ Sends a chat completion request through the shared client of the model's endpoint. """
+        base_url, api_key = self.resolve_endpoint(model, api_key, base_url)
+        client = self.get_client(base_url, api_key)
+        request_start = time.perf_counter()
+        try:
+            return await client.chat.completions.create(model=model, messages=messages, **params)
+        finally:
+            self.stats['Requests'] += 1
+            self.stats['Request Time'] += time.perf_counter() - request_start
+
+    def create(self, model, messages, api_key=None, base_url=None, **params):
+        """ Blocking wrapper around acreate for callers running outside the event loop. """
+        future = asyncio.run_coroutine_threadsafe(
+            self.acreate(model, messages, api_key=api_key, base_url=base_url, **params), self.loop)
+        return future.result()
+
+    async def astream(self, model, messages, api_key=None, base_url=None, monitor=None, **params):
+        """ Streams a chat completion and closes the stream as soon as the monitor reports a stop reason. """
+        base_url, api_key = self.resolve_endpoint(model, api_key, base_url)
+        client = self.get_client(base_url, api_key)
+        request_start = time.perf_counter()
+        streamed = {'Content': None, 'Model': model, 'Time To First Token': None, 'Usage': None, 'Stop Reason': None}
+        parts = []
+        try:
+            stream = await client.chat.completions.create(model=model, messages=messages, stream=True,
+                                                          stream_options={"include_usage": True}, **params)
+            async for chunk in stream:
+                streamed['Model'] = chunk.model or streamed['Model']
+                if chunk.usage:
+                    streamed['Usage'] = chunk.usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if streamed['Time To First Token'] is None:
+                    streamed['Time To First Token'] = time.perf_counter() - request_start
+                parts.append(delta)
+                streamed['Stop Reason'] = monitor.feed(delta) if monitor else None
+                if streamed['Stop Reason']:
+                    await stream.close()
+                    break
+        finally:
+            self.stats['Requests'] += 1
+            self.stats['Request Time'] += time.perf_counter() - request_start
+        streamed['Content'] = "".join(parts)
+        return streamed
+
+    def stream(self, model, messages, api_key=None, base_url=None, monitor=None, **params):
+        """ Blocking wrapper around astream for callers running outside the event loop. """
+        future = asyncio.run_coroutine_threadsafe(
+            self.astream(model, messages, api_key=api_key, base_url=base_url, monitor=monitor, **params), self.loop)
+        return future.result()
+
+    def report(self):
+        """ Summarizes connection reuse and the handshake time it saved. """
+        requests = self.stats['Requests']
+        connections = self.stats['Connections Opened']
+        handshake_time = self.stats['Handshake Time'] / connections if connections else 0.0
+        reused = max(requests - connections, 0)
+        return (f"LLM requests: {requests}, clients created: {self.stats['Clients Created']}, "
+                f"connections opened: {connections}, connections reused: {reused}, "
+                f"mean latency: {self.stats['Request Time'] / requests if requests else 0.0:.3f}s, "
+                f"mean handshake: {handshake_time:.3f}s, "
+                f"estimated handshake time saved: {reused * handshake_time:.3f}s")
+
+    def close(self):
+        """ Closes all clients and stops the background event loop. """
+        async def close_clients():
+            for client in self.clients.values():
+                await client.close()
+        asyncio.run_coroutine_threadsafe(close_clients(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.clients.clear()
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool():
+    """ Returns the process wide client pool. """
+    global _client_pool
+    with _client_pool_lock:
+        if _client_pool is None:
+            _client_pool = LLMClientPool()
+        return _client_pool
+
+
+def benchmark(model, base_url, api_key, requests):
+    """ Compares per-call client construction with the shared pool against the same endpoint. """
+    messages = [{"role": "user", "content": "Write a python function that returns the sum of two numbers."}]
+
+    async def per_call():
+        start = time.perf_counter()
+        for _ in range(requests):
+            async with AsyncOpenAI(api_key=api_key or "mock", base_url=base_url) as client:
+                await client.chat.completions.create(model=model, n=1, messages=messages)
+        return time.perf_counter() - start
+
+    per_call_time = asyncio.run(per_call())
+    pool = LLMClientPool()
+    start = time.perf_counter()
+    for _ in range(requests):
+        pool.create(model, messages, api_key=api_key or "mock", base_url=base_url, n=1)
+    pooled_time = time.perf_counter() - start
+    print(f"Per-call clients: {per_call_time:.3f}s, shared pool: {pooled_time:.3f}s "
+          f"for {requests} requests ({per_call_time - pooled_time:.3f}s saved)")
+    print(pool.report())
+    pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the shared LLM client pool.")
+    parser.add_argument("model", help="The LLM model to query")
+    parser.add_argument("-b", "--base_url", help="Chat completions endpoint, e.g. a local mock server")
+    parser.add_argument("-k", "--api_key", help="API Key")
+    parser.add_argument("-n", "--requests", type=int, default=20, help="Number of requests to send")
+    args = parser.parse_args()
+    benchmark(args.model, args.base_url, args.api_key, args.requests)
@@ -0,0 +1,194 @@
+import argparse
+import csv
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import testCaseParser
+from outputComparator import select_comparator
+from questionDataset import iter_leetcode_xlsx
+from questionMetadata import MetadataCache
+from sandbox import get_sandbox_pool
+from staticCheck import analyze
+from validation import LeetCodeBot
+
+ENTRY_POINT = "__judge_entry__"
+# The LeetCode harness converts these argument types from lists, which the local judge does not
+UNSUPPORTED_TYPES = re.compile(r'\b(?:ListNode|TreeNode|Node)\b')
+# Imports LeetCode provides to every solution, e.g. for the List annotations of the starter code
+PREAMBLE = ("from typing import *\nfrom collections import *\nfrom functools import *\nfrom itertools import *\n"
+            "import bisect\nimport collections\nimport heapq\nimport math\n\n")
+
+
+def entry_point(default_code, solution, exchange_func_body):
+    """ Returns the code to run and the function to call, or None and the reason the solution can not be judged.
+
+    With the starter code of a question, the solution body is moved into the Solution class method exactly as
+    validation.py submits it, and the entry point creates a Solution for every call like LeetCode does.
+    """
+    if default_code:
+        if UNSUPPORTED_TYPES.search(default_code):
+            return None, "Not judged locally: arguments are linked structures"
+        code = exchange_func_body(default_code, solution)
+        report = analyze(code)
+        if report['Function Name'] is None:
+            return None, "Not judged locally: no method in the starter code"
+        if 'class Solution' in code:
+            return (f"{PREAMBLE}{code}\n\ndef {ENTRY_POINT}(*args):\n"
+                    f"    return Solution().{report['Function Name']}(*args)\n"), ENTRY_POINT
+        return PREAMBLE + code, report['Function Name']
+    report = analyze(solution)
+    if report['Function Name'] is None or not report['Top Level']:
+        return None, "Not judged locally: no top level function"
+    return solution, report['Function Name']
+
+
+def example_tests(question):
+    """ Returns the (arguments, expected output) pairs of the examples of a question. """
+    tests = []
+    for test_case in question.parsed_test_cases:
+        arguments = test_case['Input']
+        if isinstance(arguments, list) and len(arguments) == 1 and isinstance(arguments[0], str):
+            # single inputs are kept as raw text by the parser
+            arguments = [testCaseParser.safe_literal_eval(arguments[0])[1]]
+        tests.append(((*arguments,) if isinstance(arguments, (list, tuple)) else (arguments,), test_case['Output']))
+    return tests
+
+
+def load_hidden_tests(results_file_name):
+    """ Collects the hidden test cases LeetCode reported as failed in a results file of validation.py. """
+    hidden = {}
+    if not results_file_name or not os.path.exists(results_file_name):
+        return hidden
+    with open(results_file_name, newline='') as results_file:
+        for row in csv.DictReader(results_file):
+            last_testcase, expected_output = row.get('Last Testcase'), row.get('Expected Output')
+            if not last_testcase or not expected_output:
+                continue
+            try:
+                arguments = tuple(testCaseParser.literal_eval(line) for line in last_testcase.splitlines() if line)
+                expected = testCaseParser.literal_eval(expected_output)
+            except (ValueError, SyntaxError):
+                continue
+            tests = hidden.setdefault(row['Question Name'], [])
+            if (arguments, expected) not in tests:
+                tests.append((arguments, expected))
+    return hidden
+
+
+class LocalJudge:
+    """Judges solutions offline the way validation.py does on LeetCode, with records in the same CSV layout.
+
+    A solution is run on the examples of its question ("Initial Interpret") and, if they pass, on the examples and
+    every hidden test case LeetCode reported before ("Submitting"). Tests run in parallel sandbox workers and the
+    records carry the total runtime and the peak memory of the tests.
+    """
+
+    def __init__(self, bot, metadata_cache=None, hidden_tests=None, sandbox=None, test_timeout=10, budget=60,
+                 any_order=True):
+        self.bot = bot
+        self.metadata_cache = metadata_cache
+        self.hidden_tests = hidden_tests or {}
+        self.sandbox = sandbox or get_sandbox_pool()
+        self.test_timeout = test_timeout
+        self.budget = budget
+        self.any_order = any_order
+
+    def default_code(self, question_url):
+        cached = self.metadata_cache.get(question_url.rstrip('/').split('/')[-1]) if self.metadata_cache else None
+        return cached[1] if cached else None
+
+    def run_tests(self, code, function_name, tests, comparator, stage):
+        """ Runs the tests and returns a record like the check results of LeetCode. """
+        execution = self.sandbox.run_parallel(code, function_name, [arguments for arguments, _ in tests],
+                                              compile_timeout=30, test_timeout=self.test_timeout, budget=self.budget,
+                                              measure_memory=True)
+        record = {'stage': stage, 'error': None, 'submission_id': None, 'run_success': True, 'total_correct': 0,
+                  'total_testcases': len(tests), 'status_msg': "Accepted"}
+        if execution['Compile Error'] is not None:
+            record.update(run_success=False, status_msg="Compile Error",
+                          error=f"Compile Error: {execution['Compile Error']}")
+            return False, record
+        results = execution['Results']
+        times = [result['Time'] for result in results if result and result['Time'] is not None]
+        memory = [result['Peak Memory'] for result in results if result and result['Peak Memory'] is not None]
+        record['status_runtime'] = f"{sum(times) * 1000:.0f} ms"
+        record['status_memory'] = f"{max(memory, default=0) / 2 ** 20:.1f} MB"
+        for (arguments, expected), result in zip(tests, results):
+            if result is None or result.get('Timed Out'):
+                status, passed = "Time Limit Exceeded", False
+            elif result['Error'] is not None:
+                status, passed = "Runtime Error", False
+                record['run_success'] = False
+            else:
+                status, passed = "Wrong Answer", comparator(result['Output'], expected)
+            if passed:
+                record['total_correct'] += 1
+            elif record['status_msg'] == "Accepted":  # the first failure is reported, like on LeetCode
+                record.update(status_msg=status, last_testcase="\n".join(repr(argument) for argument in arguments),
+                              expected_output=repr(expected),
+                              code_output=result['Error'] if result and result.get('Error') else
+                              repr(result['Output']) if result and not result.get('Timed Out') else None)
+        if record['total_correct'] != record['total_testcases']:
+            record['error'] = "Failed to pass all Test Cases"
+            return False, record
+        return True, record
+
+    def judge(self, question, solution):
+        """ Judges the solution of a question and returns its record. """
+        code, function_name = entry_point(self.default_code(question.url), solution, self.bot.exchange_func_body)
+        if code is None:
+            return {'stage': "Initial Interpret", 'error': function_name, 'run_success': None}
+        comparator = select_comparator(question.description, self.any_order)
+        examples = example_tests(question)
+        passed, record = self.run_tests(code, function_name, examples, comparator, "Initial Interpret")
+        if passed:
+            passed, record = self.run_tests(code, function_name, examples + self.hidden_tests.get(question.name, []),
+                                            comparator, "Submitting")
+        return record
+
+    def run(self, questions, solutions, file_name, workers=None):
+        """ Judges (question name, solution) pairs concurrently and appends their records to the file. """
+        def judge_solution(item):
+            question_name, solution = item
+            question = questions.get(question_name)
+            if question is None:
+                return question_name, {'stage': "Initial Interpret", 'error': "Question not found in the data file"}
+            return question_name, self.judge(question, solution)
+
+        with ThreadPoolExecutor(max_workers=workers or len(self.sandbox.workers)) as executor:
+            for question_name, record in executor.map(judge_solution, solutions):
+                self.bot.store_result_in_csv(question_name, record, file_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Judge saved solutions locally instead of submitting them to LeetCode.")
+    parser.add_argument("model", help="Model selection type.")
+    parser.add_argument("-rf", "--response_file", help="Response file to validate")
+    parser.add_argument("-df", "--data_file", help="LeetCode dataset file")
+    parser.add_argument("-sp", "--sol_path", help="Base path for the Solutions folder")
+    parser.add_argument("--hidden_tests", nargs="*", default=[],
+                        help="Result files of validation.py whose failed hidden test cases are judged as well")
+    parser.add_argument("--metadata_cache", default="LeetCodeMetadata.sqlite",
+                        help="Question metadata cache of validation.py, used for the starter code of each question")
+    parser.add_argument("--prefetch", action="store_true", help="Fetch the starter code of uncached questions first")
+    parser.add_argument("--test_timeout", type=float, default=10, help="Seconds a single test case may take")
+    parser.add_argument("--budget", type=float, default=60, help="Seconds all test cases of a solution may take")
+    parser.add_argument("-w", "--workers", type=int, help="Sandbox processes (defaults to the CPU count)")
+    parser.add_argument("-o", "--output", help="Results file (default localJudge_results_<model>.csv)")
+    args = parser.parse_args()
+
+    bot = LeetCodeBot(None, None, args.model, metadata_cache=MetadataCache(args.metadata_cache, ttl=None))
+    question_names, question_urls, saved_solutions = bot.fetch_solved_solution(args.response_file, args.data_file,
+                                                                               args.sol_path)
+    solutions = [(name, solution) for name, solution in zip(question_names, saved_solutions) if solution]
+    if args.prefetch:
+        bot.prefetch_metadata([url.rstrip('/').split('/')[-1] for url in question_urls])
+    hidden_tests = {}
+    for results_file_name in args.hidden_tests:
+        for question_name, tests in load_hidden_tests(results_file_name).items():
+            hidden_tests.setdefault(question_name, []).extend(tests)
+    questions = {question.name: question for question in iter_leetcode_xlsx(args.data_file)}
+    judge = LocalJudge(bot, bot.metadata_cache, hidden_tests, get_sandbox_pool(args.workers), args.test_timeout,
+                       args.budget)
+    judge.run(questions, solutions, args.output or f"localJudge_results_{args.model}.csv")
+    print(f"Judged {len(solutions)} solutions locally.")
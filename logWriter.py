@@ -0,0 +1,124 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+MAX_PAYLOAD_CHARS = 10000
+MAX_FILE_BYTES = 50 * 1024 * 1024
+BACKUP_COUNT = 5
+FLUSH_INTERVAL = 0.5
+BATCH_SIZE = 1000
+
+
+def truncate(message, max_chars=MAX_PAYLOAD_CHARS):
+    """ Shortens oversized messages such as huge test case inputs. """
+    if max_chars and len(message) > max_chars:
+        return (f"{message[:max_chars]}... [{len(message) - max_chars} characters truncated]"
+                + ("\n" if message.endswith("\n") else ""))
+    return message
+
+
+def format_message(*args, **kwargs):
+    """ Joins print style arguments into one message. """
+    return kwargs.get('sep', ' ').join(str(arg) for arg in args) + kwargs.get('end', '\n')
+
+
+class LogWriter:
+    """Background thread that appends log records to files in batches and rotates them by size."""
+
+    def __init__(self, structured=False, max_payload=MAX_PAYLOAD_CHARS, max_bytes=MAX_FILE_BYTES,
+                 backup_count=BACKUP_COUNT, flush_interval=FLUSH_INTERVAL):
+        self.structured = structured
+        self.max_payload = max_payload
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.records = queue.SimpleQueue()
+        self.files = {}
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, file_name, message, **fields):
+        """ Queues a message for the given file. fields, e.g. question and iteration, go into JSON records. """
+        message = truncate(message, self.max_payload)
+        if self.structured:
+            line = json.dumps({'time': time.time(), **fields, 'message': message.rstrip('\n')}, default=str,
+                              ensure_ascii=False) + '\n'
+        else:
+            line = message
+        self.records.put((file_name, line))
+
+    def _run(self):
+        closing = False
+        while not closing:
+            try:
+                batch = [self.records.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            lines = {}
+            for record in batch:
+                if record is None:
+                    closing = True
+                    continue
+                lines.setdefault(record[0], []).append(record[1])
+            for file_name, file_lines in lines.items():
+                self._append(file_name, "".join(file_lines))
+        for log_file in self.files.values():
+            log_file.close()
+
+    def _append(self, file_name, text):
+        """ Appends text to a file and rotates it once it exceeds max_bytes. """
+        log_file = self.files.get(file_name)
+        if log_file is None:
+            log_file = self.files[file_name] = open(file_name, 'a', encoding="utf-8")
+        try:
+            log_file.write(text)
+            log_file.flush()
+        except OSError:
+            return
+        if self.max_bytes and log_file.tell() >= self.max_bytes:
+            log_file.close()
+            for number in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{file_name}.{number}"):
+                    os.replace(f"{file_name}.{number}", f"{file_name}.{number + 1}")
+            if self.backup_count:
+                os.replace(file_name, f"{file_name}.1")
+            else:
+                os.remove(file_name)
+            self.files[file_name] = open(file_name, 'a', encoding="utf-8")
+
+    def close(self):
+        """ Writes all queued records and stops the writer thread. """
+        if self.thread.is_alive():
+            self.records.put(None)
+            self.thread.join()
+
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+
+def get_log_writer(**options):
+    """ Returns the process wide log writer. Options only apply when it is first created. """
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = LogWriter(**options)
+            atexit.register(_log_writer.close)
+        return _log_writer
+
+
+def log(file_name, *args, **kwargs):
+    """ Prints a message to the terminal and queues it for the log file. Extra fields are kept in JSON records. """
+    fields = kwargs.pop('fields', {})
+    message = format_message(*args, **kwargs)
+    writer = get_log_writer()
+    print(truncate(message, writer.max_payload), end='')
+    writer.write(file_name, message, **fields)
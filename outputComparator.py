@@ -0,0 +1,115 @@
+import json
+import math
+import re
+from collections import Counter
+
+ORDERS = ['exact', 'unordered', 'nested']
+ANY_ORDER_PHRASES = ["return the answer in any order", "return the solution in any order",
+                     "return the values in any order"]
+# e.g. "Answers within 10-5 of the actual answer will be accepted." (the superscript is lost when scraping)
+TOLERANCE_PATTERN = re.compile(r'within\s+10\s*\^?\s*-\s*(\d+)', re.IGNORECASE)
+
+
+def _freeze(value, nested=False):
+    """ Converts a value into a hashable canonical form. Lists and tuples compare equal,
+    nested sequences are sorted as well when nested is set. """
+    if isinstance(value, (list, tuple)):
+        items = tuple(_freeze(item, nested) for item in value)
+        return tuple(sorted(items, key=_order_key)) if nested else items
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item, nested) for item in value)
+    if isinstance(value, dict):
+        return frozenset((_freeze(key, nested), _freeze(item, nested)) for key, item in value.items())
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _order_key(value):
+    """ Total order over frozen values of mixed types, used for canonical sorting. """
+    if value is None:
+        return (0,)
+    if isinstance(value, (bool, int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, tuple):
+        return (3, tuple(_order_key(item) for item in value))
+    if isinstance(value, frozenset):
+        return (4, tuple(sorted(_order_key(item) for item in value)))
+    return (5, repr(value))
+
+
+def _close(returned, expected, tolerance):
+    """ Compares frozen values, allowing numbers to differ by the tolerance. """
+    if isinstance(returned, tuple) and isinstance(expected, tuple):
+        return len(returned) == len(expected) and all(_close(r, e, tolerance) for r, e in zip(returned, expected))
+    if (isinstance(returned, (int, float)) and isinstance(expected, (int, float))
+            and not isinstance(returned, bool) and not isinstance(expected, bool)):
+        return math.isclose(returned, expected, rel_tol=tolerance, abs_tol=tolerance)
+    return returned == expected
+
+
+class Comparator:
+    """Decides whether a returned output matches the expected one.
+
+    order is 'exact', 'unordered' (the top level list may be in any order) or 'nested' (every level may be in any
+    order). tolerance is the absolute and relative difference allowed between numbers, None for exact numbers.
+    """
+
+    def __init__(self, order='exact', tolerance=None):
+        if order not in ORDERS:
+            raise ValueError(f"Unknown comparator order: {order}")
+        self.order = order
+        self.tolerance = tolerance
+
+    def __call__(self, returned, expected):
+        if returned == expected:
+            return True
+        if self.order == 'exact' and self.tolerance is None:
+            return False
+        returned = _freeze(returned, self.order == 'nested')
+        expected = _freeze(expected, self.order == 'nested')
+        if self.order != 'exact' and isinstance(returned, tuple) and isinstance(expected, tuple):
+            if len(returned) != len(expected):
+                return False
+            if self.tolerance is None:
+                return Counter(returned) == Counter(expected)
+            returned, expected = sorted(returned, key=_order_key), sorted(expected, key=_order_key)
+            return all(_close(r, e, self.tolerance) for r, e in zip(returned, expected))
+        if self.tolerance is None:
+            return returned == expected
+        return _close(returned, expected, self.tolerance)
+
+    def __repr__(self):
+        return f"Comparator(order={self.order!r}, tolerance={self.tolerance!r})"
+
+
+def select_comparator(question_description, any_order=True, override=None):
+    """ Picks the comparator of a question from its description, unless an override is given.
+
+    any_order enables order insensitive comparison of questions that accept answers in any order.
+    override is an order name or a dict with 'order' and 'tolerance' keys.
+    """
+    if isinstance(override, str):
+        override = {'order': override}
+    if override:
+        return Comparator(override.get('order', 'exact'), override.get('tolerance'))
+
+    description = question_description if isinstance(question_description, str) else ""
+    order = 'unordered' if any_order and any(phrase in description for phrase in ANY_ORDER_PHRASES) else 'exact'
+    tolerance_match = TOLERANCE_PATTERN.search(description)
+    tolerance = 10 ** -int(tolerance_match.group(1)) if tolerance_match else None
+    return Comparator(order, tolerance)
+
+
+def load_overrides(file_name):
+    """ Loads per-question comparator overrides, a JSON object mapping question names to an order name
+    or to {"order": ..., "tolerance": ...}. """
+    with open(file_name, 'r', encoding="utf-8") as overrides_file:
+        overrides = json.load(overrides_file)
+    for override in overrides.values():
+        select_comparator("", override=override)  # fail early on unknown orders
+    return overrides
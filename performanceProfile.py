@@ -0,0 +1,136 @@
+import math
+import re
+
+# Input sizes, in elements, the solution is run on to estimate how its running time grows
+PROFILE_SIZES = (500, 1000, 2000, 4000, 8000)
+# e.g. "1 <= nums.length <= 104" or "s.length <= 5 * 104" (the superscript of 10^4 is lost when scraping)
+CONSTRAINT_PATTERN = re.compile(r'(?:length|size)\s*<=\s*(?:(\d+)\s*\*\s*)?(\d+)(?:\s*\^\s*(\d))?\b')
+DEFAULT_MAX_SIZE = 10 ** 5
+# Seconds the solution may take on the largest input allowed by the question
+TIME_LIMIT = 2.0
+# Timings below this are dominated by noise and do not enter the estimate
+MIN_TIME = 1e-4
+
+
+def input_size(value):
+    """ Number of elements of an argument, counting the elements of nested lists and the characters of strings. """
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(max(1, input_size(item)) for item in value)
+    return 0
+
+
+def _is_sorted(value):
+    try:
+        return all(value[i] <= value[i + 1] for i in range(len(value) - 1))
+    except TypeError:
+        return False
+
+
+def scale_argument(value, factor):
+    """ Extends a list or string to factor times its length by padding it in front. Other values are kept.
+
+    Numbers are padded with distinct values outside the range of the example, below it if the example is sorted, so
+    that the padding neither forms an answer of its own nor lets the solution stop early. Other elements are tiled.
+    """
+    if not isinstance(value, (list, str)) or len(value) == 0:
+        return value
+    extra = max(0, int(len(value) * factor) - len(value))
+    if isinstance(value, list) and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+        if _is_sorted(value):
+            return [min(value) - extra + i for i in range(extra)] + value
+        step = int(max(abs(item) for item in value)) + 1
+        return [step * (i + 2) for i in range(extra)] + value
+    scaled = (value * math.ceil(extra / len(value)))[:extra] + value
+    if _is_sorted(value):
+        scaled = sorted(scaled) if isinstance(value, list) else ''.join(sorted(scaled))
+    return scaled
+
+
+def synthetic_calls(calls, sizes=PROFILE_SIZES):
+    """ Scales the largest example call up to each of the sizes. Returns (size, call) pairs, empty if the
+    arguments contain no list or string to scale. """
+    if not calls:
+        return []
+    call = max(calls, key=lambda arguments: sum(input_size(argument) for argument in arguments))
+    base = sum(input_size(argument) for argument in call)
+    if base == 0:
+        return []
+    scaled = []
+    for size in sizes:
+        arguments = tuple(scale_argument(argument, size / base) for argument in call)
+        scaled.append((sum(input_size(argument) for argument in arguments), arguments))
+    return scaled
+
+
+def estimate_exponent(sizes, times):
+    """ Fits time = c * size ** exponent by least squares on a log-log scale. Returns the exponent or None. """
+    points = [(math.log(size), math.log(time)) for size, time in zip(sizes, times) if size > 0 and time >= MIN_TIME]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def _constraint_value(multiplier, number, exponent):
+    if exponent:
+        value = int(number) ** int(exponent)
+    elif len(number) == 3 and number.startswith("10") and number[2] in "23456789":
+        value = 10 ** int(number[2])  # 104 is 10^4 with the superscript lost
+    else:
+        value = int(number)
+    return value * int(multiplier or 1)
+
+
+def max_input_size(question_description):
+    """ Largest input size allowed by the length constraints of a question. """
+    description = question_description if isinstance(question_description, str) else ""
+    sizes = [_constraint_value(*match) for match in CONSTRAINT_PATTERN.findall(description)]
+    return max(sizes) if sizes else DEFAULT_MAX_SIZE
+
+
+def profile(sandbox, code, function_name, calls, question_description, test_timeout=10):
+    """ Runs the solution on scaled-up versions of its example inputs and estimates how its running time grows.
+
+    Returns a dict with the measured 'Sizes' and CPU 'Times', the estimated 'Exponent', the 'Projected Time' on the
+    largest input allowed by the question and whether the solution is 'Too Slow', or None if the inputs could not be
+    scaled. A synthetic input the solution did not finish is reported as its 'Failed Size', with 'Timed Out' set if
+    it ran out of time and 'Out Of Memory' set if it ran out of memory. Memory is not traced here, as tracing slows
+    down every allocation and would distort the timings.
+    """
+    limit = max_input_size(question_description)
+    # Inputs larger than the question allows could make fast enough solutions look slow, e.g. exponential ones
+    scaled = synthetic_calls(calls, [size for size in PROFILE_SIZES if size <= limit])
+    if len(scaled) < 2:
+        return None
+    execution = sandbox.run(code, function_name, [arguments for _, arguments in scaled], compile_timeout=30,
+                            test_timeout=test_timeout,
+                            should_stop=lambda index, result: result['Error'] is not None)
+    sizes, times = [], []
+    out_of_memory = False
+    for (size, _), result in zip(scaled, execution['Results']):
+        if result['Error'] is not None:
+            # Other errors mean the synthetic input broke a constraint of the question
+            out_of_memory = (result['Traceback'] or "").rstrip().endswith("MemoryError")
+            break
+        sizes.append(size)
+        times.append(result['CPU Time'])
+    exponent = estimate_exponent(sizes, times)
+    projected = None
+    if exponent is not None:
+        # Solutions are assumed to be at least linear, noise on small inputs can make them look sublinear
+        projected = times[-1] * (limit / sizes[-1]) ** max(exponent, 1.0)
+    # A synthetic input that did not finish in time is too slow whatever the estimate says. A worker that died on
+    # its own was killed by its memory limit rather than its time limit.
+    killed = execution['Timed Out'] and len(execution['Results']) < len(scaled)
+    timed_out = killed and not execution['Crashed']
+    out_of_memory = out_of_memory or (killed and execution['Crashed'])
+    failed_size = scaled[len(sizes)][0] if len(sizes) < len(scaled) and (timed_out or out_of_memory) else None
+    too_slow = timed_out or (projected is not None and projected > TIME_LIMIT)
+    return {'Sizes': sizes, 'Times': times, 'Exponent': exponent, 'Max Size': limit, 'Projected Time': projected,
+            'Failed Size': failed_size, 'Timed Out': timed_out, 'Out Of Memory': out_of_memory, 'Too Slow': too_slow}
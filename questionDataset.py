@@ -0,0 +1,228 @@
+import argparse
+import ast
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+from typing import NamedTuple
+import testCaseParser
+
+# Columns of the LeetCode file written by scraper.py, in order
+LEETCODE_COLUMNS = ['Question Name', 'Question Url', 'Premium', 'Question Difficulty', 'Question Topics',
+                    'Question Description', 'Question Examples Count', 'Question Examples']
+ANY_ORDER = 'in any order'
+ASSERTION_PATTERN = re.compile(r"assert\s+(\w+)\((.*?)\)\s*==\s*(.+)")
+
+
+class Question(NamedTuple):
+    """A question of a dataset. test_cases is the raw examples string for LeetCode and parsed test cases for MBPP."""
+    position: int
+    name: str
+    description: str
+    test_cases: object
+    difficulty: str = None
+    topics: tuple = ()
+    premium: bool = False
+    url: str = None
+    examples_count: int = 0
+    source: str = 'leetcode'
+
+    @property
+    def parsed_test_cases(self):
+        """ Test cases as a list of {'Input', 'Output'} dicts, parsed once per question. """
+        if self.source == 'leetcode':
+            return testCaseParser.parse_test_case(self.test_cases)
+        return self.test_cases
+
+
+def _topics(value):
+    if not value:
+        return ()
+    try:
+        topics = ast.literal_eval(value) if isinstance(value, str) else value
+    except (ValueError, SyntaxError):
+        return ()
+    return tuple(topics) if isinstance(topics, (list, tuple)) else ()
+
+
+def _count(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def iter_leetcode_xlsx(file_name):
+    """ Yields the questions of a LeetCode file row by row without loading the workbook into memory. """
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+        for position, row in enumerate(rows):
+            row = (tuple(row) + (None,) * len(LEETCODE_COLUMNS))[:len(LEETCODE_COLUMNS)]
+            name, url, premium, difficulty, topics, description, examples_count, examples = row
+            yield Question(position, name, description, examples, difficulty, _topics(topics), premium == "Yes", url,
+                           _count(examples_count))
+    finally:
+        workbook.close()
+
+
+def safe_eval(expression):
+    """Safely evaluate mathematical expressions and literals."""
+    ALLOWED_TYPES = {"int": int, "float": float, "str": str, "bool": bool, "list": list, "tuple": tuple, "dict": dict,
+                     "set": set}
+    expression = expression.strip()
+    if expression in ALLOWED_TYPES:
+        return ALLOWED_TYPES[expression]
+    try:
+        return ast.literal_eval(expression)
+    except (SyntaxError, ValueError):
+        return eval(expression, {"__builtins__": {}}, {})
+
+
+def convert_assertions_to_test_cases(test_list):
+    test_cases = []
+
+    for assertion in test_list:
+        match = ASSERTION_PATTERN.match(assertion)
+        if match:
+            function_name, args, expected_output = match.groups()
+            parsed_output = safe_eval(expected_output)
+            parsed_args = safe_eval(f'({args})')
+            parsed_args = parsed_args if isinstance(parsed_args, tuple) else (parsed_args,)
+            test_cases.append({
+                "Input": parsed_args if len(parsed_args) > 1 else parsed_args[0],
+                "Output": parsed_output
+            })
+    return test_cases
+
+
+def iter_mbpp_jsonl(file_name):
+    """ Yields the questions of an MBPP JSONL file line by line. """
+    with open(file_name, 'r', encoding='utf-8') as file:
+        for position, line in enumerate(file):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            # Needed as the assertions use different function names to call
+            test_cases = convert_assertions_to_test_cases(row.get("test_list") or [])
+            yield Question(position, row.get("task_id"), row.get("text"), test_cases,
+                           examples_count=len(row.get("test_list") or []), source='mbpp')
+
+
+def convert_to_sqlite(excel_file_name, database_file_name):
+    """ Converts a LeetCode file into an indexed SQLite database that supports filtering by its columns. """
+    temporary_file_name = database_file_name + ".tmp"
+    if os.path.exists(temporary_file_name):
+        os.remove(temporary_file_name)
+    with closing(sqlite3.connect(temporary_file_name)) as connection:
+        connection.executescript("""
+            CREATE TABLE questions (
+                position INTEGER PRIMARY KEY,
+                name TEXT,
+                url TEXT,
+                premium INTEGER,
+                difficulty TEXT,
+                topics TEXT,
+                description TEXT,
+                examples_count INTEGER,
+                examples TEXT,
+                any_order INTEGER
+            );
+            CREATE TABLE question_topics (position INTEGER, topic TEXT);
+            CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        for question in iter_leetcode_xlsx(excel_file_name):
+            connection.execute("INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (question.position, question.name, question.url, int(question.premium),
+                                question.difficulty, json.dumps(question.topics), question.description,
+                                question.examples_count, question.test_cases,
+                                int(ANY_ORDER in str(question.description))))
+            connection.executemany("INSERT INTO question_topics VALUES (?, ?)",
+                                   [(question.position, topic) for topic in question.topics])
+        connection.executescript("""
+            CREATE INDEX questions_filter ON questions (premium, difficulty, any_order);
+            CREATE INDEX question_topics_topic ON question_topics (topic, position);
+        """)
+        connection.execute("INSERT INTO metadata VALUES ('source_mtime', ?)", (str(os.path.getmtime(excel_file_name)),))
+        connection.commit()
+    os.replace(temporary_file_name, database_file_name)
+
+
+def open_leetcode(excel_file_name, database_file_name=None):
+    """ Returns the SQLite database of a LeetCode file, converting the file once or whenever it changed. """
+    database_file_name = database_file_name or os.path.splitext(excel_file_name)[0] + ".sqlite"
+    if os.path.exists(database_file_name):
+        with closing(sqlite3.connect(database_file_name)) as connection:
+            row = connection.execute("SELECT value FROM metadata WHERE key = 'source_mtime'").fetchone()
+        if not os.path.exists(excel_file_name) or (row and float(row[0]) >= os.path.getmtime(excel_file_name)):
+            return database_file_name
+    print("Converting", excel_file_name, "to", database_file_name)
+    convert_to_sqlite(excel_file_name, database_file_name)
+    return database_file_name
+
+
+def iter_leetcode_sqlite(database_file_name, start=0, premium=False, difficulty=None, topics=None, any_order=None,
+                         with_examples=True):
+    """ Yields the questions of a converted LeetCode file, filtered by the database.
+
+    premium and any_order select questions with (True), without (False) or regardless of (None) the property.
+    difficulty is one difficulty or a list of them, topics a list of topics a question must all have.
+    """
+    conditions, parameters = ["position >= ?"], [start]
+    if premium is not None:
+        conditions.append("premium = ?")
+        parameters.append(int(premium))
+    if any_order is not None:
+        conditions.append("any_order = ?")
+        parameters.append(int(any_order))
+    if difficulty:
+        difficulties = [difficulty] if isinstance(difficulty, str) else list(difficulty)
+        conditions.append(f"difficulty IN ({', '.join('?' * len(difficulties))})")
+        parameters.extend(difficulties)
+    for topic in topics or []:
+        conditions.append("position IN (SELECT position FROM question_topics WHERE topic = ?)")
+        parameters.append(topic)
+    if with_examples:
+        conditions.append("name IS NOT NULL AND name <> '' AND description IS NOT NULL AND description <> '' "
+                          "AND examples IS NOT NULL AND examples_count > 0")
+    with closing(sqlite3.connect(database_file_name)) as connection:
+        cursor = connection.execute(
+            "SELECT position, name, description, examples, difficulty, topics, premium, url, examples_count "
+            f"FROM questions WHERE {' AND '.join(conditions)} ORDER BY position", parameters)
+        for position, name, description, examples, level, question_topics, is_premium, url, count in cursor:
+            yield Question(position, name, description, examples, level, tuple(json.loads(question_topics)),
+                           bool(is_premium), url, count)
+
+
+def iter_questions(file_name, data_source='leetcode', order=True, start=1, difficulty=None, topics=None):
+    """ Yields the questions of a LeetCode or MBPP file that the repair loop can be run on.
+
+    Premium questions and questions without test cases are skipped. Questions asking for results in any order are
+    only included if order is set. start is the position of the first question, like the original loaders.
+    """
+    if data_source == 'mbpp':
+        for question in iter_mbpp_jsonl(file_name):
+            if (question.position >= start and question.name and question.description and question.test_cases
+                    and (order or ANY_ORDER not in str(question.description))):
+                yield question
+    else:
+        yield from iter_leetcode_sqlite(open_leetcode(file_name), start, premium=False, difficulty=difficulty,
+                                        topics=topics, any_order=None if order else False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a LeetCode file to SQLite and list matching questions.")
+    parser.add_argument("excel_file", help="LeetCode data file")
+    parser.add_argument("-o", "--output", help="SQLite file (defaults to the data file name with .sqlite)")
+    parser.add_argument("--difficulty", nargs="+", help="Only list questions of these difficulties")
+    parser.add_argument("--topics", nargs="+", help="Only list questions that have all of these topics")
+    parser.add_argument("--order", action="store_true", help="Include questions that accept answers in any order")
+    args = parser.parse_args()
+    database = open_leetcode(args.excel_file, args.output)
+    names = [question.name for question in iter_leetcode_sqlite(database, 0, difficulty=args.difficulty,
+                                                                topics=args.topics,
+                                                                any_order=None if args.order else False)]
+    print("\n".join(str(name) for name in names))
+    print(len(names), "questions.")
@@ -0,0 +1,113 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+LANGUAGE = 'python3'
+# Fields of the GraphQL question type needed to interpret and submit a solution
+QUESTION_FIELDS = "questionId exampleTestcases codeDefinition"
+
+
+def default_code(code_definition, language=LANGUAGE):
+    """ Returns the starter code of a language from the codeDefinition JSON of a question, or None. """
+    if not code_definition:
+        return None
+    try:
+        definitions = json.loads(code_definition) if isinstance(code_definition, str) else code_definition
+    except ValueError:
+        return None
+    for definition in definitions:
+        if isinstance(definition, dict) and definition.get('value') == language:
+            return definition.get('defaultCode')
+    return None
+
+
+def batch_query(slugs):
+    """ Builds one GraphQL request that fetches several questions, aliased q0, q1, ... in the order of the slugs. """
+    variables = {f"slug{i}": slug for i, slug in enumerate(slugs)}
+    declarations = ", ".join(f"$slug{i}: String!" for i in range(len(slugs)))
+    selections = "\n".join(f"q{i}: question(titleSlug: $slug{i}) {{ {QUESTION_FIELDS} }}" for i in range(len(slugs)))
+    return {
+        "operationName": "questionsData",
+        "variables": variables,
+        "query": f"query questionsData({declarations}) {{\n{selections}\n}}"
+    }
+
+
+class MetadataCache:
+    """Persistent SQLite cache of the question metadata needed for validation, keyed by title slug.
+
+    Entries older than ttl seconds are fetched again. A ttl of None keeps entries forever.
+    """
+
+    def __init__(self, path="LeetCodeMetadata.sqlite", ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.stats = {'Hits': 0, 'Misses': 0, 'Stores': 0}
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS metadata (
+                slug TEXT PRIMARY KEY,
+                question_id TEXT,
+                example_testcases TEXT,
+                default_code TEXT,
+                fetched REAL
+            )""")
+        self.connection.commit()
+
+    def _fresh(self, fetched):
+        return self.ttl is None or time.time() - fetched < self.ttl
+
+    def get(self, slug):
+        """ Returns (example test cases, python3 default code, question id) of a question, or None if it is
+        missing or expired. """
+        with self.lock:
+            row = self.connection.execute("SELECT example_testcases, default_code, question_id, fetched FROM metadata "
+                                          "WHERE slug = ?", (slug,)).fetchone()
+            if row is None or not self._fresh(row[3]):
+                self.stats['Misses'] += 1
+                return None
+            self.stats['Hits'] += 1
+        return row[0], row[1], row[2]
+
+    def missing(self, slugs):
+        """ Returns the slugs that are not cached or expired, in order and without duplicates. """
+        slugs = list(dict.fromkeys(slugs))
+        with self.lock:
+            fresh = {slug for slug, fetched in self.connection.execute(
+                f"SELECT slug, fetched FROM metadata WHERE slug IN ({', '.join('?' * len(slugs))})", slugs)
+                if self._fresh(fetched)} if slugs else set()
+        return [slug for slug in slugs if slug not in fresh]
+
+    def put(self, slug, question):
+        """ Stores the GraphQL question object of a slug. """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO metadata (slug, question_id, example_testcases, default_code, fetched) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (slug, question.get('questionId'), question.get('exampleTestcases'),
+                 default_code(question.get('codeDefinition')), time.time()))
+            self.stats['Stores'] += 1
+            self.connection.commit()
+
+    def report(self):
+        return (f"Metadata cache: {self.stats['Hits']} hits, {self.stats['Misses']} misses, "
+                f"{self.stats['Stores']} questions fetched")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the question metadata cache.")
+    parser.add_argument("path", nargs="?", default="LeetCodeMetadata.sqlite", help="Path of the cache file")
+    args = parser.parse_args()
+    cache = MetadataCache(args.path, ttl=None)
+    count, without_code, oldest = cache.connection.execute(
+        "SELECT COUNT(*), SUM(default_code IS NULL), MIN(fetched) FROM metadata").fetchone()
+    print(f"{count} questions cached, {without_code or 0} without python3 code"
+          + (f", oldest fetched {time.ctime(oldest)}" if oldest else ""))
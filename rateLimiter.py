@@ -0,0 +1,106 @@
+import threading
+import time
+
+# Requests per minute and tokens per minute of each model family. Checked in order, first prefix match wins.
+MODEL_LIMITS = [
+    ("gemini", 15, 1000000),
+    ("gpt-4o-mini", 500, 200000),
+    ("gpt-4o", 500, 30000),
+    ("gpt-3.5-turbo", 3500, 200000),
+    ("o1-mini", 500, 200000),
+    ("o3-mini", 500, 200000),
+]
+DEFAULT_LIMITS = (500, 200000)
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now, scale=1.0):
+        """ Adds the tokens earned since the last refill. """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate * scale)
+        self.updated = now
+
+    def wait_time(self, amount, scale=1.0):
+        """ Returns the seconds until the given amount can be consumed. """
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / (self.rate * scale)
+
+
+class RateLimiter:
+    """Paces the requests of one model to its requests/min and tokens/min quota and backs off on 429s."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute, min_scale=0.05, max_backoff=60):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.min_scale = min_scale
+        self.max_backoff = max_backoff
+        # Fraction of the quota currently used. Halved on every 429 and slowly restored on success.
+        self.scale = 1.0
+        self.cooldown_until = 0.0
+        self.consecutive_limits = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, estimated_tokens):
+        """ Blocks until a request with the estimated number of tokens fits in the quota. """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.requests.refill(now, self.scale)
+                self.tokens.refill(now, self.scale)
+                wait = max(self.requests.wait_time(1, self.scale), self.tokens.wait_time(estimated_tokens, self.scale),
+                           self.cooldown_until - now)
+                if wait <= 0:
+                    self.requests.tokens -= 1
+                    self.tokens.tokens -= estimated_tokens
+                    return
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens, used_tokens):
+        """ Corrects the token bucket with the usage reported by the API. """
+        with self.lock:
+            self.tokens.tokens -= used_tokens - estimated_tokens
+            self.consecutive_limits = 0
+            self.scale = min(1.0, self.scale + 0.05)
+
+    def backoff(self, retry_after=None):
+        """ Reduces the request rate after the provider rejected a request for exceeding its quota. """
+        with self.lock:
+            self.consecutive_limits += 1
+            self.scale = max(self.min_scale, self.scale / 2)
+            delay = retry_after if retry_after else min(self.max_backoff, 2 ** self.consecutive_limits)
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+            return delay
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model, requests_per_minute=None, tokens_per_minute=None):
+    """ Returns the rate limiter of a model, creating it from the given or default quota on first use. """
+    with _rate_limiters_lock:
+        if model not in _rate_limiters:
+            default_rpm, default_tpm = next(((rpm, tpm) for prefix, rpm, tpm in MODEL_LIMITS
+                                             if model.lower().startswith(prefix)), DEFAULT_LIMITS)
+            _rate_limiters[model] = RateLimiter(requests_per_minute or default_rpm, tokens_per_minute or default_tpm)
+        return _rate_limiters[model]
+
+
+def estimate_tokens(messages):
+    """ Roughly estimates the prompt tokens of a message list (about four characters per token). """
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4 + 1
+
+
+def retry_after_seconds(error):
+    """ Reads the Retry-After header of a rate limited API response, if present. """
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
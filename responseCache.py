@@ -0,0 +1,117 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """Persistent SQLite cache of LLM responses keyed by a hash of the model, messages and request parameters."""
+
+    def __init__(self, path="LLMResponseCache.sqlite", max_bytes=1024 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'Hits': 0, 'Misses': 0, 'Stores': 0, 'Evictions': 0}
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                contents TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                size INTEGER,
+                created REAL,
+                last_access REAL
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, messages, **params):
+        """ Returns the content hash identifying a request. """
+        request = json.dumps({'model': model, 'messages': messages, 'params': params}, sort_keys=True,
+                             ensure_ascii=False)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """ Returns the cached response of a request or None if it was never stored. """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT model, contents, prompt_tokens, completion_tokens FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.stats['Misses'] += 1
+                return None
+            self.stats['Hits'] += 1
+            self.connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        return {'model': row[0], 'contents': json.loads(row[1]), 'prompt_tokens': row[2],
+                'completion_tokens': row[3]}
+
+    def put(self, key, model, contents, prompt_tokens, completion_tokens):
+        """ Stores the response of a request and evicts the least recently used entries beyond the size limit. """
+        serialized = json.dumps(contents, ensure_ascii=False)
+        size = len(key) + len(serialized.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            previous = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (key, model, serialized, prompt_tokens, completion_tokens, size, now, now))
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self.stats['Stores'] += 1
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        """ Deletes the least recently used entries until the cache fits in max_bytes. """
+        while self.total_bytes > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                self.stats['Evictions'] += 1
+
+    def report(self):
+        """ Summarizes the cache hit rate and size. """
+        lookups = self.stats['Hits'] + self.stats['Misses']
+        hit_rate = self.stats['Hits'] / lookups * 100 if lookups else 0.0
+        return (f"Response cache: {self.stats['Hits']} hits, {self.stats['Misses']} misses ({hit_rate:.1f}% hit rate), "
+                f"{self.stats['Stores']} stored, {self.stats['Evictions']} evicted, "
+                f"{self.total_bytes / (1024 * 1024):.1f} MB used")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_response_caches = {}
+_response_caches_lock = threading.Lock()
+
+
+def get_response_cache(path, max_bytes=1024 * 1024 * 1024):
+    """ Returns the process wide cache stored at the given path. """
+    with _response_caches_lock:
+        if path not in _response_caches:
+            _response_caches[path] = ResponseCache(path, max_bytes)
+        return _response_caches[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the LLM response cache.")
+    parser.add_argument("path", help="Path of the cache file")
+    args = parser.parse_args()
+    cache = ResponseCache(args.path)
+    entries = cache.connection.execute("SELECT model, COUNT(*), SUM(size) FROM responses GROUP BY model").fetchall()
+    for model, count, size in entries:
+        print(f"{model}: {count} responses, {size / (1024 * 1024):.1f} MB")
+    print(cache.report())
@@ -0,0 +1,211 @@
+import argparse
+import ast
+import json
+import re
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+# Per-question values. Every other column of question_data holds one value per LLM call, iteration or test run
+# and is stored in a table of its own with one typed row per value.
+QUESTION_COLUMNS = {
+    'Question Name': 'question_name',
+    'Question Description': 'question_description',
+    'Solved': 'solved',
+    'Iteration Solved': 'iteration_solved',
+    'Total Time Req': 'total_time'
+}
+SQL_TYPES = {bool: 'INTEGER', int: 'INTEGER', float: 'REAL', str: 'TEXT'}
+# Value types of the list columns of question_data. Columns holding lists, dicts or values of mixed types are stored
+# as JSON. Columns that are not listed take the type of their first value.
+LIST_COLUMN_TYPES = {
+    'Test Cases List': 'JSON',
+    'Prompt List': 'TEXT',
+    'Token Length Prompt': 'INTEGER',
+    'Token Length Response': 'INTEGER',
+    'Error List': 'JSON',
+    'Tests Failed List': 'INTEGER',
+    'Candidate Tests Failed List': 'JSON',
+    'Candidate Selected': 'INTEGER',
+    'Dedup Hit List': 'INTEGER',
+    'Test Results List': 'JSON',
+    'Test Metrics List': 'JSON',
+    'Complexity List': 'JSON',
+    'Time Req': 'REAL',
+    'Time To First Token': 'REAL'
+}
+
+
+def table_name(column):
+    """ Converts a question_data column like 'Token Length Prompt' to a table name like 'token_length_prompt'. """
+    return re.sub(r'\W+', '_', column.strip().lower())
+
+
+class ResultsStore:
+    """SQLite store of typed per-question and per-iteration results with buffered batch writes."""
+
+    def __init__(self, path, model, batch_size=20):
+        self.path = path
+        self.model = model
+        self.batch_size = batch_size
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                model TEXT,
+                question_name TEXT,
+                question_description TEXT,
+                solved INTEGER,
+                iteration_solved INTEGER,
+                total_time REAL,
+                saved_at REAL
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS questions_name ON questions (model, question_name)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS list_columns (name TEXT PRIMARY KEY, tbl TEXT, type TEXT)")
+        self.connection.commit()
+        self.column_types = {name: (tbl, sql_type) for name, tbl, sql_type in
+                             self.connection.execute("SELECT name, tbl, type FROM list_columns")}
+
+    def _column_table(self, column, values):
+        """ Returns the table and value type of a list column, creating the table on first use. """
+        if column not in self.column_types:
+            sql_type = LIST_COLUMN_TYPES.get(column)
+            if sql_type is None:
+                first = next((value for value in values if value is not None), None)
+                sql_type = SQL_TYPES.get(type(first), 'JSON') if first is not None else 'JSON'
+            tbl = "values_" + table_name(column)
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {tbl} (
+                    question_id INTEGER REFERENCES questions (id),
+                    position INTEGER,
+                    value {sql_type}
+                )""")
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {tbl}_question ON {tbl} (question_id)")
+            self.connection.execute("INSERT OR REPLACE INTO list_columns VALUES (?, ?, ?)", (column, tbl, sql_type))
+            self.column_types[column] = (tbl, sql_type)
+        return self.column_types[column]
+
+    @staticmethod
+    def _encode(value, sql_type):
+        if value is None:
+            return None
+        if sql_type == 'JSON' or type(value) not in SQL_TYPES:
+            return json.dumps(value, default=repr)
+        return value
+
+    def add(self, question_data, on_saved=None):
+        """ Buffers the results of one question. on_saved is called once they are committed to disk. """
+        with self.lock:
+            self.buffer.append((json.loads(json.dumps(question_data, default=repr)), on_saved))
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        """ Writes all buffered questions in a single transaction. """
+        if not self.buffer:
+            return
+        buffered, self.buffer = self.buffer, []
+        with self.connection:
+            for question_data, _ in buffered:
+                scalars = {name: (question_data.get(column) or [None])[0] for column, name in QUESTION_COLUMNS.items()}
+                cursor = self.connection.execute(
+                    "INSERT INTO questions (model, question_name, question_description, solved, iteration_solved, "
+                    "total_time, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.model, scalars['question_name'], scalars['question_description'],
+                     None if scalars['solved'] is None else int(scalars['solved'] == 'Yes'),
+                     scalars['iteration_solved'], scalars['total_time'], time.time()))
+                question_id = cursor.lastrowid
+                for column, values in question_data.items():
+                    if column in QUESTION_COLUMNS:
+                        continue
+                    values = values[0] if values and isinstance(values[0], list) else values
+                    tbl, sql_type = self._column_table(column, values)
+                    self.connection.executemany(f"INSERT INTO {tbl} VALUES (?, ?, ?)",
+                                                [(question_id, position, self._encode(value, sql_type))
+                                                 for position, value in enumerate(values)])
+        for _, on_saved in buffered:
+            if on_saved:
+                on_saved()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+
+def load_questions(path, model=None):
+    """ Loads the per-question results as a DataFrame. """
+    with sqlite3.connect(path) as connection:
+        query = "SELECT * FROM questions" + (" WHERE model = ?" if model else "") + " ORDER BY id"
+        return pd.read_sql_query(query, connection, params=(model,) if model else None)
+
+
+def load_column(path, column, model=None):
+    """ Loads one list column, e.g. 'Token Length Prompt', as a long DataFrame with one typed row per value. """
+    with sqlite3.connect(path) as connection:
+        tbl, sql_type = connection.execute("SELECT tbl, type FROM list_columns WHERE name = ?", (column,)).fetchone()
+        query = (f"SELECT q.question_name, v.question_id, v.position, v.value FROM {tbl} v "
+                 f"JOIN questions q ON q.id = v.question_id" + (" WHERE q.model = ?" if model else "") +
+                 " ORDER BY v.question_id, v.position")
+        df = pd.read_sql_query(query, connection, params=(model,) if model else None)
+    if sql_type == 'JSON':
+        # NULL values come back as NaN, and an inferred string dtype would turn decoded None back into NaN
+        df['value'] = pd.Series([json.loads(value) if isinstance(value, str) else None for value in df['value']],
+                                index=df.index, dtype=object)
+    return df
+
+
+def load_results(path, model=None):
+    """ Loads the results in the layout of ResponseList_<model>.csv with list columns as real lists. """
+    questions = load_questions(path, model)
+    results = pd.DataFrame({'Question Name': questions['question_name'],
+                            'Question Description': questions['question_description']})
+    with sqlite3.connect(path) as connection:
+        columns = [name for (name,) in connection.execute("SELECT name FROM list_columns ORDER BY rowid")]
+    for column in columns:
+        values = load_column(path, column, model).groupby('question_id')['value'].apply(list)
+        results[column] = [values.get(question_id, []) for question_id in questions['id']]
+    results['Solved'] = questions['solved'].map({1: 'Yes', 0: 'No'})
+    results['Iteration Solved'] = questions['iteration_solved']
+    results['Total Time Req'] = questions['total_time']
+    return results
+
+
+def _parse_cell(value):
+    """ Parses a list column stringified by the CSV writer. """
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return [value]
+    return parsed if isinstance(parsed, list) else [parsed]
+
+
+def import_csv(csv_file_name, path, model):
+    """ Converts an existing ResponseList_<model>.csv into a results store. """
+    store = ResultsStore(path, model, batch_size=500)
+    df = pd.read_csv(csv_file_name, index_col=0)
+    for row in df.to_dict('records'):
+        question_data = {}
+        for column, value in row.items():
+            if column in QUESTION_COLUMNS:
+                question_data[column] = [value]
+            else:
+                question_data[column] = [_parse_cell(value) if isinstance(value, str) else []]
+        store.add(question_data)
+    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a ResponseList CSV file into a results store.")
+    parser.add_argument("model", help="Model the results belong to")
+    parser.add_argument("csv_file", help="ResponseList CSV file to convert")
+    parser.add_argument("-o", "--output", help="Results store file (defaults to ResponseList_<model>.sqlite)")
+    args = parser.parse_args()
+    import_csv(args.csv_file, args.output or f"ResponseList_{args.model}.sqlite", args.model)
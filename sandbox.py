@@ -0,0 +1,294 @@
+import copy
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+import traceback
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # rlimits are not available on Windows
+    resource = None
+
+
+class SandboxTimeout(Exception):
+    """Raised when a solution exceeded its time limit and its worker was killed."""
+
+
+class SolutionError(Exception):
+    """Carries an exception raised by a solution inside a sandbox worker."""
+
+    def __init__(self, message, worker_traceback=None):
+        super().__init__(message)
+        self.worker_traceback = worker_traceback
+
+
+def _set_memory_limit(memory_limit_mb):
+    """ Caps the address space of the current worker process. """
+    if resource is None or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard if hard != resource.RLIM_INFINITY else limit))
+
+
+def _set_cpu_limit(seconds):
+    """ Allows the current worker process to use the given CPU seconds on top of what it already used. """
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def _send(connection, message):
+    """ Sends a message, falling back to the repr of outputs that can not be pickled. """
+    try:
+        connection.send(message)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        kind, payload = message
+        payload = dict(payload, Output=repr(payload.get('Output')))
+        connection.send((kind, payload))
+
+
+def _worker(connection, memory_limit_mb):
+    """ Executes solutions received over the connection until it is closed. """
+    _set_memory_limit(memory_limit_mb)
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        if job == 'stop':  # a stop request that arrived after the job had already finished
+            continue
+        code, function_name, calls, cpu_seconds, measure_memory = job
+        _set_cpu_limit(cpu_seconds)
+        namespace = {"__name__": "__solution__"}
+        try:
+            exec(code, namespace)
+        except BaseException as e:
+            _send(connection, ('compiled', {'Error': str(e) or type(e).__name__, 'Traceback': traceback.format_exc()}))
+            continue
+        _send(connection, ('compiled', {'Error': None}))
+        function = namespace.get(function_name) if function_name else None
+        for args in calls:
+            if connection.poll():  # the parent asked to stop running the remaining tests
+                connection.recv()
+                break
+            # The call may change its arguments, the memory is measured on a copy made beforehand
+            memory_args = copy.deepcopy(args) if measure_memory else None
+            start, cpu_start = time.perf_counter(), time.process_time()
+            try:
+                output, error, error_traceback = function(*args), None, None
+            except BaseException as e:
+                output, error, error_traceback = None, str(e) or type(e).__name__, traceback.format_exc()
+            elapsed, cpu_time = time.perf_counter() - start, time.process_time() - cpu_start
+            peak_memory = None
+            if measure_memory and error is None:
+                # Tracing slows down every allocation, so the peak is measured by calling the function once more
+                tracemalloc.start()
+                try:
+                    function(*memory_args)
+                except BaseException:
+                    pass
+                # Peak bytes allocated by Python during the call, including its output
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            _send(connection, ('result', {'Output': output, 'Error': error, 'Traceback': error_traceback,
+                                          'Time': elapsed, 'CPU Time': cpu_time, 'Peak Memory': peak_memory}))
+        _send(connection, ('done', {}))
+
+
+class SandboxWorker:
+    """A pre-forked worker process and the connection used to send it jobs."""
+
+    def __init__(self, context, memory_limit_mb):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child_connection, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.jobs = 0
+
+    def stop(self):
+        """ Asks the worker to exit and kills it if it does not. """
+        try:
+            self.connection.send(None)
+            self.process.join(1)
+        except (OSError, ValueError):
+            pass
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class SandboxPool:
+    """Pool of pre-forked processes that compile and test solutions under hard time and memory limits."""
+
+    def __init__(self, workers=None, memory_limit_mb=2048, max_jobs_per_worker=50):
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            self.context.set_forkserver_preload(["sandbox"])
+        self.workers = []
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        for _ in range(workers or os.cpu_count() or 1):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = SandboxWorker(self.context, self.memory_limit_mb)
+        with self.lock:
+            self.workers.append(worker)
+        self.idle.put(worker)
+
+    def _retire(self, worker, kill=False):
+        """ Replaces a timed out or worn out worker with a fresh process. """
+        with self.lock:
+            self.workers.remove(worker)
+        worker.kill() if kill else worker.stop()
+        self._add_worker()
+
+    def run(self, code, function_name=None, calls=(), compile_timeout=30, test_timeout=30, should_stop=None,
+            deadline=None, measure_memory=False):
+        """ Compiles the code in a worker and calls the function with each argument tuple of calls.
+
+        Returns a dict with the compile error (or None), the per-call results received before any timeout, whether
+        the worker had to be killed and whether that happened before the code compiled. 'Crashed' tells a worker
+        that died on its own, e.g. of its memory limit, from one that ran out of time. should_stop(index, result)
+        can end the run after a result. deadline is a time.monotonic() value after which the run is ended like a
+        timeout. Results carry the wall and CPU time of each call, and its peak memory in bytes when measure_memory
+        is set (each call then runs a second time, traced, after it was timed).
+        """
+        calls = list(calls)
+        execution = {'Compile Error': None, 'Compile Traceback': None, 'Results': [], 'Timed Out': False,
+                     'Compile Timed Out': False, 'Crashed': False}
+        compiled = False
+        try:
+            worker = self.idle.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        except queue.Empty:  # no worker became free before the deadline
+            execution['Timed Out'] = True
+            return execution
+        worker.jobs += 1
+        # Measuring memory runs every call twice, the time limit applies to each run
+        call_timeout = test_timeout * 2 if measure_memory else test_timeout
+        try:
+            worker.connection.send((code, function_name, calls, compile_timeout + call_timeout * len(calls),
+                                    measure_memory))
+            timeout, stopping = compile_timeout, False
+            while True:
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+                if not worker.connection.poll(timeout):
+                    raise SandboxTimeout()
+                kind, payload = worker.connection.recv()
+                if kind == 'compiled':
+                    compiled = True
+                    execution['Compile Error'] = payload['Error']
+                    execution['Compile Traceback'] = payload.get('Traceback')
+                    if payload['Error'] is not None:
+                        break
+                elif kind == 'result':
+                    execution['Results'].append(payload)
+                    if not stopping and should_stop and should_stop(len(execution['Results']) - 1, payload):
+                        worker.connection.send('stop')
+                        stopping = True
+                else:
+                    break
+                timeout = call_timeout
+        except (SandboxTimeout, EOFError, OSError) as e:
+            # The worker exceeded its time limit or was killed by its CPU/memory rlimits
+            execution['Timed Out'] = True
+            execution['Compile Timed Out'] = not compiled
+            self._retire(worker, kill=True)
+            execution['Crashed'] = not isinstance(e, SandboxTimeout) and (
+                    worker.process.exitcode != -getattr(signal, 'SIGXCPU', 0))
+            return execution
+        if worker.jobs >= self.max_jobs_per_worker:
+            self._retire(worker)
+        else:
+            self.idle.put(worker)
+        return execution
+
+    def run_parallel(self, code, function_name, calls, compile_timeout=30, test_timeout=30, budget=None, shards=None,
+                     measure_memory=False):
+        """ Runs the calls spread over several workers at once and returns the result of every call.
+
+        Calls are dealt round robin into shards, one per worker by default. When a call times out its worker is
+        replaced and the rest of its shard continues in another worker, until budget seconds have passed in total.
+        Results are in the order of calls. Timed out calls have a result with 'Timed Out' set and calls that were not
+        run before the budget ran out have None. Code that does not compile in time stops every shard, as it would
+        time out in any worker, and is reported with 'Compile Timed Out' set.
+        """
+        calls = list(calls)
+        shards = max(1, min(shards or len(self.workers) or 1, len(calls)))
+        deadline = None if budget is None else time.monotonic() + budget
+        execution = {'Compile Error': None, 'Compile Traceback': None, 'Results': [None] * len(calls),
+                     'Timed Out': False, 'Compile Timed Out': False}
+        stopped = threading.Event()
+
+        def run_shard(indices):
+            while indices and not stopped.is_set() and (deadline is None or time.monotonic() < deadline):
+                shard = self.run(code, function_name, [calls[index] for index in indices], compile_timeout,
+                                 test_timeout, deadline=deadline, measure_memory=measure_memory)
+                if shard['Compile Error'] is not None:
+                    execution['Compile Error'] = shard['Compile Error']
+                    execution['Compile Traceback'] = shard['Compile Traceback']
+                    return
+                for index, result in zip(indices, shard['Results']):
+                    execution['Results'][index] = result
+                if not shard['Timed Out']:
+                    return
+                execution['Timed Out'] = True
+                if shard['Compile Timed Out']:
+                    execution['Compile Timed Out'] = True
+                    stopped.set()
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    return  # the budget ran out, the calls that did not finish are left as not run
+                finished = len(shard['Results'])
+                if finished < len(indices):
+                    execution['Results'][indices[finished]] = {'Output': None, 'Error': None, 'Traceback': None,
+                                                               'Time': None, 'CPU Time': None, 'Peak Memory': None,
+                                                               'Timed Out': True}
+                indices = indices[finished + 1:]
+
+        threads = [threading.Thread(target=run_shard, args=(list(range(start, len(calls), shards)),), daemon=True)
+                   for start in range(shards)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return execution
+
+    def close(self):
+        """ Stops all worker processes. """
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.stop()
+
+
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool(workers=None, memory_limit_mb=2048):
+    """ Returns the process wide sandbox pool, starting its workers on first use. """
+    global _sandbox_pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = SandboxPool(workers, memory_limit_mb)
+        return _sandbox_pool
@@ -0,0 +1,114 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+import pandas as pd
+
+# Columns of LeetCode.xlsx and the table columns they are stored in, in order
+COLUMNS = {
+    'Question Name': 'question_name',
+    'Question Url': 'question_url',
+    'Premium': 'premium',
+    'Question Difficulty': 'question_difficulty',
+    'Question Topics': 'question_topics',
+    'Question Description': 'question_description',
+    'Question Examples Count': 'question_examples_count',
+    'Question Examples': 'question_examples'
+}
+
+
+def question_slug(question_url):
+    """ Returns the slug of a question url, e.g. 'two-sum' for https://leetcode.com/problems/two-sum/. """
+    parts = [part for part in urlparse(question_url).path.split('/') if part]
+    if 'problems' in parts[:-1]:
+        return parts[parts.index('problems') + 1]
+    return parts[-1] if parts else question_url
+
+
+def _encode(value):
+    # Lists are stored the way they are written to the xlsx file, which the readers parse with literal_eval
+    return str(value) if isinstance(value, (list, tuple)) else value
+
+
+class ScrapeStore:
+    """SQLite journal of scraped questions keyed by slug.
+
+    Every page is written as one transaction, so an interrupted scrape keeps the pages it finished and a rerun only
+    scrapes the questions that are missing. The xlsx file is exported once from the store.
+    """
+
+    def __init__(self, path="LeetCodeScrape.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS questions (
+                slug TEXT PRIMARY KEY,
+                page INTEGER,
+                row INTEGER,
+                {', '.join(f'{column} TEXT' for column in COLUMNS.values())},
+                scraped_at REAL
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS questions_order ON questions (page, row)")
+        self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def scraped_slugs(self):
+        """ Returns the slugs of every stored question. """
+        with self.lock:
+            return {slug for slug, in self.connection.execute("SELECT slug FROM questions")}
+
+    def upsert(self, records):
+        """ Stores records, dicts with the columns of LeetCode.xlsx plus 'Page' and 'Row', replacing the stored
+        version of questions scraped before. """
+        columns = list(COLUMNS.values())
+        updates = ', '.join(f"{column} = excluded.{column}" for column in ['page', 'row', *columns, 'scraped_at'])
+        rows = [(question_slug(record['Question Url']), record.get('Page'), record.get('Row'),
+                 *(_encode(record.get(name)) for name in COLUMNS), time.time()) for record in records]
+        with self.lock:
+            self.connection.executemany(
+                f"INSERT INTO questions (slug, page, row, {', '.join(columns)}, scraped_at) "
+                f"VALUES ({', '.join('?' * (len(columns) + 4))}) ON CONFLICT (slug) DO UPDATE SET {updates}", rows)
+            self.connection.commit()
+        return len(rows)
+
+    def import_xlsx(self, excel_file_name):
+        """ Loads the questions of an existing LeetCode file, so that they are not scraped again. """
+        df = pd.read_excel(excel_file_name, dtype=str, keep_default_na=False)
+        records = df.to_dict('records')
+        for position, record in enumerate(records):
+            record['Page'], record['Row'] = 0, position
+        return self.upsert(record for record in records if record.get('Question Url'))
+
+    def export_xlsx(self, excel_file_name, sheet_name):
+        """ Writes every stored question to a new LeetCode file, in problem set order. """
+        with self.lock:
+            df = pd.read_sql_query(f"SELECT {', '.join(COLUMNS.values())} FROM questions ORDER BY page, row",
+                                   self.connection)
+        df.columns = list(COLUMNS)
+        df['Question Examples Count'] = pd.to_numeric(df['Question Examples Count'], errors='coerce')
+        temporary_file_name = excel_file_name + ".tmp.xlsx"
+        with pd.ExcelWriter(temporary_file_name, engine='xlsxwriter') as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        os.replace(temporary_file_name, excel_file_name)
+        return len(df)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the scraped questions to a LeetCode file.")
+    parser.add_argument("path", nargs="?", default="LeetCodeScrape.sqlite", help="Path of the scrape store")
+    parser.add_argument("-o", "--output", default="LeetCode.xlsx", help="LeetCode file to write")
+    parser.add_argument("--sheet", default="All Problems", help="Sheet name of the LeetCode file")
+    args = parser.parse_args()
+    store = ScrapeStore(args.path)
+    print(f"Exported {store.export_xlsx(args.output, args.sheet)} questions to {args.output}.")
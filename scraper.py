@@ -1,105 +1,172 @@
-import time
+import argparse
 import os
+import queue
+import threading
 import traceback
-import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from scrapeStore import ScrapeStore, question_slug
 
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(message)s')
 
 
+class BrowserPool:
+    """Bounded pool of long-lived browsers shared by the threads that scrape questions concurrently."""
+
+    _driver_path = None
+    _driver_path_lock = threading.Lock()
+
+    def __init__(self, size=4, headless=True):
+        self.size = size
+        self.headless = headless
+        self.idle = queue.Queue()
+        self.browsers = []
+        self.lock = threading.Lock()
+        for _ in range(size):
+            self.idle.put(None)  # browsers are started on first use
+
+    @classmethod
+    def driver_path(cls):
+        """ Installs ChromeDriver once per process and returns its path. """
+        with cls._driver_path_lock:
+            if cls._driver_path is None:
+                cls._driver_path = ChromeDriverManager().install()
+            return cls._driver_path
+
+    def start_browser(self):
+        options = webdriver.ChromeOptions()
+        options.add_argument('--incognito')
+        options.add_argument('--disable-search-engine-choice-screen')
+        options.add_argument("--log-level=3")
+        if self.headless:
+            options.add_argument('--headless=new')
+        browser = webdriver.Chrome(service=Service(self.driver_path()), options=options)
+        with self.lock:
+            self.browsers.append(browser)
+        return browser
+
+    def acquire(self):
+        """ Waits for a free browser, starting it if it was not used before. """
+        browser = self.idle.get()
+        try:
+            return browser if browser is not None else self.start_browser()
+        except Exception:
+            self.idle.put(None)
+            raise
+
+    def release(self, browser, broken=False):
+        """ Returns a browser to the pool. Broken browsers are closed and replaced on the next acquire. """
+        if broken:
+            self.discard(browser)
+            browser = None
+        self.idle.put(browser)
+
+    def discard(self, browser):
+        with self.lock:
+            if browser in self.browsers:
+                self.browsers.remove(browser)
+        try:
+            browser.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """ Closes every browser of the pool. """
+        with self.lock:
+            browsers, self.browsers = self.browsers, []
+        for browser in browsers:
+            try:
+                browser.quit()
+            except Exception:
+                pass
+
+
 class LeetCodeScraper:
     EXCEL_FILE_NAME = 'LeetCode.xlsx'
     SHEET_NAME = 'All Problems'
-    SLEEP_TIME = 5
+    # Seconds to wait for a page, and for the description of a question that turns out to be premium
+    PAGE_TIMEOUT = 20
+    DESCRIPTION_TIMEOUT = 5
 
-    def __init__(self, site_url='https://leetcode.com/problemset/all/'):
+    def __init__(self, site_url='https://leetcode.com/problemset/all/', base_url='https://leetcode.com', browsers=4,
+                 headless=True, store_file='LeetCodeScrape.sqlite', refresh=False):
         self.site_url = site_url
-        self.data = {
-            'Question Name': [],
-            'Question Url': [],
-            'Premium': [],
-            'Question Difficulty': [],
-            'Question Topics': [],
-            'Question Description': [],
-            'Question Examples Count': [],
-            'Question Examples': []
-        }
+        # Question links are relative, this is where they are resolved, e.g. a local server with saved pages
+        self.base_url = base_url.rstrip('/')
+        self.pool = BrowserPool(browsers, headless)
+        # Scraped questions are journaled here and exported to the Excel file once at the end
+        self.store = ScrapeStore(store_file)
+        self.refresh = refresh
+        if not len(self.store) and os.path.exists(self.EXCEL_FILE_NAME):
+            logging.warning(f"Imported {self.store.import_xlsx(self.EXCEL_FILE_NAME)} questions from {self.EXCEL_FILE_NAME}")
 
     def save_to_excel(self):
-        """Saves the collected data to an Excel file."""
-        df = pd.DataFrame(self.data)
-        if os.path.exists(self.EXCEL_FILE_NAME):
-            logging.warning("Appending to Excel sheet")
-            with pd.ExcelWriter(self.EXCEL_FILE_NAME, engine='openpyxl', mode='a', if_sheet_exists="overlay") as writer:
-                df.to_excel(writer, sheet_name=self.SHEET_NAME, index=False, header=False,startrow=writer.sheets[self.SHEET_NAME].max_row)
-        else:
-            logging.warning("Creating Excel sheet")
-            with pd.ExcelWriter(self.EXCEL_FILE_NAME, engine='xlsxwriter') as writer:
-                df.to_excel(writer, sheet_name=self.SHEET_NAME, index=False)
-
-        for key in self.data:
-            self.data[key].clear()
-        logging.warning("Finished writing to Excel sheet.")
+        """Exports every scraped question to the Excel file."""
+        logging.warning("Creating Excel sheet")
+        count = self.store.export_xlsx(self.EXCEL_FILE_NAME, self.SHEET_NAME)
+        logging.warning(f"Finished writing {count} questions to Excel sheet.")
 
     def open_browser(self, url):
-        """Initializes and returns a Selenium web driver for the given url."""
+        """Takes a browser from the pool and opens the given url in it."""
         logging.warning(f"Opening browser at {url}")
-        options = webdriver.ChromeOptions()
-        options.add_argument('--incognito')
-        options.add_argument('--disable-search-engine-choice-screen')
-        options.add_argument("--log-level=3")
-        # options.add_argument('--headless')
-
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        driver.get(url)
+        driver = self.pool.acquire()
+        try:
+            driver.get(url)
+        except Exception:
+            self.pool.release(driver, broken=True)
+            raise
         return driver
 
+    def close_browser(self, driver, broken=False):
+        """Returns the web driver instance to the pool."""
+        self.pool.release(driver, broken)
 
-    def close_browser(self, driver):
-        """Closes the web driver instance."""
-        logging.warning("Closing the browser")
-        driver.quit()
-
-    def fetch_question_details(self, question_name, question_url):
-        """Fetches and stores details of a question by scraping its page."""
+    def scrape_question(self, question_name, question_url):
+        """Scrapes the details of a question from its page. Returns None if the page could not be scraped."""
         logging.warning(f"Fetching question details for: {question_name}")
         browser = self.open_browser(question_url)
-        time.sleep(self.SLEEP_TIME)
+        broken = False
         try:
-            page_source = browser.page_source
             question_title = question_name.split(". ", 1)[1].strip() + " - LeetCode"
             question_title = ' '.join(question_title.split())
-            WebDriverWait(browser, 10).until(EC.title_contains(question_title))
+            WebDriverWait(browser, self.PAGE_TIMEOUT).until(EC.title_contains(question_title))
+            try:
+                # Premium questions never render a description
+                WebDriverWait(browser, self.DESCRIPTION_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div.elfjS')))
+            except TimeoutException:
+                pass
             logging.warning(f"Problem : {question_name}")
-            soup = BeautifulSoup(page_source, 'html.parser')
+            soup = BeautifulSoup(browser.page_source, 'html.parser')
             logging.warning(f"Parsing Question data:")
 
             description_block = soup.find('div', class_='elfjS')
             if description_block:
-                self.data['Premium'].append("No")
-                self.data['Question Description'].append(self._extract_description(description_block))
-                self.data['Question Examples'].append(self._extract_examples(description_block))
-                self.data['Question Examples Count'].append(len(self._extract_examples(description_block)))
-                self.data['Question Topics'].append(self._extract_topics(soup))
+                examples = self._extract_examples(description_block)
                 logging.warning(f"Fetched question details for : {question_name}")
-            else:
-                logging.warning(f"{question_name} is a premium question")
-                self.data['Premium'].append("Yes")
-                self.data['Question Description'].append("")
-                self.data['Question Examples Count'].append(0)
-                self.data['Question Examples'].append([])
-                self.data['Question Topics'].append([])
+                return {'Premium': "No", 'Question Description': self._extract_description(description_block),
+                        'Question Examples': examples, 'Question Examples Count': len(examples),
+                        'Question Topics': self._extract_topics(soup)}
+            logging.warning(f"{question_name} is a premium question")
+            return {'Premium': "Yes", 'Question Description': "", 'Question Examples Count': 0,
+                    'Question Examples': [], 'Question Topics': []}
 
+        except TimeoutException as e:
+            logging.error(f"Error fetching details for {question_name}: page did not load")
         except Exception as e:
+            broken = True
             logging.error(f"Error fetching details for {question_name}: {e}")
         finally:
-            self.close_browser(browser)
+            self.close_browser(browser, broken)
+        return None
 
     def _extract_description(self, description_block):
         """Extracts and returns the question description."""
@@ -123,62 +190,88 @@ class LeetCodeScraper:
         topics = [topic.text for topic in related_topics_block.find_all('a')] if related_topics_block else []
         return topics
 
-    def fetch_page_data(self, page_url):
-        """Fetches questions from a specific page and stores the data."""
+    def fetch_page_data(self, page_url, page=1):
+        """Fetches questions from a specific page, scrapes the ones not stored yet concurrently and stores them."""
         logging.warning(f"Fetching page data from: {page_url}")
         browser = self.open_browser(page_url)
-        time.sleep(self.SLEEP_TIME)
-
+        broken = False
+        questions = []
         try:
-            WebDriverWait(browser, 10).until(EC.title_contains("Problems - LeetCode"))
+            WebDriverWait(browser, self.PAGE_TIMEOUT).until(EC.title_contains("Problems - LeetCode"))
+            WebDriverWait(browser, self.PAGE_TIMEOUT).until(
+                lambda driver: len(driver.find_elements(By.CSS_SELECTOR, 'div[role="rowgroup"]')) > 2)
             logging.warning(f"title is: {browser.title}")
             soup = BeautifulSoup(browser.page_source, 'html.parser')
             logging.warning("Parsing data: ")
             question_block = soup.find_all('div', role='rowgroup')[2]
-            questions = question_block.find_all('div', role='row')
 
-            for question in questions:
+            for question in question_block.find_all('div', role='row'):
                 row = question.find_all('div', role='cell')
-                question_name = row[1].find('a').text
-                question_url = 'https://leetcode.com' + row[1].find('a')['href']
-                question_difficulty = row[4].find('span').text
-
-                self.data['Question Name'].append(question_name if question_name else "")
-                self.data['Question Url'].append(question_url if question_url else "")
-                self.data['Question Difficulty'].append(question_difficulty if question_difficulty else "")
-                self.fetch_question_details(question_name, question_url)
-                self.save_to_excel()
-
-            logging.warning(f"Fetched all questions in the page: {page_url}")
+                questions.append((row[1].find('a').text, self.base_url + row[1].find('a')['href'],
+                                  row[4].find('span').text))
         except Exception as e:
+            broken = not isinstance(e, TimeoutException)
             logging.error(f"Error fetching page data: {e}")
         finally:
-            self.close_browser(browser)
+            self.close_browser(browser, broken)
+
+        scraped = set() if self.refresh else self.store.scraped_slugs()
+        questions = [(row, question) for row, question in enumerate(questions)
+                     if question_slug(question[1]) not in scraped]
+        # One question per pooled browser at a time
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            details = list(executor.map(lambda question: self.scrape_question(question[1][0], question[1][1]),
+                                        questions))
+        records = []
+        for (row, (question_name, question_url, question_difficulty)), question_details in zip(questions, details):
+            if question_details is None:
+                continue
+            records.append({'Question Name': question_name if question_name else "",
+                            'Question Url': question_url if question_url else "",
+                            'Question Difficulty': question_difficulty if question_difficulty else "",
+                            'Page': page, 'Row': row, **question_details})
+        self.store.upsert(records)
+        logging.warning(f"Stored {len(records)} new questions of the page: {page_url}")
 
     def get_all_pages(self):
         """Fetches data from all pages with questions on LeetCode."""
         try:
             url = self.site_url
             browser = self.open_browser(url)
-            time.sleep(self.SLEEP_TIME)
-
-            WebDriverWait(browser, 10).until(EC.title_contains("Problems - LeetCode"))
-            soup = BeautifulSoup(browser.page_source, 'html.parser')
+            try:
+                WebDriverWait(browser, self.PAGE_TIMEOUT).until(EC.title_contains("Problems - LeetCode"))
+                WebDriverWait(browser, self.PAGE_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'button.bg-fill-3')))
+                soup = BeautifulSoup(browser.page_source, 'html.parser')
+            finally:
+                self.close_browser(browser)
             total_pages = int(soup.find_all('button', class_="flex items-center justify-center px-3 h-8 rounded select-none focus:outline-none bg-fill-3 dark:bg-dark-fill-3 text-label-2 dark:text-dark-label-2 hover:bg-fill-2 dark:hover:bg-dark-fill-2")[-2].text)
-            self.close_browser(browser)
 
             for page in range(1, total_pages + 1):
                 logging.warning(f"Fetching Page : {page}")
                 page_url = f"{self.site_url}?page={page}"
-                self.fetch_page_data(page_url)
+                self.fetch_page_data(page_url, page)
 
             logging.warning("Completed fetching data from all pages")
+            self.save_to_excel()
 
         except Exception as e:
             logging.error("An error occurred while fetching all pages")
             traceback.print_exc()
+        finally:
+            self.pool.close()
 
 
 if __name__ == "__main__":
-    scraper = LeetCodeScraper()
+    parser = argparse.ArgumentParser(description="Scrape the LeetCode problem set into LeetCode.xlsx.")
+    parser.add_argument("--site_url", help="Problem set page (defaults to <base_url>/problemset/all/)")
+    parser.add_argument("--base_url", default="https://leetcode.com",
+                        help="Site the question links are resolved against, e.g. a local server with saved pages")
+    parser.add_argument("--browsers", type=int, default=4, help="Number of browsers scraping questions concurrently")
+    parser.add_argument("--show", action="store_true", help="Show the browser windows instead of running headless")
+    parser.add_argument("--store", default="LeetCodeScrape.sqlite", help="SQLite file the scraped questions are kept in")
+    parser.add_argument("--refresh", action="store_true", help="Scrape questions again even if they are stored")
+    args = parser.parse_args()
+    scraper = LeetCodeScraper(args.site_url or args.base_url.rstrip('/') + '/problemset/all/', args.base_url,
+                              args.browsers, not args.show, args.store, args.refresh)
     scraper.get_all_pages()
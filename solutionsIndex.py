@@ -0,0 +1,124 @@
+import argparse
+import os
+import re
+import sqlite3
+import threading
+
+INDEX_FILE_NAME = "SolutionsIndex.sqlite"
+SOLUTION_PATTERN = re.compile(r'_(\d+)\.py$')
+
+
+def folder_name(question_name):
+    """ Returns the folder the solutions of a question are saved in. """
+    return str(question_name).replace(" ", "").replace(":", "_").replace("?", "").replace("/", "_")
+
+
+def scan_folder(folder_path):
+    """ Returns (file name, version, size, mtime) of the highest numbered solution in a folder, or None. """
+    latest = None
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            match = SOLUTION_PATTERN.search(entry.name)
+            if match and entry.is_file():
+                version = int(match.group(1))
+                if latest is None or version > latest[1]:
+                    stat = entry.stat()
+                    latest = (entry.name, version, stat.st_size, stat.st_mtime)
+    return latest
+
+
+class SolutionsIndex:
+    """Index of the latest saved solution of every question, stored next to the solution folders.
+
+    save_code records every solution it writes, so the index only has to be rebuilt for solutions saved by other
+    means. Lookups of folders that are not indexed scan the folder and record what they find.
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.lock = threading.Lock()
+        os.makedirs(base_path, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(base_path, INDEX_FILE_NAME), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS solutions (
+                folder TEXT PRIMARY KEY,
+                file_name TEXT,
+                version INTEGER,
+                size INTEGER,
+                mtime REAL
+            )""")
+        self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def _record(self, rows):
+        self.connection.executemany(
+            "INSERT INTO solutions (folder, file_name, version, size, mtime) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (folder) DO UPDATE SET file_name = excluded.file_name, version = excluded.version, "
+            "size = excluded.size, mtime = excluded.mtime WHERE excluded.version >= solutions.version", rows)
+        self.connection.commit()
+
+    def record(self, folder, file_path, version):
+        """ Records a saved solution unless a higher version of the question is indexed. """
+        stat = os.stat(file_path)
+        with self.lock:
+            self._record([(folder, os.path.basename(file_path), int(version), stat.st_size, stat.st_mtime)])
+
+    def rebuild(self):
+        """ Indexes every solution folder in one pass over the tree. Returns the number of indexed folders. """
+        rows = []
+        with os.scandir(self.base_path) as folders:
+            for folder in folders:
+                if folder.is_dir():
+                    latest = scan_folder(folder.path)
+                    if latest:
+                        rows.append((folder.name, *latest))
+        with self.lock:
+            self.connection.execute("DELETE FROM solutions")
+            self._record(rows)
+        return len(rows)
+
+    def latest(self, folder):
+        """ Returns the path of the latest solution saved in a folder, or None. """
+        with self.lock:
+            row = self.connection.execute("SELECT file_name FROM solutions WHERE folder = ?", (folder,)).fetchone()
+        if row:
+            return os.path.join(self.base_path, folder, row[0])
+        folder_path = os.path.join(self.base_path, folder)
+        if not os.path.isdir(folder_path):
+            return None
+        latest = scan_folder(folder_path)
+        if latest is None:
+            return None
+        with self.lock:
+            self._record([(folder, *latest)])
+        return os.path.join(folder_path, latest[0])
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_solutions_index(base_path):
+    """ Returns the process wide index of a solutions folder, building it on first use. """
+    with _indexes_lock:
+        if base_path not in _indexes:
+            index = SolutionsIndex(base_path)
+            if not len(index):
+                index.rebuild()
+            _indexes[base_path] = index
+        return _indexes[base_path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the index of a solutions folder.")
+    parser.add_argument("base_path", help="Solutions folder, e.g. Solutions_gpt-4o")
+    args = parser.parse_args()
+    print(f"Indexed the latest solution of {SolutionsIndex(args.base_path).rebuild()} questions.")
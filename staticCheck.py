@@ -0,0 +1,92 @@
+import ast
+from functools import lru_cache
+import constants
+
+# Calls that block on stdin or end the sandbox worker instead of returning a result
+BANNED_CALLS = {'input', 'exit', 'quit', 'breakpoint', 'sys.exit', 'os._exit', 'os.system', 'os.kill', 'os.fork',
+                'os.abort', 'shutil.rmtree'}
+BANNED_MODULES = {'subprocess', 'multiprocessing', 'socket', 'ctypes', 'signal'}
+EXCLUDED_FUNCTIONS = {"main", "__init__"}
+
+
+def _dotted_name(node):
+    """ Returns 'sys.exit' for the call target sys.exit, or None for anything that is not a plain name. """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        prefix = _dotted_name(node.value)
+        return f"{prefix}.{node.attr}" if prefix else None
+    return None
+
+
+def _arity(function):
+    """ Returns the minimum and maximum number of positional arguments a function accepts (None for no limit). """
+    arguments = function.args
+    positional = len(arguments.posonlyargs) + len(arguments.args)
+    required = positional - len(arguments.defaults)
+    return required, None if arguments.vararg else positional
+
+
+@lru_cache(maxsize=512)
+def analyze(code):
+    """ Analyzes a solution in a single pass over its AST. The returned dict is shared and must not be modified.
+
+    Keys: 'Syntax Error', 'Function Name' (entry function as found by fetch_function_name), 'Top Level' (whether
+    the entry function can be called from the module), 'Arity' (min, max), 'Imports' and 'Banned' (construct, line).
+    """
+    report = {'Syntax Error': None, 'Function Name': None, 'Top Level': False, 'Arity': None, 'Imports': [],
+              'Banned': []}
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError, TypeError) as e:
+        report['Syntax Error'] = str(e)
+        return report
+
+    top_level = {id(node) for node in tree.body}
+    imports = {}
+    # Breadth first like ast.walk, so that top-level functions are found before nested ones
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if report['Function Name'] is None and node.name not in EXCLUDED_FUNCTIONS:
+                report['Function Name'] = node.name
+                report['Top Level'] = id(node) in top_level
+                report['Arity'] = _arity(node)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                imports[alias.name] = node.lineno
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports[node.module] = node.lineno
+        elif isinstance(node, ast.Call):
+            name = _dotted_name(node.func)
+            if name in BANNED_CALLS:
+                report['Banned'].append((f"{name}()", node.lineno))
+    report['Imports'] = list(imports)
+    report['Banned'].extend((f"import {module}", line) for module, line in imports.items()
+                            if module.split('.')[0] in BANNED_MODULES)
+    report['Banned'].sort(key=lambda banned: banned[1])
+    return report
+
+
+def screen(code, calls=None):
+    """ Returns feedback for a solution that can be rejected without running it, or None.
+
+    calls are the argument tuples the test cases will call the entry function with.
+    """
+    report = analyze(code)
+    if report['Syntax Error'] is not None:
+        return f"The previous solution has a syntax error: {report['Syntax Error']}. " + constants.SYNTAX_ERROR
+    if report['Function Name'] is None:
+        return constants.FUNCTION_ERROR
+    if report['Banned']:
+        constructs = ", ".join(f"{construct} (line {line})" for construct, line in report['Banned'])
+        return constants.BANNED_CONSTRUCT_ERROR.format(constructs=constructs)
+    if not report['Top Level']:
+        return constants.NESTED_FUNCTION_ERROR.format(function=report['Function Name'])
+    if calls:
+        minimum, maximum = report['Arity']
+        for call in calls:
+            if len(call) < minimum or (maximum is not None and len(call) > maximum):
+                expected = minimum if minimum == maximum else f"{minimum} to {'any number of' if maximum is None else maximum}"
+                return constants.ARITY_ERROR.format(function=report['Function Name'], expected=expected,
+                                                    given=len(call), arguments=call)
+    return None
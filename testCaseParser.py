@@ -1,24 +1,82 @@
 import re
 import ast
+import argparse
+import operator
+import pickle
+import threading
+
+INPUT_PATTERN = re.compile(r'Input: (.+?)\nOutput', re.DOTALL)
+OUTPUT_PATTERN = re.compile(r'Output: (.+?)(?:\nExplanation|\Z)', re.DOTALL)
+ASSIGNMENT_PATTERN = re.compile(r'\b\w+\s*=\s*([^;]+)')
+BOOLEAN_PATTERN = re.compile(r'\b(?:true|false)\b', re.IGNORECASE)
+
+# Bare names used by the test cases (JSON style literals) and the values they stand for
+LITERAL_NAMES = {'true': True, 'false': False, 'null': None, 'none': None}
+BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+                    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow}
+UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg, ast.Not: operator.not_}
+MAX_EXPONENT = 1000
+
+# Parsed test cases of each question, keyed by their raw string. Callers must not modify the parsed values.
+_parsed_cache = {}
+_parsed_cache_lock = threading.Lock()
+
+
+def _evaluate(node):
+    """ Evaluates literal nodes, true/false/null and arithmetic on numbers without calling eval. """
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name) and node.id.lower() in LITERAL_NAMES:
+        return LITERAL_NAMES[node.id.lower()]
+    if isinstance(node, ast.List):
+        return [_evaluate(element) for element in node.elts]
+    if isinstance(node, ast.Tuple):
+        return tuple(_evaluate(element) for element in node.elts)
+    if isinstance(node, ast.Set):
+        return {_evaluate(element) for element in node.elts}
+    if isinstance(node, ast.Dict) and None not in node.keys:
+        return {_evaluate(key): _evaluate(value) for key, value in zip(node.keys, node.values)}
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if not all(isinstance(value, (int, float)) for value in (left, right)) and not isinstance(node.op, ast.Add):
+            raise ValueError("Arithmetic is only allowed on numbers")
+        if isinstance(node.op, ast.Pow) and abs(right) > MAX_EXPONENT:
+            raise ValueError("Exponent too large")
+        return BINARY_OPERATORS[type(node.op)](left, right)
+    raise ValueError(f"Unsupported expression: {type(node).__name__}")
+
+
+def literal_eval(value):
+    """ Safely evaluates a Python or JSON style literal, e.g. [true, null, 2**31 - 1]. """
+    try:
+        return _evaluate(ast.parse(value.strip(), mode='eval'))
+    except RecursionError:
+        raise ValueError("Literal nested too deeply")
+    except (TypeError, ZeroDivisionError, OverflowError) as e:
+        raise ValueError(str(e))
+
 
 def safe_literal_eval(node):
     """  evaluates valid Python datatypes dynamically. """
     if not isinstance(node, str):
         return True, node
 
-    node = node.replace('null', 'None')
     try:
-        return True, ast.literal_eval(node)
+        return True, literal_eval(node)
     except (ValueError, SyntaxError):
         return False, node
 
 def replace_boolean_strings(input):
     """ Replaces string representations of booleans from test cases"""
-    if isinstance(input, str) and ("true" in input.lower() or "false" in input.lower()):
-        value = re.sub(r'\btrue\b', 'True', input, flags=re.IGNORECASE)
-        value = re.sub(r'\bfalse\b', 'False', value, flags=re.IGNORECASE)
-        value = value.replace('null','None')
-        return eval(value)
+    if isinstance(input, str) and BOOLEAN_PATTERN.search(input):
+        try:
+            return literal_eval(input)
+        except (ValueError, SyntaxError):
+            return input
 
     if isinstance(input, (list, tuple, set)):
         return type(input)(replace_boolean_strings(v) for v in input)
@@ -28,17 +86,14 @@ def replace_boolean_strings(input):
     return input
 
 
-def parse_test_case(test_cases: str):
+def _parse_test_case(test_cases: str):
     """Parses test cases from a string to valid Python data types."""
     test_cases = [tc.strip() for tc in ast.literal_eval(test_cases)]
     parsed_test_cases = []
 
-    input_pattern = re.compile(r'Input: (.+?)\nOutput', re.DOTALL)
-    output_pattern = re.compile(r'Output: (.+?)(?:\nExplanation|\Z)', re.DOTALL)
-
     for test_case in test_cases:
-        input_match = input_pattern.search(test_case)
-        output_match = output_pattern.search(test_case)
+        input_match = INPUT_PATTERN.search(test_case)
+        output_match = OUTPUT_PATTERN.search(test_case)
 
         if input_match and output_match:
             raw_input, raw_output = input_match.group(1), output_match.group(1).replace('\n', '')
@@ -54,7 +109,7 @@ def parse_test_case(test_cases: str):
 
             # cleaning and evaluating output
             if ' = ' in raw_output:
-                raw_output = re.sub(r'\b\w+\s*=\s*([^;]+)', r'\1', raw_output)
+                raw_output = ASSIGNMENT_PATTERN.sub(r'\1', raw_output)
 
             parsed_output = safe_literal_eval(replace_boolean_strings(raw_output))[1]
 
@@ -64,3 +119,45 @@ def parse_test_case(test_cases: str):
             })
 
     return parsed_test_cases
+
+
+def parse_test_case(test_cases: str):
+    """Parses test cases once per question and returns the cached result on later calls."""
+    parsed_test_cases = _parsed_cache.get(test_cases)
+    if parsed_test_cases is None:
+        parsed_test_cases = _parse_test_case(test_cases)
+        with _parsed_cache_lock:
+            _parsed_cache[test_cases] = parsed_test_cases
+    return parsed_test_cases
+
+
+def load_parsed_test_cases(file_name):
+    """ Loads test cases parsed ahead of time by this module's command line into the cache. """
+    with open(file_name, 'rb') as parsed_file:
+        parsed = pickle.load(parsed_file)
+    with _parsed_cache_lock:
+        _parsed_cache.update(parsed)
+    return len(parsed)
+
+
+def preparse_excel(excel_file_name, output_file_name, column='Question Examples'):
+    """ Parses the test cases of every question in the LeetCode file and stores them for load_parsed_test_cases. """
+    import pandas as pd
+    df = pd.read_excel(excel_file_name, usecols=[column])
+    parsed, failed = {}, 0
+    for test_cases in df[column].dropna().unique():
+        try:
+            parsed[test_cases] = _parse_test_case(test_cases)
+        except (ValueError, SyntaxError):
+            failed += 1
+    with open(output_file_name, 'wb') as parsed_file:
+        pickle.dump(parsed, parsed_file, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"Parsed test cases of {len(parsed)} questions into {output_file_name} ({failed} could not be parsed).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse the test cases of a LeetCode file ahead of time.")
+    parser.add_argument("excel_file", help="LeetCode data file")
+    parser.add_argument("-o", "--output", default="LeetCodeTestCases.pkl", help="File to store the parsed test cases in")
+    args = parser.parse_args()
+    preparse_excel(args.excel_file, args.output)
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections, so that clients can reuse them like with a real endpoint
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        self.server.requests.append(body)
+        content = self.server.content
+        usage = {'prompt_tokens': 10, 'completion_tokens': len(content.split()),
+                 'total_tokens': 10 + len(content.split())}
+        completion = {'id': f"chatcmpl-{len(self.server.requests)}", 'created': int(time.time()),
+                      'model': body.get('model')}
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for start in range(0, len(content), self.server.chunk_size):
+                delta = content[start:start + self.server.chunk_size]
+                self._send_event(dict(completion, object='chat.completion.chunk', choices=[
+                    {'index': 0, 'delta': {'role': 'assistant', 'content': delta}, 'finish_reason': None}]))
+            if (body.get('stream_options') or {}).get('include_usage'):
+                self._send_event(dict(completion, object='chat.completion.chunk', choices=[], usage=usage))
+            self._send_chunk(b"data: [DONE]\n\n")
+            self._send_chunk(b"")
+            return
+        payload = json.dumps(dict(completion, object='chat.completion', usage=usage, choices=[
+            {'index': index, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}
+            for index in range(body.get('n') or 1)])).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_event(self, event):
+        self._send_chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+    def _send_chunk(self, data):
+        try:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):  # the client closed the stream early
+            pass
+
+
+class MockChatServer:
+    """Minimal OpenAI compatible chat completions endpoint that answers every request with the same content.
+
+    Completions carry n choices and a usage, streams send the content in chunks of chunk_size characters followed
+    by a usage chunk when it is requested. The bodies of all requests are kept in requests.
+    """
+
+    def __init__(self, content, chunk_size=8):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+        self.server.daemon_threads = True
+        self.server.content = content
+        self.server.chunk_size = chunk_size
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
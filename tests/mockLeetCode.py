@@ -0,0 +1,124 @@
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def question(question_id, default_code, example_testcases, accepts, hidden_failure=False):
+    """ A question of the stub. Solutions containing accepts pass it, on submission too unless hidden_failure. """
+    return {'questionId': question_id, 'exampleTestcases': example_testcases, 'Accepts': accepts,
+            'Hidden Failure': hidden_failure,
+            'codeDefinition': json.dumps([{'value': 'python3', 'defaultCode': default_code}])}
+
+
+class _LeetCodeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        check = re.fullmatch(r'/submissions/detail/([^/]+)/check/', self.path)
+        if check:
+            self._reply(200, stub.poll(check.group(1)))
+        elif re.fullmatch(r'/problems/[^/]+/?', self.path):
+            self._reply(200, {})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        action = re.fullmatch(r'/problems/([^/]+)/(interpret_solution|submit)/', self.path)
+        if self.path == '/graphql/':
+            self._reply(200, {'data': stub.graphql(body)})
+        elif action and action.group(1) in stub.questions:
+            slug, kind = action.groups()
+            check_id = stub.start(slug, body.get('typed_code', ""), kind == 'submit')
+            self._reply(200, {'submission_id': check_id} if kind == 'submit' else {'interpret_id': check_id})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+
+class MockLeetCode:
+    """Local stub of the LeetCode endpoints validation.py uses: GraphQL question data, interpret_solution, submit
+    and the check endpoint, which answers PENDING pending_polls times before the verdict of a run.
+
+    The stub records the GraphQL requests and the highest number of runs that were unfinished at the same time.
+    """
+
+    def __init__(self, questions, pending_polls=2):
+        self.questions = questions
+        self.pending_polls = pending_polls
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.checks = {}
+        self.graphql_requests = []
+        self.max_in_flight = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _LeetCodeHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _fields(self, slug):
+        """ Returns the GraphQL fields of a question, or None if the stub does not have it. """
+        if slug not in self.questions:
+            return None
+        return {key: value for key, value in self.questions[slug].items() if key[0].islower()}
+
+    def graphql(self, body):
+        """ Answers the single question query and the aliased batch query of questionMetadata.batch_query. """
+        with self.lock:
+            self.graphql_requests.append(body)
+        variables = body.get('variables', {})
+        if 'titleSlug' in variables:
+            return {'question': self._fields(variables['titleSlug'])}
+        return {f"q{name[len('slug'):]}": self._fields(slug) for name, slug in variables.items()}
+
+    def start(self, slug, typed_code, submit):
+        question = self.questions[slug]
+        passed = question['Accepts'] in typed_code and not (submit and question['Hidden Failure'])
+        total = 3 if submit else 1
+        result = {'state': 'SUCCESS', 'run_success': True, 'total_correct': total if passed else total - 1,
+                  'total_testcases': total, 'status_msg': "Accepted" if passed else "Wrong Answer",
+                  'status_runtime': "1 ms", 'status_memory': "16.5 MB"}
+        with self.lock:
+            check_id = str(next(self.ids))
+            if submit:
+                result['submission_id'] = check_id
+            self.checks[check_id] = {'Polls Left': self.pending_polls, 'Result': result}
+            self.max_in_flight = max(self.max_in_flight, len(self.checks))
+        return check_id
+
+    def poll(self, check_id):
+        with self.lock:
+            check = self.checks.get(check_id)
+            if check is None:
+                return {'state': 'FAILURE'}
+            if check['Polls Left'] > 0:
+                check['Polls Left'] -= 1
+                return {'state': 'PENDING'}
+            del self.checks[check_id]
+            return dict(check['Result'])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
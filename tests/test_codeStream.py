@@ -0,0 +1,35 @@
+from codeStream import StreamMonitor
+
+SOLUTION = "def add(a, b):\n    return a + b\n"
+EXPLANATION = "To add two numbers we read both of them and return their sum, which takes constant time.\n" * 40
+
+
+def feed(monitor, content, chunk_size=16):
+    """ Streams the content in chunks and returns the first stop reason, or None if the whole content was read. """
+    for start in range(0, len(content), chunk_size):
+        reason = monitor.feed(content[start:start + chunk_size])
+        if reason is not None:
+            return reason
+    return None
+
+
+def test_code_after_a_long_explanation_is_completed():
+    monitor = StreamMonitor()
+    assert len(EXPLANATION) > 2000
+    assert feed(monitor, f"{EXPLANATION}\n```python\n{SOLUTION}```\nThis adds the numbers.") == 'completed'
+    assert monitor.code == SOLUTION
+
+
+def test_opened_code_block_is_not_prose():
+    monitor = StreamMonitor(prose_chars=100)
+    assert feed(monitor, "```python\n# " + "a long comment " * 20) is None
+
+
+def test_prose_only_response_is_aborted():
+    assert feed(StreamMonitor(), EXPLANATION * 3) == 'prose'
+
+
+def test_unfenced_function_followed_by_an_explanation_is_completed():
+    monitor = StreamMonitor()
+    assert feed(monitor, SOLUTION + "\nThis function adds the two numbers.\n") == 'completed'
+    assert monitor.code == SOLUTION.strip()
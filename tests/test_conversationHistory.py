@@ -0,0 +1,18 @@
+import pytest
+
+import conversationHistory
+from conversationHistory import count_text_tokens, count_tokens
+
+
+def test_counts_fall_back_to_an_estimate_when_the_encoding_can_not_be_loaded(monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+
+    def offline(*args, **kwargs):
+        raise ConnectionError("the encoding could not be downloaded")
+
+    monkeypatch.setattr(conversationHistory, "_encodings", {})
+    monkeypatch.setattr(tiktoken, "encoding_for_model", offline)
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+    assert count_text_tokens("a" * 40, "gpt-4o") == 11
+    assert count_tokens([{"role": "user", "content": "a" * 40}], "unknown-model") == 17
+    assert conversationHistory._encodings == {"gpt-4o": None, "unknown-model": None}
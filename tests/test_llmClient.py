@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("openai")
+from codeStream import StreamMonitor
+from llmClient import LLMClientPool
+from mockChatServer import MockChatServer
+
+SOLUTION = "def add(a, b):\n    return a + b\n"
+MESSAGES = [{"role": "user", "content": "Write a python function that returns the sum of two numbers."}]
+
+
+@pytest.fixture
+def pool():
+    pool = LLMClientPool()
+    yield pool
+    pool.close()
+
+
+def test_create_reuses_the_connection(pool):
+    with MockChatServer(f"```python\n{SOLUTION}```") as server:
+        first = pool.create("gpt-4o", MESSAGES, api_key="test", base_url=server.base_url, n=2)
+        second = pool.create("gpt-4o", MESSAGES, api_key="test", base_url=server.base_url, n=1)
+    assert [choice.message.content for choice in first.choices] == [f"```python\n{SOLUTION}```"] * 2
+    assert len(second.choices) == 1
+    assert first.usage.prompt_tokens == 10
+    assert [request['n'] for request in server.requests] == [2, 1]
+    assert pool.stats['Requests'] == 2
+    assert pool.stats['Clients Created'] == 1
+    assert pool.stats['Connections Opened'] == 1
+    assert "LLM requests: 2, clients created: 1, connections opened: 1, connections reused: 1" in pool.report()
+
+
+def test_stream_stops_once_the_code_is_complete(pool):
+    content = SOLUTION + "\nThis function adds the two numbers.\n" + "It runs in constant time. " * 50
+    with MockChatServer(content, chunk_size=4) as server:
+        monitor = StreamMonitor()
+        streamed = pool.stream("gpt-4o", MESSAGES, api_key="test", base_url=server.base_url, monitor=monitor)
+    assert streamed['Stop Reason'] == 'completed'
+    assert monitor.code == SOLUTION.strip()
+    assert len(streamed['Content']) < len(content)
+    assert streamed['Usage'] is None  # the stream was closed before the usage chunk
+    assert streamed['Time To First Token'] is not None
+    assert server.requests[0]['stream'] is True
+    assert pool.stats['Requests'] == 1
+
+
+def test_stream_reads_the_usage_of_a_complete_stream(pool):
+    with MockChatServer(SOLUTION) as server:
+        streamed = pool.stream("gpt-4o", MESSAGES, api_key="test", base_url=server.base_url)
+    assert streamed['Content'] == SOLUTION
+    assert streamed['Stop Reason'] is None
+    assert streamed['Model'] == "gpt-4o"
+    assert streamed['Usage'].completion_tokens == len(SOLUTION.split())
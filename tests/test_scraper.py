@@ -0,0 +1,82 @@
+import functools
+import os
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+bs4 = pytest.importorskip("bs4")
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+from scraper import LeetCodeScraper
+from scrapeStore import ScrapeStore
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "leetcode")
+CHROME = any(shutil.which(name) for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"))
+
+
+def read_fixture(*path):
+    with open(os.path.join(FIXTURES, *path), encoding="utf-8") as fixture:
+        return bs4.BeautifulSoup(fixture.read(), "html.parser")
+
+
+@pytest.fixture
+def extractor():
+    # The extraction helpers only parse the soup they are given, no browser or store is needed
+    return LeetCodeScraper.__new__(LeetCodeScraper)
+
+
+def test_extract_description(extractor):
+    description = extractor._extract_description(read_fixture("problems", "two-sum", "index.html")
+                                                  .find('div', class_='elfjS'))
+    assert description.startswith("Given an array of integers nums\xa0and an integer target")
+    assert "Example" not in description
+
+
+def test_extract_examples(extractor):
+    examples = extractor._extract_examples(read_fixture("problems", "two-sum", "index.html")
+                                           .find('div', class_='elfjS'))
+    assert examples == ["\nInput: nums = [2,7,11,15], target = 9\nOutput: [0,1]\n",
+                        "\nInput: nums = [3,2,4], target = 6\nOutput: [1,2]\n"]
+
+
+def test_extract_examples_from_pre_blocks(extractor):
+    block = bs4.BeautifulSoup("<div class='elfjS'><p>Add.</p><pre>Input: a = 1, b = 2\nOutput: 3</pre></div>",
+                              "html.parser").find('div', class_='elfjS')
+    assert extractor._extract_examples(block) == ["Input: a = 1, b = 2\nOutput: 3"]
+
+
+def test_extract_topics(extractor):
+    assert extractor._extract_topics(read_fixture("problems", "two-sum", "index.html")) == ["Array", "Hash Table"]
+    assert extractor._extract_topics(read_fixture("problems", "secret-problem", "index.html")) == []
+
+
+@pytest.fixture
+def site():
+    """ Serves the saved pages on a local port and returns its url. """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(SimpleHTTPRequestHandler, directory=FIXTURES))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.skipif(not CHROME, reason="Chrome is not installed")
+def test_fetch_page_data(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scraper = LeetCodeScraper(f"{site}/problemset/all/", site, browsers=2, store_file=str(tmp_path / "scrape.sqlite"))
+    scraper.DESCRIPTION_TIMEOUT = 1
+    try:
+        scraper.fetch_page_data(f"{site}/problemset/all/", page=1)
+        details = scraper.scrape_question("1. Two Sum", f"{site}/problems/two-sum/")
+    finally:
+        scraper.pool.close()
+    assert details['Premium'] == "No"
+    assert details['Question Examples Count'] == 2
+    assert details['Question Topics'] == ["Array", "Hash Table"]
+    store = ScrapeStore(str(tmp_path / "scrape.sqlite"))
+    rows = store.connection.execute("SELECT slug, row, question_name, question_difficulty, premium FROM questions "
+                                    "ORDER BY row").fetchall()
+    store.close()
+    assert rows == [("two-sum", 0, "1. Two Sum", "Easy", "No"), ("secret-problem", 1, "2. Secret Problem", "Hard", "Yes")]
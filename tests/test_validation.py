@@ -0,0 +1,74 @@
+import csv
+import pytest
+
+for module in ("requests", "pandas", "selenium", "webdriver_manager", "undetected_chromedriver", "astor"):
+    pytest.importorskip(module)
+from mockLeetCode import MockLeetCode, question
+from questionMetadata import MetadataCache
+from validation import LeetCodeBot, ValidationPipeline
+
+STARTER_CODE = "class Solution:\n    def add(self, a: int, b: int) -> int:\n        "
+QUESTIONS = {
+    'add-two-numbers-' + str(i): question(str(i), STARTER_CODE, "1\n2", "a + b", hidden_failure=i == 3)
+    for i in range(1, 6)
+}
+CORRECT = "def add(a, b):\n    return a + b\n"
+WRONG = "def add(a, b):\n    return a - b\n"
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stub = MockLeetCode(QUESTIONS)
+    with stub:
+        bot = LeetCodeBot(None, None, "test", base_url=stub.base_url, requests_per_minute=6000)
+        monkeypatch.setattr(bot, "printToTerminalFile", lambda *args, **kwargs: None)
+        bot.stub = stub
+        yield bot
+
+
+def read_results(bot):
+    with open(f"leetCode_submission_results_{bot.model}.csv", newline='') as results:
+        return {row['Question Name']: row for row in csv.DictReader(results)}
+
+
+def test_pipeline_interprets_and_submits_through_the_stub(bot):
+    solutions = [(f"{i}. Add Two Numbers {i}", f"https://leetcode.com/problems/add-two-numbers-{i}/",
+                  WRONG if i == 2 else CORRECT) for i in range(1, 6)]
+    ValidationPipeline(bot, window=2, poll_interval=0.01, max_poll_interval=0.05).run(solutions)
+
+    results = read_results(bot)
+    assert set(results) == {name for name, _, _ in solutions}
+    accepted = results["1. Add Two Numbers 1"]
+    assert (accepted['Stage'], accepted['Error'], accepted['Status Msg']) == ("Submitting", "", "Accepted")
+    assert accepted['Total Correct'] == accepted['Total Testcases'] == "3"
+    wrong = results["2. Add Two Numbers 2"]
+    assert (wrong['Stage'], wrong['Error']) == ("Initial Interpret", "Failed to pass all Test Cases")
+    hidden = results["3. Add Two Numbers 3"]
+    assert (hidden['Stage'], hidden['Status Msg']) == ("Submitting", "Wrong Answer")
+    # Every job was polled until the stub finished it, never more than the window at a time
+    assert bot.stub.checks == {}
+    assert 1 <= bot.stub.max_in_flight <= 2
+
+
+def test_pipeline_gives_up_on_checks_that_never_finish(bot):
+    bot.stub.pending_polls = 100
+    ValidationPipeline(bot, window=2, poll_interval=0.01, max_poll_interval=0.02, max_polls=3).run(
+        [("1. Add Two Numbers 1", "https://leetcode.com/problems/add-two-numbers-1/", CORRECT)])
+    result = read_results(bot)["1. Add Two Numbers 1"]
+    assert (result['Stage'], result['Error']) == ("Initial Interpret", "Max retries exceeded")
+
+
+def test_prefetch_batches_metadata_requests(bot):
+    bot.prefetch_metadata(list(QUESTIONS) + ['unknown-question'], batch_size=2)
+    assert [len(request['variables']) for request in bot.stub.graphql_requests] == [2, 2, 2]
+    example_testcases, default_code, question_id = bot.get_testcases_codeDef('add-two-numbers-4')
+    assert (example_testcases, default_code, question_id) == ("1\n2", STARTER_CODE, "4")
+    assert len(bot.stub.graphql_requests) == 3  # served from the metadata cache
+
+
+def test_metadata_is_returned_when_the_cache_keeps_nothing(tmp_path, bot):
+    bot.metadata_cache = MetadataCache(str(tmp_path / "metadata.sqlite"), ttl=0)
+    assert bot.get_testcases_codeDef('add-two-numbers-1') == ("1\n2", STARTER_CODE, "1")
+    assert bot.metadata_cache.stats['Misses'] == 1
+    assert bot.metadata_cache.stats['Hits'] == 0
@@ -1,8 +1,8 @@
 import argparse
 import ast
 import csv
+import random
 import re
-import sys
 import os as os_module
 import pandas as pd
 from selenium import webdriver
@@ -13,16 +13,55 @@ from webdriver_manager.chrome import ChromeDriverManager
 import undetected_chromedriver as uc
 import json
 import astor
+from logWriter import log
+from rateLimiter import RateLimiter
+from questionMetadata import MetadataCache, QUESTION_FIELDS, batch_query, default_code
+from solutionsIndex import folder_name as solution_folder_name, get_solutions_index, scan_folder
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.5938.62 Safari/537.36"
+
+
+def backoff_delay(attempt, initial=1.0, maximum=30.0):
+    """ Exponential backoff with jitter: half of the delay is fixed and half is random, so that checks of
+    submissions started together do not stay in lockstep. """
+    delay = min(maximum, initial * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
 
 class LeetCodeBot:
 
-    def __init__(self, username, password, model):
+    def __init__(self, username, password, model, base_url="https://leetcode.com", requests_per_minute=30,
+                 metadata_cache=None):
         self.session = requests.Session()
         self.model = model
         self.username = username
         self.password = password
         self.csrf_token = None
         self.cookies = None
+        # Every request goes to this site, e.g. a local stub of the interpret/submit/check endpoints
+        self.base_url = base_url.rstrip('/')
+        # Shared by every request of the bot. Tokens are not metered, only requests.
+        self.rate_limiter = RateLimiter(requests_per_minute, requests_per_minute)
+        # Question metadata is fetched once and shared by interpreting and submitting
+        self.metadata_cache = metadata_cache if metadata_cache is not None else MetadataCache(":memory:")
+
+    def request(self, method, url, max_retries=5, **kwargs):
+        """ Sends a request within the global request rate, backing off when the site answers 429. """
+        for _ in range(max_retries):
+            self.rate_limiter.acquire(0)
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429:
+                self.rate_limiter.record_usage(0, 0)
+                return response
+            retry_after = response.headers.get("Retry-After")
+            delay = self.rate_limiter.backoff(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            self.printToTerminalFile(f"Rate limited, retrying in {delay} seconds")
+        return response
+
+    def question_url(self, question_url):
+        """ Points a question url of the dataset at the configured site. """
+        return f"{self.base_url}/problems/{question_url.rstrip('/').split('/')[-1]}"
+
     def login_with_selenium(self):
 
         options = webdriver.ChromeOptions()
@@ -31,7 +70,7 @@ class LeetCodeBot:
         #options.add_argument("--incognito")
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=options)
-        driver.get("https://leetcode.com/accounts/login/")
+        driver.get(f"{self.base_url}/accounts/login/")
 
         try:
             # wait = WebDriverWait(driver, 20)
@@ -64,53 +103,59 @@ class LeetCodeBot:
             self.printToTerminalFile("An error occurred during login:", e)
             driver.quit()
 
-    def get_testcases_codeDef(self, question_slug):
-        print("question slug is :", question_slug)
-        url = "https://leetcode.com/graphql/"
+    def graphql(self, payload):
+        """ Posts a GraphQL query and returns its data, or None. """
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.5938.62 Safari/537.36",
+            "User-Agent": USER_AGENT,
             "Content-Type": "application/json",
             "x-csrftoken": self.csrf_token,
         }
+        response = self.request("POST", f"{self.base_url}/graphql/", headers=headers, data=json.dumps(payload))
+        if response.status_code != 200:
+            self.printToTerminalFile(f"Failed to fetch question data. Status code: {response.status_code}")
+            return None
+        return response.json().get('data') or {}
+
+    def prefetch_metadata(self, question_slugs, batch_size=20):
+        """ Fetches the metadata of every question that is not cached yet, batch_size questions per request. """
+        missing = self.metadata_cache.missing(question_slugs)
+        for start in range(0, len(missing), batch_size):
+            slugs = missing[start:start + batch_size]
+            data = self.graphql(batch_query(slugs))
+            if data is None:
+                continue  # fetched one by one when needed
+            for i, slug in enumerate(slugs):
+                if data.get(f"q{i}"):
+                    self.metadata_cache.put(slug, data[f"q{i}"])
+        self.printToTerminalFile(f"Prefetched metadata of {len(missing)} questions.")
+
+    def get_testcases_codeDef(self, question_slug):
+        print("question slug is :", question_slug)
+        cached = self.metadata_cache.get(question_slug)
+        if cached:
+            return cached
         query_payload = {
             "operationName": "questionData",
             "variables": {
                 "titleSlug": question_slug
             },
-            "query": """
-                query questionData($titleSlug: String!) {
-                    question(titleSlug: $titleSlug) {
-                        questionId
-                        title
-                        content
-                        difficulty
-                        stats
-                        codeDefinition
-                        sampleTestCase
-                        exampleTestcases
-                        metaData
-                    }
-                }
+            "query": f"""
+                query questionData($titleSlug: String!) {{
+                    question(titleSlug: $titleSlug) {{ {QUESTION_FIELDS} }}
+                }}
             """
         }
-        response = self.session.post(url, headers=headers, data=json.dumps(query_payload))
-        if response.status_code == 200:
-            data = response.json()
-            question_data = data.get('data', {}).get('question', {})
-            if question_data:
-                print(question_data)
-                example_test_cases = question_data.get('exampleTestcases')
-                question_id = question_data.get('questionId')
-                if 'python3' in question_data.get('metaData') or ('python3' in question_data.get('codeDefinition')):
-                    def_code = eval(question_data.get('codeDefinition'))[3]['defaultCode']
-                else:
-                    def_code = None
-                return example_test_cases, def_code, question_id
-            else:
-                self.printToTerminalFile("Question not found or data is empty.")
-                return None, None, None
+        data = self.graphql(query_payload)
+        if data is None:
+            return None, None, None
+        question_data = data.get('question', {})
+        if question_data:
+            print(question_data)
+            self.metadata_cache.put(question_slug, question_data)
+            return (question_data.get('exampleTestcases'), default_code(question_data.get('codeDefinition')),
+                    question_data.get('questionId'))
         else:
-            self.printToTerminalFile(f"Failed to fetch question data. Status code: {response.status_code}")
+            self.printToTerminalFile("Question not found or data is empty.")
             return None, None, None
 
     def find_function_body(self, code):
@@ -158,7 +203,7 @@ class LeetCodeBot:
             modified_code = self.exchange_func_body(code_def, solution_code) if code_def else solution_code
             self.printToTerminalFile(modified_code)
             lang = 'python3'
-            self.session.get(question_url)
+            self.request("GET", question_url)
             #question_id = question_name.split(".")[0]
             self.printToTerminalFile("Inside interpret solution with question id: ", question_id)
             if not question_id:
@@ -167,7 +212,7 @@ class LeetCodeBot:
 
             interpret_url = question_url + '/interpret_solution/'
             headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.5938.62 Safari/537.36",
+                "User-Agent": USER_AGENT,
                 'x-csrftoken': self.csrf_token,
                 'referer': question_url,
                 'Content-Type': 'application/json',
@@ -178,8 +223,7 @@ class LeetCodeBot:
                 'typed_code': modified_code,
                 'data_input': data_input
             }
-            response = self.session.post(interpret_url, headers=headers, data=json.dumps(payload))
-            time.sleep(5)
+            response = self.request("POST", interpret_url, headers=headers, data=json.dumps(payload))
             if response.status_code == 200:
                 interpret_response = response.json()
                 self.printToTerminalFile(f"Interpret ID: {interpret_response['interpret_id']}")
@@ -194,54 +238,54 @@ class LeetCodeBot:
         else:
             self.printToTerminalFile("Unable to find test cases!")
             return None
-    def check_status(self, interpret_id, stage, max_retries=10, wait_time=5):
-        print(interpret_id)
-        self.printToTerminalFile("Inside Check solution")
-        check_url = f'https://leetcode.com/submissions/detail/{interpret_id}/check/'
+    def poll_check(self, check_id, stage, attempt=0):
+        """ Polls the check endpoint of an interpretation or submission once.
+        Returns whether it finished, whether it passed all test cases and the result. """
+        check_url = f'{self.base_url}/submissions/detail/{check_id}/check/'
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.5938.62 Safari/537.36",
+            "User-Agent": USER_AGENT,
             'x-csrftoken': self.csrf_token,
-            'referer': f'https://leetcode.com/submissions/detail/{interpret_id}/',
+            'referer': f'{self.base_url}/submissions/detail/{check_id}/',
             'Content-Type': 'application/json',
         }
 
-        for attempt in range(max_retries):
-            response = self.session.get(check_url, headers=headers)
+        response = self.request("GET", check_url, headers=headers)
+        try:
             result = response.json()
-            if response.status_code == 200:
-                self.printToTerminalFile(f"Attempt {attempt + 1}: {result}")
-                state = result.get('state', None)
-                if state == 'PENDING':
-                    self.printToTerminalFile("Solution is still pending. Retrying...")
-                    time.sleep(wait_time)
-                elif state == 'SUCCESS':
-                    run_success = result.get('run_success', None)
-                    total_correct = result.get('total_correct', 0)
-                    total_testcases = result.get('total_testcases', 0)
-                    if run_success and total_correct == total_testcases:
-                        self.printToTerminalFile(result)
-                        self.printToTerminalFile(f"Solution passed all test cases! ({total_correct}/{total_testcases})")
-                        result['stage'] = stage
-                        result['error'] = None
-                        return True, result
-                    else:
-                        result['stage'] = stage
-                        result['error'] = "Failed to pass all Test Cases"
-                        self.printToTerminalFile(result)
-                        self.printToTerminalFile(f"Solution failed. Passed {total_correct}/{total_testcases} test cases.")
-                        return False, result
+        except ValueError:
+            result = {}
+        if response.status_code == 200:
+            self.printToTerminalFile(f"Attempt {attempt + 1}: {result}")
+            state = result.get('state', None)
+            if state in ('PENDING', 'STARTED'):
+                self.printToTerminalFile("Solution is still pending. Retrying...")
+                return False, False, result
+            elif state == 'SUCCESS':
+                run_success = result.get('run_success', None)
+                total_correct = result.get('total_correct', 0)
+                total_testcases = result.get('total_testcases', 0)
+                if run_success and total_correct == total_testcases:
+                    self.printToTerminalFile(result)
+                    self.printToTerminalFile(f"Solution passed all test cases! ({total_correct}/{total_testcases})")
+                    result['stage'] = stage
+                    result['error'] = None
+                    return True, True, result
                 else:
                     result['stage'] = stage
-                    result['error'] = f"Unexpected state: {state}"
-                    self.printToTerminalFile(f"Unexpected state: {state}")
-                    return False, result
+                    result['error'] = "Failed to pass all Test Cases"
+                    self.printToTerminalFile(result)
+                    self.printToTerminalFile(f"Solution failed. Passed {total_correct}/{total_testcases} test cases.")
+                    return True, False, result
             else:
                 result['stage'] = stage
-                result['error'] = f"Error fetching status: {response.status_code}"
-                self.printToTerminalFile(f"Error fetching status: {response.status_code}")
-                return False, result
-        self.printToTerminalFile("Max retries exceeded. Solution did not complete in time.")
-        return False, None
+                result['error'] = f"Unexpected state: {state}"
+                self.printToTerminalFile(f"Unexpected state: {state}")
+                return True, False, result
+        else:
+            result['stage'] = stage
+            result['error'] = f"Error fetching status: {response.status_code}"
+            self.printToTerminalFile(f"Error fetching status: {response.status_code}")
+            return True, False, result
 
     def submit_solution(self, question_url, question_name, solution_code):
         data_input, code_def, question_id = self.get_testcases_codeDef(question_url.split('/')[-1])
@@ -252,7 +296,7 @@ class LeetCodeBot:
         submit_url = f'{question_url}/submit/'
         lang = 'python3'
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.5938.62 Safari/537.36",
+            "User-Agent": USER_AGENT,
             'x-csrftoken': self.csrf_token,
             'referer': question_url,
             'Content-Type': 'application/json',
@@ -262,7 +306,7 @@ class LeetCodeBot:
             'question_id': question_id,
             'typed_code': modified_code
         }
-        response = self.session.post(submit_url, headers=headers, data=json.dumps(payload))
+        response = self.request("POST", submit_url, headers=headers, data=json.dumps(payload))
         if response.status_code == 200:
             submit_response = response.json()
             submission_id = submit_response.get('submission_id')
@@ -276,11 +320,11 @@ class LeetCodeBot:
             self.printToTerminalFile(f"Error submitting solution: {response.status_code}")
             return None
 
-    def store_result_in_csv(self, question_name, result):
+    def store_result_in_csv(self, question_name, result, filename=None):
         # log question_name submission_id run_success total_correct total_testcases status_memory memory_percentile status_runtime runtime_percentile
         fields = ['Question Name', 'Stage', 'Error', 'Submission Id', 'Run Success', 'Total Correct', 'Total Testcases', 'Status Memory', 'Memory Percentile',
                   'Status Runtime', 'Runtime Percentile', 'code Output', 'Std Output', 'Last Testcase', 'Expected Output', 'Status Msg']
-        filename = 'leetCode_submission_results_'+self.model+'.csv'
+        filename = filename or 'leetCode_submission_results_'+self.model+'.csv'
         with open(filename, mode='a', newline='') as file:
             writer = csv.DictWriter(file, fieldnames=fields)
             if file.tell() == 0:
@@ -307,32 +351,11 @@ class LeetCodeBot:
         self.printToTerminalFile(f"Results stored in {filename}")
 
     def printToTerminalFile(self, *args, **kwargs):
-        original_stdout = sys.stdout
-        print(*args, **kwargs)
-        try:
-            file_name = "ChatGPTValidationLogOutput_" + model + ".txt"
-            f = open(file_name, 'a', encoding="utf-8")
-            sys.stdout = f
-            print(*args, **kwargs)
-            sys.stdout = original_stdout
-            f.close()
-        finally:
-            sys.stdout = original_stdout
+        log("ChatGPTValidationLogOutput_" + self.model + ".txt", *args, **kwargs)
 
     def find_largest_numbered_file(self, folder_path):
-        largest_number = 0
-        largest_file = None
-        for file_name in os_module.listdir(folder_path):
-            match = re.search(r'_(\d+)\.py$', file_name)
-            if match:
-                number = int(match.group(1))
-                if number > largest_number:
-                    largest_number = number
-                    largest_file = file_name
-                else:
-                    largest_file = file_name
-
-        return largest_file
+        latest = scan_folder(folder_path)
+        return latest[0] if latest else None
 
     def fetch_solved_solution(self, excel_file_name, data_file, base_path_sol):
         question_names = []
@@ -340,6 +363,8 @@ class LeetCodeBot:
         saved_solutions = []
         if os_module.path.exists(excel_file_name) and os_module.path.exists(data_file):
             self.printToTerminalFile("Fetching question details...")
+            solutions_index = get_solutions_index(base_path_sol)
+            folders = {entry.name for entry in os_module.scandir(base_path_sol) if entry.is_dir()}
             rf = pd.read_excel(excel_file_name)       #as many to check!
             df = pd.read_excel(data_file)
             df_merged = pd.merge(rf, df, on='Question Name')
@@ -349,12 +374,10 @@ class LeetCodeBot:
                 if all_rows[question][8] == 'Yes':
                     question_names.append(all_rows[question][1])
                     question_urls.append(all_rows[question][12])
-                    folder_name = all_rows[question][1].replace(" ", "").replace(":", "_").replace("?", "").replace("/", "_")
-                    folder_path = os_module.path.join(base_path_sol, folder_name)
-                    if os_module.path.exists(folder_path) and os_module.path.isdir(folder_path):
-                        largest_file_name = self.find_largest_numbered_file(folder_path)
-                        if largest_file_name:
-                            largest_file_path = os_module.path.join(folder_path, largest_file_name)
+                    folder_name = solution_folder_name(all_rows[question][1])
+                    if folder_name in folders:
+                        largest_file_path = solutions_index.latest(folder_name)
+                        if largest_file_path:
                             with open(largest_file_path, 'r') as solution:
                                 solution_content = solution.read()
                                 saved_solutions.append(solution_content)
@@ -371,6 +394,85 @@ class LeetCodeBot:
         return question_names, question_urls, saved_solutions
 
 
+class ValidationPipeline:
+    """Validates solutions with a bounded window of interpretations and submissions in flight.
+
+    Each solution is interpreted on the example test cases and, if it passes, submitted. Pending jobs are polled
+    together with exponential backoff and jitter, and every request shares the bot's global request rate.
+    """
+
+    def __init__(self, bot, window=4, poll_interval=1.0, max_poll_interval=30.0, max_polls=20):
+        self.bot = bot
+        self.window = window
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_polls = max_polls
+
+    def start(self, question_name, question_url, solution):
+        """ Interprets a solution and returns its job, or None if it could not be started. """
+        interpret_response = self.bot.interpret_solution(question_url, question_name, solution)
+        interpret_id = interpret_response.get('interpret_id', None) if interpret_response else None
+        if not interpret_id:
+            self.bot.printToTerminalFile("Failed to interpret solution.")
+            return None
+        return self.job(question_name, question_url, solution, interpret_id, "Initial Interpret")
+
+    def job(self, question_name, question_url, solution, check_id, stage):
+        return {'Question Name': question_name, 'Question Url': question_url, 'Solution': solution,
+                'Check Id': check_id, 'Stage': stage, 'Attempt': 0,
+                'Next Poll': time.monotonic() + backoff_delay(0, self.poll_interval, self.max_poll_interval)}
+
+    def advance(self, job):
+        """ Polls a job once. Returns the job to keep polling, the submission job that follows it or None. """
+        finished, passed, result = self.bot.poll_check(job['Check Id'], job['Stage'], job['Attempt'])
+        if not finished:
+            job['Attempt'] += 1
+            if job['Attempt'] < self.max_polls:
+                job['Next Poll'] = time.monotonic() + backoff_delay(job['Attempt'], self.poll_interval,
+                                                                    self.max_poll_interval)
+                return job
+            self.bot.printToTerminalFile("Max retries exceeded. Solution did not complete in time.")
+            result = {'stage': job['Stage'], 'error': "Max retries exceeded"}
+        elif passed and job['Stage'] == "Initial Interpret":
+            submission_id = self.bot.submit_solution(job['Question Url'], job['Question Name'], job['Solution'])
+            if submission_id:
+                return self.job(job['Question Name'], job['Question Url'], job['Solution'], submission_id,
+                                "Submitting")
+            return None
+        if job['Stage'] == "Initial Interpret":
+            self.bot.printToTerminalFile("Failed to check solution.")
+        self.bot.store_result_in_csv(job['Question Name'], result)
+        return None
+
+    def run(self, solutions):
+        """ Validates (question name, question url, solution) tuples. Results are stored as the jobs finish. """
+        solutions = iter(solutions)
+        in_flight = []
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < self.window:
+                try:
+                    question_name, question_url, solution = next(solutions)
+                except StopIteration:
+                    exhausted = True
+                    break
+                job = self.start(question_name, self.bot.question_url(question_url), solution)
+                if job:
+                    in_flight.append(job)
+            if not in_flight:
+                continue
+            now = time.monotonic()
+            due = [job for job in in_flight if job['Next Poll'] <= now]
+            if not due:
+                time.sleep(min(job['Next Poll'] for job in in_flight) - now)
+                continue
+            for job in due:
+                in_flight.remove(job)
+                next_job = self.advance(job)
+                if next_job:
+                    in_flight.append(next_job)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Model selection.")
     parser.add_argument("model", help="Model selection type.")
@@ -380,34 +482,38 @@ if __name__ == "__main__":
     parser.add_argument("-s", "--start", type=int, help="Question number to start with")
     parser.add_argument("-u", "--user", help="LeetCode account username")
     parser.add_argument("-p", "--password", help="LeetCode account password")
+    parser.add_argument("-b", "--base_url", default="https://leetcode.com",
+                        help="Site to validate against, e.g. a local stub of the interpret/submit/check endpoints")
+    parser.add_argument("-w", "--window", type=int, default=4, help="Solutions validated at the same time")
+    parser.add_argument("--rpm", type=int, default=30, help="Requests per minute sent to the site")
+    parser.add_argument("--skip_login", action="store_true", help="Do not log in, e.g. when validating against a stub")
+    parser.add_argument("--metadata_cache", default="LeetCodeMetadata.sqlite",
+                        help="File caching the test cases, starter code and id of each question")
+    parser.add_argument("--metadata_ttl", type=float, default=168,
+                        help="Hours after which cached question metadata is fetched again")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Rebuild the index of the latest solutions, e.g. after copying solutions into the folder")
     args = parser.parse_args()
     model = args.model
     username = args.user
     password = args.password
 
-    bot = LeetCodeBot(username, password, model)
-    logged_in = bot.login_with_selenium()
+    if args.reindex and args.sol_path:
+        get_solutions_index(args.sol_path).rebuild()
+    metadata_cache = MetadataCache(args.metadata_cache, args.metadata_ttl * 3600)
+    bot = LeetCodeBot(username, password, model, args.base_url, args.rpm, metadata_cache)
+    logged_in = True if args.skip_login else bot.login_with_selenium()
     question_names, question_urls, saved_solutions =bot.fetch_solved_solution(args.response_file, args.data_file, args.sol_path)
     print(len(question_names))
-    for i, question_name in enumerate(question_names):
-        if saved_solutions[i]:
-            if logged_in:
-                interpret_response = bot.interpret_solution(question_urls[i], question_names[i], saved_solutions[i])
-                if interpret_response:
-                    interpret_id = interpret_response.get('interpret_id', None)
-                    to_submit, response = bot.check_status(interpret_id, "Initial Interpret")
-                    if to_submit:
-                        submission_id = bot.submit_solution(question_urls[i], question_names[i], saved_solutions[i])
-                        if submission_id:
-                            completed, response = bot.check_status(submission_id, "Submitting")
-                            bot.store_result_in_csv(question_name, response)
-                    else:
-                        bot.store_result_in_csv(question_name, response)
-                        bot.printToTerminalFile("Failed to check solution.")
-                else:
-                    bot.printToTerminalFile("Failed to interpret solution.")
+    if not logged_in:
+        bot.printToTerminalFile("Failed to login! Please try again")
+    else:
+        solutions = []
+        for i, question_name in enumerate(question_names):
+            if saved_solutions[i]:
+                solutions.append((question_name, question_urls[i], saved_solutions[i]))
             else:
-                bot.printToTerminalFile("Failed to login! Please try again")
-        else:
-            bot.printToTerminalFile("Failed to fetch solution! Please try again")
-        time.sleep(10)
+                bot.printToTerminalFile("Failed to fetch solution! Please try again")
+        bot.prefetch_metadata([bot.question_url(question_url).split('/')[-1] for _, question_url, _ in solutions])
+        ValidationPipeline(bot, args.window).run(solutions)
+        bot.printToTerminalFile(metadata_cache.report())
@@ -0,0 +1,175 @@
+import argparse
+import ast
+import builtins
+import hashlib
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+BUILTIN_NAMES = set(dir(builtins))
+
+
+class _Normalizer(ast.NodeTransformer):
+    """Removes docstrings and annotations and renames every variable the solution binds in order of appearance, so
+    that solutions that only differ in formatting, comments or variable names produce the same tree. Function names,
+    attributes and builtins are kept."""
+
+    def __init__(self, tree):
+        self.bound = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)
+                      and isinstance(node.ctx, (ast.Store, ast.Del))}
+        self.bound.update(node.arg for node in ast.walk(tree) if isinstance(node, ast.arg))
+        self.bound -= BUILTIN_NAMES
+        self.names = {}
+
+    def _rename(self, name):
+        if name not in self.bound:
+            return name
+        if name not in self.names:
+            self.names[name] = f"_v{len(self.names)}"
+        return self.names[name]
+
+    def visit_Name(self, node):
+        node.id = self._rename(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._rename(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_Global(self, node):
+        node.names = [self._rename(name) for name in node.names]
+        return node
+
+    visit_Nonlocal = visit_Global
+
+    def _strip_docstring(self, node):
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            node.body = body[1:] or [ast.Pass()]
+        return node
+
+    def visit_Module(self, node):
+        self._strip_docstring(node)
+        self.generic_visit(node)
+        return node
+
+    def visit_FunctionDef(self, node):
+        self._strip_docstring(node)
+        node.returns = None
+        self.generic_visit(node)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_ClassDef = visit_Module
+
+
+@lru_cache(maxsize=512)
+def fingerprint(code):
+    """ Returns a hash of the normalized AST of a solution, or of its text if it does not parse. """
+    try:
+        tree = ast.parse(code)
+        tree = _Normalizer(tree).visit(tree)
+        normalized = ast.dump(tree, annotate_fields=False, include_attributes=False)
+    except (SyntaxError, ValueError, RecursionError):
+        normalized = code
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """Persistent SQLite store of test verdicts keyed by question, test setup and solution fingerprint.
+
+    The store is shared by every run and model that uses the same file, so a solution re-emitted by any of them is
+    answered without being saved, compiled or tested again.
+    """
+
+    def __init__(self, path="VerdictCache.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stats = {'Hits': 0, 'Misses': 0, 'Stores': 0}
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                question_name TEXT,
+                context TEXT,
+                fingerprint TEXT,
+                passed INTEGER,
+                tests_failed INTEGER,
+                feedback TEXT,
+                model TEXT,
+                iteration INTEGER,
+                created REAL,
+                hits INTEGER DEFAULT 0,
+                PRIMARY KEY (question_name, context, fingerprint)
+            )""")
+        self.connection.commit()
+
+    @staticmethod
+    def make_context(*parts):
+        """ Returns a hash of everything besides the solution that decides its verdict, e.g. the test cases. """
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def get(self, question_name, context, code):
+        """ Returns the stored verdict of a solution or an equivalent one, or None. """
+        key = (str(question_name), context, fingerprint(code))
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT passed, tests_failed, feedback, model, iteration FROM verdicts "
+                "WHERE question_name = ? AND context = ? AND fingerprint = ?", key).fetchone()
+            if row is None:
+                self.stats['Misses'] += 1
+                return None
+            self.stats['Hits'] += 1
+            self.connection.execute("UPDATE verdicts SET hits = hits + 1 "
+                                    "WHERE question_name = ? AND context = ? AND fingerprint = ?", key)
+            self.connection.commit()
+        return {'Passed': bool(row[0]), 'Tests Failed': row[1], 'Feedback': row[2], 'Model': row[3],
+                'Iteration': row[4]}
+
+    def put(self, question_name, context, code, passed, tests_failed, feedback, model, iteration):
+        """ Stores the verdict of a tested solution. """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO verdicts (question_name, context, fingerprint, passed, tests_failed, feedback, "
+                "model, iteration, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(question_name), context, fingerprint(code), int(bool(passed)), tests_failed, feedback, model,
+                 iteration, time.time()))
+            self.stats['Stores'] += 1
+            self.connection.commit()
+
+    def report(self):
+        """ Summarizes how many tested solutions were duplicates. """
+        lookups = self.stats['Hits'] + self.stats['Misses']
+        hit_rate = self.stats['Hits'] / lookups * 100 if lookups else 0.0
+        return (f"Verdict cache: {self.stats['Hits']} duplicate solutions, {self.stats['Misses']} new "
+                f"({hit_rate:.1f}% duplicates), {self.stats['Stores']} verdicts stored")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_verdict_caches = {}
+_verdict_caches_lock = threading.Lock()
+
+
+def get_verdict_cache(path):
+    """ Returns the process wide verdict cache stored at the given path. """
+    with _verdict_caches_lock:
+        if path not in _verdict_caches:
+            _verdict_caches[path] = VerdictCache(path)
+        return _verdict_caches[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the verdict cache.")
+    parser.add_argument("path", help="Path of the cache file")
+    args = parser.parse_args()
+    cache = VerdictCache(args.path)
+    entries = cache.connection.execute("SELECT model, COUNT(*), SUM(passed), SUM(hits) FROM verdicts "
+                                       "GROUP BY model").fetchall()
+    for model, count, passed, hits in entries:
+        print(f"{model}: {count} distinct solutions, {passed} passed, reused {hits} times")